@@ -0,0 +1,310 @@
+"""
+EBGreentek Activity Log Writer
+Ghi ActivityLog bất đồng bộ: hàng đợi có giới hạn + spool file + bulk_create theo lô
+Tạo ngày: 2025-12-09
+"""
+
+import atexit
+import glob
+import itertools
+import json
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import DataError, IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .cache import bump_generation
+from .log_storage import add_to_rollups
+from .models import ActivityLog
+
+logger = logging.getLogger(__name__)
+
+# Số giây giữa 2 lần ghi; 0 = ghi ngay (đồng bộ) mỗi sự kiện
+DEFAULT_FLUSH_INTERVAL = 2
+# Số sự kiện đủ một lô → đánh thức writer sớm
+DEFAULT_BATCH_SIZE = 200
+# Số sự kiện chờ tối đa trong bộ nhớ (backpressure khi đầy)
+DEFAULT_MAX_PENDING = 10000
+# Số giây log_activity() chờ khi hàng đợi đầy trước khi bỏ sự kiện
+DEFAULT_PUT_TIMEOUT = 0.05
+
+USER_AGENT_MAX_LENGTH = ActivityLog._meta.get_field('user_agent').max_length
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ActivityLogWriter:
+    """
+    Writer dùng chung trong process.
+
+    - log(): thêm sự kiện vào hàng đợi và ghi 1 dòng JSON vào spool file
+      của process (activity-<pid>.jsonl), không chạm DB
+    - flush(): đổi spool sang segment mới (activity-<pid>-<n>.pending),
+      bulk_create cả lô rồi xóa segment. Ghi lỗi → segment được giữ lại
+      và thử lại ở lần flush sau
+    - Mỗi lần flush còn nhận lại spool/segment của process đã chết (crash) để ghi nốt
+
+    Hàng đợi đầy: đánh thức writer, chờ tối đa ACTIVITY_LOG_PUT_TIMEOUT giây;
+    vẫn đầy thì bỏ sự kiện (đếm vào dropped) để không chặn request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._spool = None
+        self._spool_pid = None
+        self._segment_seq = itertools.count(1)
+        self._wakeup = threading.Event()
+        self._writer = None
+        self.dropped = 0
+        atexit.register(self.shutdown)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'ACTIVITY_LOG_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'ACTIVITY_LOG_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+
+    @property
+    def max_pending(self):
+        return getattr(settings, 'ACTIVITY_LOG_MAX_PENDING', DEFAULT_MAX_PENDING)
+
+    @property
+    def put_timeout(self):
+        return getattr(settings, 'ACTIVITY_LOG_PUT_TIMEOUT', DEFAULT_PUT_TIMEOUT)
+
+    @property
+    def spool_dir(self):
+        return str(getattr(settings, 'ACTIVITY_LOG_SPOOL_DIR', os.path.join(settings.BASE_DIR, '.spool')))
+
+    # ------------------------------------------------------------
+    # Ghi nhận sự kiện
+    # ------------------------------------------------------------
+    def log(self, action, user=None, entity_type=None, entity_id=None,
+            description=None, ip_address=None, user_agent=None):
+        """Ghi nhận một sự kiện; trả False nếu bị bỏ do hàng đợi đầy"""
+        event = {
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'action': action,
+            'entity_type': entity_type,
+            'entity_id': str(entity_id) if entity_id is not None else None,
+            'description': description,
+            'ip_address': ip_address,
+            'user_agent': user_agent[:USER_AGENT_MAX_LENGTH] if user_agent else user_agent,
+            'created_at': timezone.now().isoformat(),
+        }
+
+        if not self.flush_interval:
+            self._write([event])
+            return True
+
+        with self._not_full:
+            if len(self._pending) >= self.max_pending:
+                self._wakeup.set()
+                self._not_full.wait_for(lambda: len(self._pending) < self.max_pending, self.put_timeout)
+                if len(self._pending) >= self.max_pending:
+                    self.dropped += 1
+                    logger.warning('Activity log queue full, dropped %s event (%d dropped so far)',
+                                   action, self.dropped)
+                    return False
+            self._append_spool(event)
+            self._pending.append(event)
+            backlog = len(self._pending)
+
+        self._ensure_writer()
+        if backlog >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def pending(self):
+        """Số sự kiện chưa được ghi xuống DB"""
+        with self._lock:
+            return len(self._pending)
+
+    # ------------------------------------------------------------
+    # Spool file
+    # ------------------------------------------------------------
+    def _spool_path(self, pid):
+        return os.path.join(self.spool_dir, f'activity-{pid}.jsonl')
+
+    def _segment_path(self):
+        return os.path.join(self.spool_dir, f'activity-{os.getpid()}-{next(self._segment_seq)}.pending')
+
+    def _append_spool(self, event):
+        """Gọi khi đang giữ _lock"""
+        pid = os.getpid()
+        if self._spool is None or self._spool_pid != pid:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            path = self._spool_path(pid)
+            if os.path.exists(path):
+                # File sót lại của process cũ trùng pid → chuyển sang segment để ghi nốt
+                os.replace(path, self._segment_path())
+            self._spool = open(path, 'a', encoding='utf-8')
+            self._spool_pid = pid
+        self._spool.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self._spool.flush()
+
+    def _rotate_spool(self):
+        """Đóng spool hiện tại và đổi tên thành segment; gọi khi đang giữ _lock"""
+        if self._spool is None:
+            return None
+        self._spool.close()
+        self._spool = None
+        segment = self._segment_path()
+        os.replace(self._spool_path(self._spool_pid), segment)
+        return segment
+
+    def _claim_orphans(self):
+        """Segment/spool của process đã chết hoặc segment lỗi của chính process này"""
+        pid = os.getpid()
+        claimed = []
+        for path in glob.glob(os.path.join(self.spool_dir, 'activity-*')):
+            owner = os.path.basename(path)[len('activity-'):].split('.')[0].split('-')[0]
+            if not owner.isdigit():
+                continue
+            if int(owner) == pid:
+                if path.endswith('.pending'):
+                    claimed.append(path)
+                continue
+            if _pid_alive(int(owner)):
+                continue
+            target = self._segment_path()
+            try:
+                os.replace(path, target)
+            except FileNotFoundError:
+                # Worker khác đã nhận file này
+                continue
+            claimed.append(target)
+        return claimed
+
+    # ------------------------------------------------------------
+    # Ghi xuống DB
+    # ------------------------------------------------------------
+    def flush(self):
+        """Ghi toàn bộ sự kiện đang chờ (và segment còn sót) xuống DB, trả về số bản ghi"""
+        with self._flush_lock:
+            with self._lock:
+                batch = self._pending
+                self._pending = []
+                segment = self._rotate_spool()
+                self._not_full.notify_all()
+
+            written = 0
+            if batch:
+                try:
+                    written += self._write(batch)
+                except Exception:
+                    logger.exception('Flush activity logs failed, %d events kept in %s', len(batch), segment)
+                    return 0
+            if segment:
+                os.remove(segment)
+
+            if os.path.isdir(self.spool_dir):
+                for path in self._claim_orphans():
+                    written += self._replay(path)
+            return written
+
+    def _replay(self, path):
+        try:
+            with open(path, encoding='utf-8') as spool:
+                events = [json.loads(line) for line in spool if line.strip()]
+            written = self._write(events) if events else 0
+        except Exception:
+            logger.exception('Replay activity log segment %s failed, will retry', path)
+            return 0
+        os.remove(path)
+        return written
+
+    def _write(self, events):
+        logs = []
+        for event in events:
+            created_at = event.get('created_at')
+            logs.append(ActivityLog(**{
+                **event,
+                'created_at': parse_datetime(created_at) if created_at else timezone.now(),
+            }))
+
+        try:
+            with transaction.atomic():
+                ActivityLog.objects.bulk_create(logs, batch_size=self.batch_size)
+            written = logs
+        except (IntegrityError, DataError):
+            # Có bản ghi lỗi dữ liệu (vd. user đã bị xóa) → ghi từng bản, bỏ bản lỗi
+            written = []
+            for log in logs:
+                try:
+                    with transaction.atomic():
+                        log.save(force_insert=True)
+                    written.append(log)
+                except (IntegrityError, DataError) as e:
+                    logger.error('Dropped invalid activity log %s: %s', log.action, e)
+
+        # bulk_create không phát signal
+        bump_generation(ActivityLog)
+        try:
+            add_to_rollups(written)
+        except Exception:
+            # Log gốc đã ghi; rollup sửa lại được bằng rollup_activity_logs
+            logger.exception('Update activity log rollups failed')
+        return len(written)
+
+    # ------------------------------------------------------------
+    # Thread nền
+    # ------------------------------------------------------------
+    def _ensure_writer(self):
+        """Khởi động thread ghi nền (lazy, sau khi worker đã fork)"""
+        if self._writer is not None and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer is not None and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(
+                target=self._run, name='activity-log-writer', daemon=True
+            )
+            self._writer.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Activity log writer failed')
+            finally:
+                close_old_connections()
+
+    def shutdown(self):
+        """Ghi nốt khi process thoát; sự kiện ghi lỗi vẫn nằm trong spool"""
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Flush activity logs on shutdown failed')
+
+
+activity_log_writer = ActivityLogWriter()
+
+
+def log_activity(action, user=None, **fields):
+    """
+    Ghi activity log không chặn request (xem ActivityLogWriter).
+    fields: entity_type, entity_id, description, ip_address, user_agent
+    """
+    return activity_log_writer.log(action, user=user, **fields)
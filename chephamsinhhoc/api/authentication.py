@@ -0,0 +1,156 @@
+"""
+EBGreentek Authentication
+Xác thực JWT không query User mỗi request: user tra từ cache trong process (TTL ngắn,
+bỏ khi User được lưu), hoặc user dựng từ claims của token cho endpoint chỉ cần id/role
+Tạo ngày: 2025-12-19
+"""
+
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache import get_generation
+
+DEFAULT_USER_CACHE_TTL = 60  # giây
+DEFAULT_USER_CACHE_VERSION_CHECK = 2  # giây
+
+# Claim thêm vào token lúc đăng nhập để ClaimsUser không cần đọc DB
+USER_CLAIMS = ('username', 'role', 'is_staff', 'is_superuser')
+
+
+# ============================================================
+# CACHE USER
+# ============================================================
+class UserCache:
+    """
+    {user id: instance} trong process, hết hạn sau USER_CACHE_TTL giây.
+
+    Lưu User trong process hiện tại → invalidate() bỏ ngay (api/signals.py); worker khác
+    thấy qua generation của model User (api/cache.py), đọc lại tối đa mỗi
+    USER_CACHE_VERSION_CHECK giây.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}  # str(id) (claim trong token là chuỗi) → (generation, hết hạn lúc, user)
+        self._generation = None  # (generation, lúc kiểm tra)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'USER_CACHE_TTL', DEFAULT_USER_CACHE_TTL)
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'USER_CACHE_VERSION_CHECK', DEFAULT_USER_CACHE_VERSION_CHECK)
+
+    def generation(self):
+        now = time.monotonic()
+        known = self._generation
+        if known is not None and now - known[1] < self.check_interval:
+            return known[0]
+        generation = get_generation(get_user_model())
+        self._generation = (generation, now)
+        return generation
+
+    def get(self, user_id):
+        """Bản sao của user đã cache (request có thể sửa thuộc tính), None nếu chưa có / đã cũ"""
+        generation = self.generation()
+        with self._lock:
+            entry = self._users.get(str(user_id))
+            if entry is None or entry[0] != generation or entry[1] <= time.monotonic():
+                self._users.pop(str(user_id), None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return copy.copy(entry[2])
+
+    def set(self, user_id, user, generation):
+        """generation: đọc TRƯỚC khi query user, để lần lưu xen giữa làm bản này hết hiệu lực"""
+        with self._lock:
+            self._users[str(user_id)] = (generation, time.monotonic() + self.ttl, copy.copy(user))
+
+    def invalidate(self, user_id=None):
+        with self._lock:
+            self._generation = None
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(str(user_id), None)
+
+    def clear(self):
+        self.invalidate()
+
+
+user_cache = UserCache()
+
+
+# ============================================================
+# AUTHENTICATION CLASSES
+# ============================================================
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication nhưng tra user qua user_cache (vẫn kiểm tra is_active / đổi mật khẩu)"""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        # Khóa user / đổi mật khẩu đều qua save() → bản cache bị bỏ, lần sau kiểm tra lại từ DB
+        user = user_cache.get(user_id)
+        if user is None:
+            generation = user_cache.generation()
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user, generation)
+        return user
+
+
+class ClaimsUser(TokenUser):
+    """User dựng từ claims của token: id, username, role, is_staff, is_superuser — không query DB"""
+
+    @cached_property
+    def role(self):
+        return self.token.get('role')
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    Cho endpoint chỉ cần id/role của người gọi (authentication_classes=[ClaimsJWTAuthentication]).
+    Không đọc DB nên user bị khóa vẫn dùng được access token tới khi hết hạn.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            return super().get_user(validated_token)
+        return ClaimsUser(validated_token)
+
+
+# ============================================================
+# TOKEN
+# ============================================================
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token kèm USER_CLAIMS; access token sinh từ nó copy lại các claim này"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_CLAIMS:
+            value = getattr(user, claim, None)
+            if value is not None:
+                token[claim] = value
+        return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """SIMPLE_JWT['TOKEN_OBTAIN_SERIALIZER'] cho /api/token/"""
+    token_class = ClaimsRefreshToken
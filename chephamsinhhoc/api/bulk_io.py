@@ -0,0 +1,339 @@
+"""
+EBGreentek Bulk Import/Export
+Nhập/xuất sản phẩm, bài viết dạng CSV / JSONL theo luồng: validate theo lô, ghi bằng
+bulk_create/bulk_update, lỗi từng dòng không làm hỏng cả lô
+Tạo ngày: 2025-12-16
+"""
+
+import csv
+import datetime
+import io
+import json
+
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+
+from .cache import bump_generation
+from .fields import EncodedJSON, JSONTextField, json_loads
+from .models import Article, Product
+from .search import index_documents
+from .serializers import ArticleSerializer, ProductSerializer
+from . import stats
+
+FORMATS = ('csv', 'jsonl')
+DEFAULT_CHUNK_SIZE = 500
+# Số lỗi chi tiết tối đa giữ trong báo cáo (vẫn đếm đủ)
+MAX_REPORTED_ERRORS = 1000
+
+# Tên resource → model, serializer validate, khóa tự nhiên (dùng khi dòng không có id)
+RESOURCES = {
+    'products': {'model': Product, 'serializer': ProductSerializer, 'key': 'name'},
+    'articles': {'model': Article, 'serializer': ArticleSerializer, 'key': 'title'},
+}
+
+# Field không ghi từ file import
+SKIPPED_FIELDS = {'id', 'view_count', 'created_at', 'updated_at'}
+
+
+def get_resource(name):
+    if name not in RESOURCES:
+        raise ValueError(f'Resource không hỗ trợ: {name} (chọn {", ".join(RESOURCES)})')
+    return RESOURCES[name]
+
+
+def export_fields(resource):
+    """Field xuất mặc định: field của serializer có cột trong bảng"""
+    model = resource['model']
+    columns = {field.name for field in model._meta.concrete_fields}
+    return [name for name in resource['serializer'].Meta.fields if name in columns]
+
+
+def writable_fields(model):
+    return [field.name for field in model._meta.concrete_fields if field.name not in SKIPPED_FIELDS]
+
+
+# ============================================================
+# ĐỌC FILE
+# ============================================================
+def read_csv(stream, model):
+    """(số dòng, dict, lỗi) cho từng dòng CSV; cột JSON (list) ghi dạng JSON trong ô"""
+    json_fields = {field.name for field in model._meta.concrete_fields if isinstance(field, JSONTextField)}
+    nullable = {field.name for field in model._meta.concrete_fields if field.null}
+    reader = csv.DictReader(stream)
+    for row in reader:
+        record = {}
+        try:
+            for name, value in row.items():
+                if name is None:
+                    raise ValueError('Dòng có nhiều cột hơn header')
+                if value == '' and name in nullable:
+                    value = None
+                elif name in json_fields and value:
+                    value = json.loads(value)
+                record[name] = value
+        except ValueError as e:
+            yield reader.line_num, None, {'non_field_errors': [str(e)]}
+            continue
+        yield reader.line_num, record, None
+
+
+def read_jsonl(stream, model=None):
+    """(số dòng, dict, lỗi) cho từng dòng JSON; dòng trống bỏ qua"""
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError('Mỗi dòng phải là một object JSON')
+        except ValueError as e:
+            yield number, None, {'non_field_errors': [str(e)]}
+            continue
+        yield number, record, None
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl}
+
+
+def open_text(binary):
+    """File upload / file nhị phân → stream text UTF-8 (bỏ BOM của Excel)"""
+    return io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+
+
+# ============================================================
+# IMPORT
+# ============================================================
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'unchanged': self.unchanged,
+            'error_count': self.error_count,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+        }
+
+
+def _match_existing(resource, records):
+    """Bản ghi đang có cho cả lô: theo id, còn lại theo khóa tự nhiên (2 query)"""
+    model, key = resource['model'], resource['key']
+    ids = {str(record['id']) for _, record in records if record.get('id')}
+    keys = {record.get(key) for _, record in records if not record.get('id') and record.get(key)}
+    by_id = model.objects.in_bulk(ids) if ids else {}
+    by_key = {}
+    if keys:
+        for instance in model.objects.filter(**{f'{key}__in': keys}):
+            by_key.setdefault(getattr(instance, key), []).append(instance)
+    return by_id, by_key
+
+
+def _import_chunk(resource, records, report, dry_run):
+    """Validate + ghi một lô; trả về các instance đã tạo/sửa"""
+    model, key = resource['model'], resource['key']
+    fields = writable_fields(model)
+    by_id, by_key = _match_existing(resource, records)
+
+    seen = {}
+    creates, updates, changed_fields = [], [], set()
+    for line, record in records:
+        identity = ('id', str(record['id'])) if record.get('id') else (key, record.get(key))
+        if identity[1] and identity in seen:
+            report.add_error(line, {identity[0]: [f'Trùng với dòng {seen[identity]}']})
+            continue
+        seen[identity] = line
+
+        if record.get('id'):
+            instance = by_id.get(str(record['id']))
+        else:
+            matches = by_key.get(record.get(key), [])
+            if len(matches) > 1:
+                report.add_error(line, {key: [f'{len(matches)} bản ghi cùng {key}, thêm cột id để chọn']})
+                continue
+            instance = matches[0] if matches else None
+
+        serializer = resource['serializer'](instance, data=record, partial=instance is not None)
+        if not serializer.is_valid():
+            report.add_error(line, serializer.errors)
+            continue
+        data = {name: value for name, value in serializer.validated_data.items() if name in fields}
+
+        if instance is None:
+            instance = model(**data)
+            if record.get('id'):
+                instance.id = str(record['id'])
+            if hasattr(instance, 'sync_published_at'):
+                instance.sync_published_at()
+            creates.append((line, instance))
+            continue
+
+        before = {name: getattr(instance, name) for name in fields}
+        for name, value in data.items():
+            setattr(instance, name, value)
+        if hasattr(instance, 'sync_published_at'):
+            instance.sync_published_at()
+        changed = {name for name in fields if getattr(instance, name) != before[name]}
+        if changed:
+            updates.append((line, instance))
+            changed_fields |= changed
+        else:
+            report.unchanged += 1
+
+    if not dry_run and (creates or updates):
+        # bulk_update không tự cập nhật auto_now
+        now = timezone.now()
+        for _, instance in updates:
+            instance.updated_at = now
+        update_fields = [*changed_fields, 'updated_at']
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([instance for _, instance in creates], batch_size=DEFAULT_CHUNK_SIZE)
+                model.objects.bulk_update([instance for _, instance in updates], update_fields,
+                                          batch_size=DEFAULT_CHUNK_SIZE)
+        except (IntegrityError, DataError):
+            # Một dòng hỏng (trùng id, dữ liệu quá cột...) → ghi từng dòng để giữ các dòng còn lại
+            creates = _write_each(creates, report, lambda instance: model.objects.bulk_create([instance]))
+            updates = _write_each(updates, report,
+                                  lambda instance: model.objects.bulk_update([instance], update_fields))
+    report.created += len(creates)
+    report.updated += len(updates)
+    return [instance for _, instance in creates + updates]
+
+
+def _write_each(items, report, write):
+    written = []
+    for line, instance in items:
+        try:
+            with transaction.atomic():
+                write(instance)
+        except (IntegrityError, DataError) as e:
+            report.add_error(line, {'non_field_errors': [str(e)]})
+        else:
+            written.append((line, instance))
+    return written
+
+
+def import_rows(resource_name, stream, fmt, chunk_size=DEFAULT_CHUNK_SIZE, dry_run=False):
+    """
+    Nhập từ stream text (CSV có header / JSONL) theo lô chunk_size dòng.
+    Dòng có id → khớp theo id; không có → khớp theo khóa tự nhiên (name / title).
+    Khớp được thì cập nhật các cột có trong file, không thì tạo mới.
+    Mỗi lô ghi xong là index tìm kiếm, đối soát dashboard, bump cache ngay: stream lỗi giữa chừng
+    thì các lô đã ghi vẫn nhất quán, bộ nhớ không tăng theo cỡ file.
+    """
+    resource = get_resource(resource_name)
+    model = resource['model']
+    report = ImportReport()
+
+    def write(chunk):
+        written = _import_chunk(resource, chunk, report, dry_run)
+        if written and not dry_run:
+            _after_write(model, written)
+
+    chunk = []
+    for line, record, errors in READERS[fmt](stream, model):
+        if errors:
+            report.add_error(line, errors)
+            continue
+        chunk.append((line, record))
+        if len(chunk) >= chunk_size:
+            write(chunk)
+            chunk = []
+    if chunk:
+        write(chunk)
+    return report
+
+
+def _after_write(model, instances):
+    """Bulk write không phát signal → tự làm phần việc của signals cho lô vừa ghi"""
+    index_documents(instances)
+    stats.reconcile_totals(stats.total_metrics(model))
+    bump_generation(model)
+
+
+# ============================================================
+# EXPORT
+# ============================================================
+def export_rows(resource_name, fields=None, chunk_size=2000):
+    """
+    Dict từng bản ghi, đọc theo lô khóa chính tăng dần (WHERE id > last LIMIT n).
+    mysqlclient không có server-side cursor cho iterator() nên keyset giữ bộ nhớ phẳng như nhau trên mọi DB.
+    """
+    resource = get_resource(resource_name)
+    model = resource['model']
+    fields = fields or export_fields(resource)
+    unknown = set(fields) - {field.name for field in model._meta.concrete_fields}
+    if unknown:
+        raise ValueError(f'Field không tồn tại: {", ".join(sorted(unknown))}')
+
+    return _iter_rows(model, fields, chunk_size)
+
+
+def _iter_rows(model, fields, chunk_size):
+    columns = list(dict.fromkeys(['id', *fields]))
+    rows = model.objects.order_by('pk').values(*columns)
+    last_id = None
+    while True:
+        chunk = list((rows.filter(pk__gt=last_id) if last_id is not None else rows)[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1]['id']
+        for row in chunk:
+            yield {name: row[name] for name in fields}
+
+
+def _cell(value):
+    # EncodedJSON (cột JSON đọc bằng values()) đã là JSON text → ghi nguyên, không giải mã/encode lại
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return '' if value is None else value
+
+
+def encode_csv(rows, fields):
+    """Chuỗi text CSV (header + từng dòng) cho StreamingHttpResponse / file"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    writer.writerow(fields)
+    yield flush()
+    for row in rows:
+        writer.writerow([_cell(row[name]) for name in fields])
+        yield flush()
+
+
+def _json_value(value):
+    return (json_loads(str(value)) if value else None) if isinstance(value, EncodedJSON) else value
+
+
+def encode_jsonl(rows, fields=None):
+    for row in rows:
+        row = {name: _json_value(value) for name, value in row.items()}
+        yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+
+
+ENCODERS = {'csv': encode_csv, 'jsonl': encode_jsonl}
+
+
+def export_stream(resource_name, fmt, fields=None):
+    """Text CSV/JSONL của cả bảng, sinh dần theo lô (field sai → ValueError ngay, trước khi stream)"""
+    fields = fields or export_fields(get_resource(resource_name))
+    return ENCODERS[fmt](export_rows(resource_name, fields), fields)
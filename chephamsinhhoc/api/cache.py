@@ -0,0 +1,184 @@
+"""
+EBGreentek Response Cache
+Cache response của các endpoint public theo generation counter của model
+Tạo ngày: 2025-12-02
+"""
+
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .db.router import current_replica, max_lag, replica_aliases
+
+DEFAULT_RESPONSE_CACHE_TIMEOUT = 300
+
+
+# ============================================================
+# GENERATION COUNTER
+# ============================================================
+def generation_key(model):
+    return f'gen:{model._meta.label_lower}'
+
+
+def get_generation(model):
+    """Generation hiện tại của model (tăng mỗi lần save/delete)"""
+    key = generation_key(model)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, 1, timeout=None)
+        generation = cache.get(key, 1)
+    return generation
+
+
+def get_generations(models):
+    """Generation của nhiều model, đọc bằng một lần get_many"""
+    keys = {generation_key(model): model for model in models}
+    found = cache.get_many(list(keys))
+    return [found.get(key) or get_generation(model) for key, model in keys.items()]
+
+
+def bump_generation(model):
+    """Tăng generation để vô hiệu hóa mọi cache phụ thuộc model"""
+    if replica_aliases():
+        cache.set(written_key(model), 1, timeout=max_lag())
+    key = generation_key(model)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+        return cache.incr(key)
+
+
+def written_key(model):
+    return f'written:{model._meta.label_lower}'
+
+
+def recently_written(models):
+    """Model nào vừa ghi trong REPLICA_MAX_LAG giây (replica có thể chưa nhận)"""
+    return bool(cache.get_many([written_key(model) for model in models]))
+
+
+def cacheable_read(models):
+    """
+    Đọc từ replica ngay sau khi ghi có thể là dữ liệu cũ, nhưng generation đã mới →
+    không lưu vào cache, nếu không bản cũ sẽ nằm dưới key mới tới hết timeout.
+    """
+    return not (current_replica() and recently_written(models))
+
+
+# ============================================================
+# OBJECT VERSION
+# ============================================================
+def object_version_key(model, pk):
+    return f'ver:{model._meta.label_lower}:{pk}'
+
+
+def get_object_version(model, pk):
+    """Version riêng của một bản ghi (0 nếu chưa từng đổi), nằm trong key cache của trang chi tiết"""
+    return cache.get(object_version_key(model, pk), 0)
+
+
+def bump_object_versions(model, pks):
+    """
+    Làm mới cache trang chi tiết của các bản ghi, không tăng generation của model
+    (list / popular / featured / bootstrap vẫn giữ cache). Version hết hạn cùng response
+    cache: lúc đó các response theo version cũ cũng đã hết hạn.
+    """
+    version = time.time_ns()
+    timeout = getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', DEFAULT_RESPONSE_CACHE_TIMEOUT)
+    cache.set_many({object_version_key(model, pk): version for pk in pks}, timeout)
+
+
+# ============================================================
+# RESPONSE CACHE
+# ============================================================
+def make_etag(data):
+    """ETag theo nội dung JSON của response"""
+    return '"%s"' % hashlib.md5(JSONRenderer().render(data)).hexdigest()
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    return '*' in candidates or etag in candidates or f'W/{etag}' in candidates
+
+
+def cache_response(method):
+    """Decorator cho action của viewset dùng ResponseCacheMixin"""
+    @functools.wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        return self.cached_response(method, request, *args, **kwargs)
+    return wrapper
+
+
+class ResponseCacheMixin:
+    """
+    Cache data của response GET theo:
+    action + kwargs + query params đã chuẩn hóa + trạng thái đăng nhập
+    + generation của các model liên quan.
+
+    Khi model được save/delete (api/signals.py), generation tăng nên mọi
+    key cũ của model đó tự động hết hiệu lực.
+    """
+    cache_models = None  # Mặc định: model của queryset
+
+    def get_cache_models(self):
+        return self.cache_models or [self.queryset.model]
+
+    def get_response_cache_key(self, request, *args, **kwargs):
+        params = sorted(
+            (key, value)
+            for key in request.query_params
+            for value in request.query_params.getlist(key)
+            if value != ''
+        )
+        auth_state = 'auth' if request.user and request.user.is_authenticated else 'anon'
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        version = get_object_version(self.queryset.model, lookup) if lookup is not None else None
+        raw = json.dumps([
+            self.basename, self.action, sorted(kwargs.items()), params,
+            auth_state, get_generations(self.get_cache_models()), version,
+        ], default=str)
+        return 'resp:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def on_cache_hit(self, request, *args, **kwargs):
+        """Hook khi trả response từ cache (vd: đếm lượt xem)"""
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return handler(self, request, *args, **kwargs)
+
+        key = self.get_response_cache_key(request, *args, **kwargs)
+        entry = cache.get(key)
+
+        if entry is None:
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            entry = (response.data, make_etag(response.data))
+            timeout = getattr(settings, 'API_RESPONSE_CACHE_TIMEOUT', DEFAULT_RESPONSE_CACHE_TIMEOUT)
+            if cacheable_read(self.get_cache_models()):
+                cache.set(key, entry, timeout)
+            cache_status = 'MISS'
+        else:
+            self.on_cache_hit(request, *args, **kwargs)
+            cache_status = 'HIT'
+
+        data, etag = entry
+        if etag_matches(request, etag):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        response['X-Cache'] = cache_status
+        response['Vary'] = 'Authorization'
+        return response
@@ -0,0 +1,92 @@
+"""
+EBGreentek Category Tree
+Dựng cây danh mục bằng 1 query, cache tới khi Category thay đổi
+Tạo ngày: 2025-12-03
+"""
+
+import threading
+from collections import defaultdict
+
+from .cache import get_generation
+from .models import Category
+
+# Các field của một node trong cây (giống CategoryTreeSerializer cũ)
+TREE_FIELDS = ['id', 'name', 'slug', 'type', 'icon', 'color']
+
+_lock = threading.Lock()
+_built = {'generation': None, 'roots': [], 'by_slug': {}}
+
+
+def _build():
+    """Load toàn bộ danh mục active trong 1 query và ráp cây trong bộ nhớ"""
+    rows = Category.objects.filter(is_active=True).order_by('sort_order', 'name').values(
+        *TREE_FIELDS, 'parent_id'
+    )
+
+    nodes = {}
+    parents = {}
+    for row in rows:
+        parents[row['id']] = row.pop('parent_id')
+        nodes[row['id']] = dict(row, children=[])
+
+    roots = []
+    for category_id, node in nodes.items():
+        parent_id = parents[category_id]
+        if parent_id is None:
+            roots.append(node)
+        elif parent_id in nodes:
+            nodes[parent_id]['children'].append(node)
+        # Cha bị ẩn (inactive) → cả nhánh con cũng bị ẩn
+
+    by_slug = {}
+    stack = list(roots)
+    while stack:
+        node = stack.pop()
+        by_slug[node['slug']] = node
+        stack.extend(node['children'])
+
+    return roots, by_slug
+
+
+def _get_built():
+    generation = get_generation(Category)
+    if _built['generation'] != generation:
+        with _lock:
+            if _built['generation'] != generation:
+                roots, by_slug = _build()
+                _built.update(generation=generation, roots=roots, by_slug=by_slug)
+    return _built
+
+
+def _copy(node, max_depth):
+    """Copy node (không sửa cây đang cache), cắt bớt ở độ sâu max_depth"""
+    if max_depth is not None and max_depth <= 1:
+        children = []
+    else:
+        next_depth = None if max_depth is None else max_depth - 1
+        children = [_copy(child, next_depth) for child in node['children']]
+    return dict(node, children=children)
+
+
+def get_category_tree(type_filter=None, max_depth=None):
+    """Danh sách danh mục gốc kèm children; max_depth=1 chỉ lấy gốc"""
+    roots = _get_built()['roots']
+    if type_filter:
+        roots = [root for root in roots if root['type'] == type_filter]
+    return [_copy(root, max_depth) for root in roots]
+
+
+def get_category_subtree(slug, max_depth=None):
+    """Nhánh cây bắt đầu từ danh mục có slug, None nếu không có/không active"""
+    node = _get_built()['by_slug'].get(slug)
+    if node is None:
+        return None
+    return _copy(node, max_depth)
+
+
+def build_children_map():
+    """parent_id → danh sách Category con (mọi trạng thái), 1 query"""
+    children_map = defaultdict(list)
+    for category in Category.objects.filter(parent__isnull=False):
+        children_map[category.parent_id].append(category)
+    return children_map
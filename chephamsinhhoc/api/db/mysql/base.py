@@ -0,0 +1,15 @@
+"""
+EBGreentek MySQL Backend
+django.db.backends.mysql + pool kết nối (ENGINE = 'api.db.mysql')
+Tạo ngày: 2025-12-17
+"""
+
+from django.db.backends.mysql import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def validate_raw_connection(self, raw):
+        # mysqlclient: một round-trip COM_PING, không cần cursor
+        raw.ping()
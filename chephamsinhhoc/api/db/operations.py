@@ -0,0 +1,42 @@
+"""
+EBGreentek Migration Operations
+Operation dùng trong api/migrations cho database import từ "ebgreentek_db (1).sql"
+Tạo ngày: 2025-12-10
+"""
+
+from django.db import migrations
+
+
+class AddIndexIfMissing(migrations.AddIndex):
+    """
+    AddIndex, nhưng không tạo nếu bảng đã có index trên đúng các cột đó.
+    Dump SQL đặt tên index riêng (vd. idx_created) nên Django không nhận ra index đã có;
+    tạo thêm bản thứ hai chỉ làm chậm ghi.
+    """
+
+    def columns(self, model):
+        return [model._meta.get_field(name.lstrip('-')).column for name in self.index.fields]
+
+    def existing_index(self, schema_editor, model):
+        """Tên index đã phủ đúng các cột (không tính unique/PK), None nếu chưa có"""
+        columns = self.columns(model)
+        with schema_editor.connection.cursor() as cursor:
+            constraints = schema_editor.connection.introspection.get_constraints(cursor, model._meta.db_table)
+        for name, info in constraints.items():
+            if info['index'] and not info['unique'] and not info['primary_key'] and info['columns'] == columns:
+                return name
+        return None
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model) and self.existing_index(schema_editor, model):
+            return
+        super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        # Chỉ xóa index do chính migration tạo, giữ index có sẵn từ dump
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model) \
+                and self.existing_index(schema_editor, model) != self.index.name:
+            return
+        super().database_backwards(app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,234 @@
+"""
+EBGreentek Connection Pool
+Pool kết nối DB trong mỗi worker: giới hạn số kết nối, kiểm tra khi lấy ra, thay mới theo tuổi
+Tạo ngày: 2025-12-17
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 10
+DEFAULT_MAX_AGE = 1800  # giây, nhỏ hơn wait_timeout của MariaDB
+DEFAULT_TIMEOUT = 30  # giây chờ khi pool đầy
+DEFAULT_HEALTH_CHECK_AFTER = 0  # giây nghỉ trước khi phải kiểm tra lại (0 = luôn kiểm tra)
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(OperationalError):
+    """Pool đầy quá TIMEOUT giây"""
+
+
+def _close_quietly(raw):
+    try:
+        raw.close()
+    except Exception:
+        logger.debug('Closing pooled connection failed', exc_info=True)
+
+
+class ConnectionPool:
+    """
+    Pool các kết nối DB-API thô dùng chung giữa các thread của một process.
+
+    - checkout(): lấy kết nối nghỉ gần nhất (LIFO, còn "ấm"), quá MAX_AGE thì đóng,
+      nghỉ lâu hơn HEALTH_CHECK_AFTER thì chạy validate() trước khi trả ra; chưa đủ
+      MAX_SIZE thì mở mới; đủ thì chờ tối đa TIMEOUT giây
+    - checkin(): trả kết nối về pool (hoặc đóng nếu discard / quá tuổi)
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, max_age=DEFAULT_MAX_AGE, timeout=DEFAULT_TIMEOUT,
+                 health_check_after=DEFAULT_HEALTH_CHECK_AFTER):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle = deque()  # (raw, tạo lúc, trả về lúc)
+        self._born = {}  # id(raw) → tạo lúc, cho kết nối đang dùng
+        self.in_use = 0
+        self.created = 0
+        self.recycled = 0
+        self.health_check_failures = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.checkouts = 0
+        self.checkout_seconds_total = 0.0
+        self.checkout_seconds_max = 0.0
+
+    @property
+    def size(self):
+        return self.in_use + len(self._idle)
+
+    def checkout(self, connect, validate):
+        """connect() mở kết nối mới, validate(raw) raise nếu kết nối hỏng"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            raw, born, stale = self._reserve(deadline)
+            if raw is None:
+                try:
+                    raw = connect()
+                except BaseException:
+                    self._release_slot()
+                    raise
+                born = time.monotonic()
+                with self._cond:
+                    self.created += 1
+            elif stale:
+                try:
+                    validate(raw)
+                except Exception:
+                    logger.warning('Pooled connection failed health check, reconnecting')
+                    _close_quietly(raw)
+                    with self._cond:
+                        self.health_check_failures += 1
+                    self._release_slot()
+                    continue
+
+            elapsed = time.monotonic() - started
+            with self._cond:
+                self._born[id(raw)] = born
+                self.checkouts += 1
+                self.checkout_seconds_total += elapsed
+                self.checkout_seconds_max = max(self.checkout_seconds_max, elapsed)
+            return raw
+
+    def _reserve(self, deadline):
+        """Giữ một chỗ: (kết nối nghỉ, tạo lúc, cần kiểm tra) hoặc (None, None, False) = được mở mới"""
+        expired = []
+        try:
+            with self._cond:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        raw, born, returned = self._idle.pop()
+                        if now - born >= self.max_age:
+                            expired.append(raw)
+                            self.recycled += 1
+                            continue
+                        self.in_use += 1
+                        return raw, born, now - returned >= self.health_check_after
+                    if self.size < self.max_size:
+                        self.in_use += 1
+                        return None, None, False
+                    remaining = deadline - now
+                    self.waits += 1
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        if self._idle or self.size < self.max_size:
+                            continue
+                        self.timeouts += 1
+                        raise PoolTimeout(
+                            f'Connection pool exhausted ({self.max_size} in use) after {self.timeout}s'
+                        )
+        finally:
+            for raw in expired:
+                _close_quietly(raw)
+
+    def _release_slot(self):
+        with self._cond:
+            self.in_use -= 1
+            self._cond.notify()
+
+    def checkin(self, raw, discard=False):
+        with self._cond:
+            born = self._born.pop(id(raw), None)
+            self.in_use -= 1
+            now = time.monotonic()
+            if born is None or discard or now - born >= self.max_age:
+                if born is not None and not discard:
+                    self.recycled += 1
+                self._cond.notify()
+                close = True
+            else:
+                self._idle.append((raw, born, now))
+                self._cond.notify()
+                close = False
+        if close:
+            _close_quietly(raw)
+
+    def clear(self):
+        """Đóng mọi kết nối đang nghỉ"""
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+        for raw, _, _ in idle:
+            _close_quietly(raw)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self.size,
+                'in_use': self.in_use,
+                'idle': len(self._idle),
+                'created': self.created,
+                'recycled': self.recycled,
+                'health_check_failures': self.health_check_failures,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'checkouts': self.checkouts,
+                'checkout_seconds_total': self.checkout_seconds_total,
+                'checkout_seconds_max': self.checkout_seconds_max,
+            }
+
+
+def get_pool(alias, options):
+    """Pool của alias trong process hiện tại (tạo mới sau fork: kết nối của process cha không dùng chung được)"""
+    pool = _pools.get(alias)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != os.getpid():
+            pool = ConnectionPool(
+                max_size=options.get('MAX_SIZE', DEFAULT_MAX_SIZE),
+                max_age=options.get('MAX_AGE', DEFAULT_MAX_AGE),
+                timeout=options.get('TIMEOUT', DEFAULT_TIMEOUT),
+                health_check_after=options.get('HEALTH_CHECK_AFTER', DEFAULT_HEALTH_CHECK_AFTER),
+            )
+            _pools[alias] = pool
+    return pool
+
+
+def pool_stats():
+    """{alias: số liệu pool} của process hiện tại"""
+    return {alias: pool.stats() for alias, pool in list(_pools.items()) if pool.pid == os.getpid()}
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Mixin cho DatabaseWrapper của Django: get_new_connection() lấy từ pool, _close()
+    trả về pool. Giữ CONN_MAX_AGE = 0 để cuối mỗi request kết nối quay lại pool.
+    Cấu hình trong DATABASES[alias]['POOL']: MAX_SIZE, MAX_AGE, TIMEOUT, HEALTH_CHECK_AFTER.
+    """
+
+    def get_pool(self):
+        return get_pool(self.alias, self.settings_dict.get('POOL') or {})
+
+    def validate_raw_connection(self, raw):
+        cursor = raw.cursor()
+        try:
+            cursor.execute('SELECT 1')
+            cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def get_new_connection(self, conn_params):
+        connect = super().get_new_connection
+        return self.get_pool().checkout(lambda: connect(conn_params), self.validate_raw_connection)
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Kết nối đang dở transaction hoặc vừa lỗi thì không trả lại pool
+        discard = self.in_atomic_block or not self.autocommit or self.errors_occurred
+        self.get_pool().checkin(self.connection, discard=discard)
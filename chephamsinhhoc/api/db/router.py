@@ -0,0 +1,223 @@
+"""
+EBGreentek Replica Router
+Đọc public (GET ẩn danh) của catalogue từ read replica, ghi và admin luôn ở primary,
+đọc-sau-ghi bám primary bằng cookie, replica trễ quá REPLICA_MAX_LAG thì bỏ qua
+Tạo ngày: 2025-12-18
+"""
+
+import contextvars
+import logging
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_LAG = 10  # giây
+DEFAULT_LAG_CHECK_INTERVAL = 5  # giây
+DEFAULT_STICKY_SECONDS = 15  # ≥ REPLICA_MAX_LAG để kịp đồng bộ
+DEFAULT_STICKY_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Alias replica cho các query đọc của request hiện tại, None = primary
+_read_alias = contextvars.ContextVar('replica_read_alias', default=None)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def max_lag():
+    return getattr(settings, 'REPLICA_MAX_LAG', DEFAULT_MAX_LAG)
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+
+def sticky_cookie():
+    return getattr(settings, 'REPLICA_STICKY_COOKIE', DEFAULT_STICKY_COOKIE)
+
+
+def current_replica():
+    """Replica đang phục vụ đọc trong context hiện tại (None = primary)"""
+    return _read_alias.get()
+
+
+# ============================================================
+# ĐỘ TRỄ REPLICA
+# ============================================================
+def measure_lag(alias):
+    """Số giây replica chậm hơn primary; inf nếu không kết nối được / replication dừng"""
+    connection = connections[alias]
+    try:
+        if connection.vendor != 'mysql':
+            # Stand-in (SQLite...) không có replication: chỉ kiểm tra kết nối
+            connection.ensure_connection()
+            return 0.0
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW SLAVE STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                # Không cấu hình replication (vd. replica dựng bằng snapshot) → coi như không trễ
+                return 0.0
+            columns = [column[0] for column in cursor.description]
+            lag = dict(zip(columns, row)).get('Seconds_Behind_Master')
+            return float('inf') if lag is None else float(lag)
+    except DatabaseError:
+        logger.warning('Replica %s unavailable', alias, exc_info=True)
+        connection.close_if_unusable_or_obsolete()
+        return float('inf')
+
+
+class ReplicaMonitor:
+    """
+    Độ trễ của từng replica, đo lại tối đa mỗi REPLICA_LAG_CHECK_INTERVAL giây trong process.
+    Trong lúc một thread đang đo, các thread khác dùng kết quả cũ thay vì chờ.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lags = {}  # alias → (lag, đo lúc)
+        self._checking = set()
+        self.replica_reads = 0
+        self.primary_fallbacks = 0
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', DEFAULT_LAG_CHECK_INTERVAL)
+
+    def lag(self, alias):
+        now = time.monotonic()
+        with self._lock:
+            known = self._lags.get(alias)
+            fresh = known is not None and now - known[1] < self.check_interval
+            if fresh or (known is not None and alias in self._checking):
+                return known[0]
+            self._checking.add(alias)
+        try:
+            lag = measure_lag(alias)
+        finally:
+            with self._lock:
+                self._checking.discard(alias)
+        with self._lock:
+            self._lags[alias] = (lag, time.monotonic())
+        return lag
+
+    def healthy(self):
+        limit = max_lag()
+        return [alias for alias in replica_aliases() if self.lag(alias) <= limit]
+
+    def choose(self):
+        """Replica ngẫu nhiên trong số replica đủ mới, None nếu không còn replica nào"""
+        healthy = self.healthy()
+        with self._lock:
+            if healthy:
+                self.replica_reads += 1
+            elif replica_aliases():
+                self.primary_fallbacks += 1
+        return random.choice(healthy) if healthy else None
+
+    def clear(self):
+        with self._lock:
+            self._lags.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'replicas': {alias: lag for alias, (lag, _) in self._lags.items()},
+                'replica_reads': self.replica_reads,
+                'primary_fallbacks': self.primary_fallbacks,
+            }
+
+
+replica_monitor = ReplicaMonitor()
+
+
+# ============================================================
+# ROUTER
+# ============================================================
+class ReplicaRouter:
+    """
+    DATABASE_ROUTERS: đọc theo replica đã chọn cho request (ReplicaReadMixin), mọi thứ
+    khác về primary. Ghi luôn trả primary tường minh: nếu trả None, Django sẽ ghi instance
+    vào chính database đã đọc ra nó (replica).
+    """
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replica nhận schema qua replication
+        if db in replica_aliases():
+            return False
+        return None
+
+
+# ============================================================
+# VIEW / MIDDLEWARE
+# ============================================================
+def is_sticky(request):
+    """Client vừa ghi trong REPLICA_STICKY_SECONDS giây → đọc primary để thấy dữ liệu của mình"""
+    try:
+        return float(request.COOKIES.get(sticky_cookie(), 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def wants_replica(request):
+    return (
+        request.method in SAFE_METHODS
+        and not (request.user and request.user.is_authenticated)
+        and not is_sticky(request)
+    )
+
+
+class ReplicaReadMixin:
+    """
+    Mixin cho viewset public: GET/HEAD/OPTIONS ẩn danh đọc từ replica.
+    Chọn sau khi DRF xác thực (initial) để admin đăng nhập luôn ở primary.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if replica_aliases() and wants_replica(request):
+            alias = replica_monitor.choose()
+            if alias:
+                self._replica_token = _read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, '_replica_token', None)
+        if token is not None:
+            _read_alias.reset(token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReadYourWritesMiddleware:
+    """Sau request ghi thành công → cookie buộc client đọc primary trong REPLICA_STICKY_SECONDS giây"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if replica_aliases() and request.method not in SAFE_METHODS and response.status_code < 400:
+            seconds = sticky_seconds()
+            response.set_cookie(
+                sticky_cookie(), f'{time.time() + seconds:.0f}', max_age=seconds,
+                httponly=True, samesite='Lax', secure=request.is_secure(),
+            )
+        return response
@@ -0,0 +1,17 @@
+"""
+EBGreentek SQLite Backend
+django.db.backends.sqlite3 + pool kết nối (ENGINE = 'api.db.sqlite3'), dùng cho dev / benchmark
+Tạo ngày: 2025-12-17
+"""
+
+from django.db.backends.sqlite3 import base
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+    def _close(self):
+        # Database trong bộ nhớ mất dữ liệu khi đóng kết nối → Django không đóng, giữ nguyên
+        if self.is_in_memory_db():
+            return
+        super()._close()
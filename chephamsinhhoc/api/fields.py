@@ -0,0 +1,131 @@
+"""
+EBGreentek Model Fields
+JSONTextField: lưu JSON trong cột TEXT (MariaDB 10.4), giải mã 1 lần/instance
+Tạo ngày: 2025-12-06
+"""
+
+import json
+import logging
+
+from django.db import models
+from django.db.models.query_utils import DeferredAttribute
+
+try:
+    import orjson
+except ImportError:  # orjson không bắt buộc
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+if orjson is not None:
+    def json_loads(value):
+        return orjson.loads(value)
+
+    def json_dumps(value):
+        return orjson.dumps(value).decode('utf-8')
+
+    JSON_DECODE_ERRORS = (orjson.JSONDecodeError, TypeError)
+else:
+    def json_loads(value):
+        return json.loads(value)
+
+    def json_dumps(value):
+        return json.dumps(value, ensure_ascii=False)
+
+    JSON_DECODE_ERRORS = (json.JSONDecodeError, TypeError)
+
+
+class EncodedJSON(str):
+    """Chuỗi JSON vừa đọc từ DB, chưa giải mã"""
+
+
+# Chuỗi gốc từ DB của các field đã giải mã: {attname: EncodedJSON}
+ORIGINALS_ATTR = '_json_text_originals'
+
+
+class JSONTextDescriptor(DeferredAttribute):
+    """
+    Giải mã chuỗi JSON ở lần truy cập đầu tiên và cache lại trên instance.
+    Chuỗi gốc được giữ lại để khi save nhận ra giá trị không đổi.
+    """
+
+    def __get__(self, instance, cls=None):
+        if instance is None:
+            return self
+        value = super().__get__(instance, cls)
+        if value is None or isinstance(value, EncodedJSON):
+            if value is not None:
+                instance.__dict__.setdefault(ORIGINALS_ATTR, {})[self.field.attname] = value
+            value = self.field.decode(value)
+            instance.__dict__[self.field.attname] = value
+        return value
+
+    def __set__(self, instance, value):
+        if isinstance(value, EncodedJSON):
+            # Giá trị mới từ DB (khởi tạo / refresh_from_db): bỏ chuỗi gốc cũ
+            instance.__dict__.get(ORIGINALS_ATTR, {}).pop(self.field.attname, None)
+        instance.__dict__[self.field.attname] = value
+
+
+class JSONTextField(models.TextField):
+    """
+    TextField chứa JSON (list/dict).
+
+    - Đọc từ DB: giữ nguyên chuỗi, chỉ giải mã khi truy cập field
+    - Ghi xuống DB: giá trị chưa từng truy cập, hoặc đã truy cập nhưng vẫn bằng
+      giá trị gốc, được ghi lại nguyên chuỗi cũ; chỉ giá trị thật sự đổi mới encode
+    - NULL, chuỗi rỗng hoặc JSON lỗi → giá trị rỗng (mặc định [])
+    - Giá trị rỗng ([] / {} / None) được lưu thành NULL
+    """
+    descriptor_class = JSONTextDescriptor
+
+    def __init__(self, *args, empty=list, **kwargs):
+        self.empty = empty
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.empty is not list:
+            kwargs['empty'] = self.empty
+        return name, path, args, kwargs
+
+    def decode(self, value):
+        if not value:
+            return self.empty()
+        try:
+            # orjson chỉ nhận đúng kiểu str, không nhận lớp con EncodedJSON
+            return json_loads(str(value))
+        except JSON_DECODE_ERRORS:
+            logger.warning('Invalid JSON in %s, using empty value', self)
+            return self.empty()
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return None
+        return EncodedJSON(value)
+
+    def to_python(self, value):
+        if isinstance(value, str):
+            return self.decode(value)
+        return value
+
+    def pre_save(self, model_instance, add):
+        # Đọc thẳng __dict__ để giá trị chưa truy cập không bị giải mã
+        value = model_instance.__dict__.get(self.attname)
+        if isinstance(value, EncodedJSON):
+            return value
+        original = model_instance.__dict__.get(ORIGINALS_ATTR, {}).get(self.attname)
+        if original is not None and self.decode(original) == value:
+            return original
+        return value
+
+    def get_prep_value(self, value):
+        if isinstance(value, EncodedJSON):
+            return str(value)
+        if not value:
+            return None
+        return json_dumps(value)
+
+    def value_to_string(self, obj):
+        return self.get_prep_value(self.value_from_object(obj))
@@ -0,0 +1,174 @@
+"""
+EBGreentek Image Pipeline
+Sau khi upload: đọc kích thước, tạo biến thể WebP/AVIF theo các độ rộng cấu hình, bỏ metadata
+Tạo ngày: 2025-12-13
+"""
+
+import hashlib
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlparse
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+from .models import Media, MediaVariant
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VARIANT_WIDTHS = [320, 640, 1024, 1600]
+DEFAULT_VARIANT_FORMATS = ['webp', 'avif']
+DEFAULT_VARIANT_QUALITY = {'webp': 80, 'avif': 60}
+# Số thread xử lý ảnh; 0 = xử lý ngay trong request
+DEFAULT_WORKERS = 2
+
+# Pillow nhả GIL khi resize/encode nên thread pool tận dụng được nhiều core
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_widths():
+    return sorted(getattr(settings, 'IMAGE_VARIANT_WIDTHS', DEFAULT_VARIANT_WIDTHS))
+
+
+def variant_formats():
+    """Định dạng cấu hình mà bản Pillow hiện tại encode được"""
+    formats = getattr(settings, 'IMAGE_VARIANT_FORMATS', DEFAULT_VARIANT_FORMATS)
+    return [fmt for fmt in formats if features.check(fmt)]
+
+
+def _target_widths(width):
+    """Các độ rộng ≤ ảnh gốc (không phóng to); ảnh nhỏ hơn mọi mức → giữ nguyên cỡ"""
+    widths = [target for target in variant_widths() if target < width]
+    if width <= variant_widths()[-1]:
+        widths.append(width)
+    return widths
+
+
+def _prepare(image):
+    """Frame đầu, xoay theo EXIF, đưa về RGB/RGBA"""
+    image.seek(0)
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    return image
+
+
+def _encode(image, fmt):
+    """Encode không kèm EXIF/ICC/XMP (image mới tạo, không truyền metadata)"""
+    buffer = io.BytesIO()
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', DEFAULT_VARIANT_QUALITY).get(fmt, 80)
+    image.save(buffer, format=fmt.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def process_media(media_id):
+    """Tạo lại toàn bộ biến thể cho một Media ảnh, trả về số biến thể"""
+    media = Media.objects.filter(pk=media_id).first()
+    if media is None or not media.file:
+        return 0
+
+    with media.file.open('rb') as source:
+        with Image.open(source) as original:
+            image = _prepare(original)
+            width, height = image.size
+
+            variants = []
+            for target in _target_widths(width):
+                resized = image if target == width else image.resize(
+                    (target, max(1, round(height * target / width))), Image.LANCZOS
+                )
+                for fmt in variant_formats():
+                    content = _encode(resized, fmt)
+                    variant = MediaVariant(
+                        media=media, format=fmt, width=resized.width, height=resized.height,
+                        file_size=len(content),
+                    )
+                    # Hash nội dung trong tên → URL bất biến, cache lâu được (api/media_serving.py)
+                    digest = hashlib.sha256(content).hexdigest()[:12]
+                    variant.file.save(f'{media.pk}/{target}w-{digest}.{fmt}', ContentFile(content), save=False)
+                    variants.append(variant)
+
+    with transaction.atomic():
+        if not Media.objects.select_for_update().filter(pk=media.pk).exists():
+            # Media bị xóa trong lúc đang xử lý → bỏ các file vừa tạo
+            for variant in variants:
+                variant.file.delete(save=False)
+            return 0
+        stale = [variant.file.name for variant in media.variants.all()]
+        media.variants.all().delete()
+        MediaVariant.objects.bulk_create(variants)
+        Media.objects.filter(pk=media.pk).update(width=width, height=height)
+
+    for name in set(stale) - {variant.file.name for variant in variants}:
+        MediaVariant.file.field.storage.delete(name)
+    return len(variants)
+
+
+def _run(media_id):
+    close_old_connections()
+    try:
+        process_media(media_id)
+    except Exception:
+        logger.exception('Processing image %s failed', media_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(media_id):
+    """Xử lý ảnh trên worker pool sau khi transaction hiện tại commit"""
+    workers = getattr(settings, 'IMAGE_PROCESSING_WORKERS', DEFAULT_WORKERS)
+    if not workers:
+        transaction.on_commit(lambda: _run(media_id))
+        return
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-worker')
+    transaction.on_commit(lambda: _executor.submit(_run, media_id))
+
+
+# ============================================================
+# TRA CỨU BIẾN THỂ THEO URL
+# ============================================================
+def storage_name(url):
+    """'http://host/media/uploads/a.png' → 'uploads/a.png' (None nếu không thuộc MEDIA_URL)"""
+    path = unquote(urlparse(url).path)
+    prefix = urlparse(settings.MEDIA_URL).path
+    if not path.startswith(prefix):
+        return None
+    return path[len(prefix):]
+
+
+def variant_data(variant):
+    return {
+        'url': variant.file.url,
+        'width': variant.width,
+        'height': variant.height,
+        'format': variant.format,
+    }
+
+
+def variants_for_urls(urls):
+    """{url: [biến thể]} cho nhiều URL ảnh, 2 query cho cả danh sách"""
+    names = {}
+    for url in urls:
+        name = storage_name(url) if url else None
+        if name:
+            names.setdefault(name, []).append(url)
+    if not names:
+        return {}
+
+    found = {}
+    medias = Media.objects.filter(file__in=list(names)).prefetch_related('variants').only('id', 'file')
+    for media in medias:
+        variants = [variant_data(variant) for variant in media.variants.all()]
+        for url in names[media.file.name]:
+            found[url] = variants
+    return found
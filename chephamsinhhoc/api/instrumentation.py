@@ -0,0 +1,473 @@
+"""
+EBGreentek Instrumentation
+Đo từng request theo route: độ trễ (histogram), số query + thời gian DB, query lặp (N+1),
+thời gian serializer; profiler lấy mẫu bật theo header; /api/_metrics dạng Prometheus
+Tạo ngày: 2025-12-21
+"""
+
+import bisect
+import contextlib
+import contextvars
+import hmac
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, HttpResponse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DEFAULT_DUPLICATE_QUERY_THRESHOLD = 5  # cùng một câu SQL ≥ n lần trong 1 request → nghi N+1
+DEFAULT_PROFILE_INTERVAL = 0.005  # giây giữa hai mẫu
+DEFAULT_PROFILE_HEADER = 'HTTP_X_PROFILE'
+METRIC_PREFIX = 'ebgreentek'
+
+# Số liệu của request đang chạy trong context hiện tại
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+# ============================================================
+# SỐ LIỆU
+# ============================================================
+class Histogram:
+    """Histogram kiểu Prometheus: đếm theo bucket cố định + tổng + số lần"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # phần tử cuối: > bucket lớn nhất
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(le, số quan sát ≤ le)], kết thúc bằng '+Inf'"""
+        total = 0
+        result = []
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class RouteMetrics:
+    def __init__(self, buckets):
+        self.latency = Histogram(buckets)
+        self.statuses = Counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.duplicate_queries = 0  # số lần chạy thừa của các câu SQL lặp
+        self.n_plus_one_requests = 0
+        self.serializer_seconds = 0.0
+
+
+class MetricsRegistry:
+    """Số liệu theo (method, route) trong process; mỗi worker có bộ số liệu riêng"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    @property
+    def buckets(self):
+        return getattr(settings, 'INSTRUMENTATION_LATENCY_BUCKETS', DEFAULT_LATENCY_BUCKETS)
+
+    def record(self, method, route, status_code, seconds, stats):
+        with self._lock:
+            metrics = self._routes.get((method, route))
+            if metrics is None:
+                metrics = self._routes[(method, route)] = RouteMetrics(self.buckets)
+            metrics.latency.observe(seconds)
+            metrics.statuses[status_code] += 1
+            metrics.queries += stats.queries
+            metrics.query_seconds += stats.query_seconds
+            metrics.serializer_seconds += stats.serializer_seconds
+            duplicates = stats.duplicates()
+            if duplicates:
+                metrics.n_plus_one_requests += 1
+                metrics.duplicate_queries += sum(count - 1 for count in duplicates.values())
+
+    def snapshot(self):
+        """[(method, route, RouteMetrics)] — bản chụp để render ngoài lock"""
+        with self._lock:
+            return [
+                (method, route, _copy_route(metrics))
+                for (method, route), metrics in sorted(self._routes.items())
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+
+def _copy_route(metrics):
+    copy = RouteMetrics(metrics.latency.buckets)
+    copy.latency.counts = list(metrics.latency.counts)
+    copy.latency.sum = metrics.latency.sum
+    copy.latency.count = metrics.latency.count
+    copy.statuses = Counter(metrics.statuses)
+    for name in ('queries', 'query_seconds', 'duplicate_queries', 'n_plus_one_requests', 'serializer_seconds'):
+        setattr(copy, name, getattr(metrics, name))
+    return copy
+
+
+metrics_registry = MetricsRegistry()
+
+
+class RequestStats:
+    """Số liệu của một request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements = Counter()
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+    def duplicates(self):
+        threshold = getattr(settings, 'INSTRUMENTATION_DUPLICATE_QUERY_THRESHOLD', DEFAULT_DUPLICATE_QUERY_THRESHOLD)
+        return {sql: count for sql, count in self.statements.items() if count >= threshold}
+
+
+def current_stats():
+    return _current.get()
+
+
+# ============================================================
+# DB + SERIALIZER
+# ============================================================
+def _query_wrapper(execute, sql, params, many, context):
+    """connection.execute_wrapper: SQL còn placeholder nên N+1 (khác tham số) gom về cùng một câu"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+        stats.statements[sql] += 1
+
+
+def _timed_serializer(func):
+    """Chỉ tính serializer ngoài cùng; serializer lồng nhau đã nằm trong thời gian của nó"""
+    def wrapper(self, *args, **kwargs):
+        stats = _current.get()
+        if stats is None or stats.serializer_depth:
+            return func(self, *args, **kwargs)
+        stats.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            stats.serializer_seconds += time.perf_counter() - started
+            stats.serializer_depth -= 1
+    wrapper.instrumented = True
+    return wrapper
+
+
+def install_serializer_timing():
+    """
+    Bọc BaseSerializer.data và is_valid() của DRF (Serializer/ListSerializer gọi qua super()).
+    Chỉ gọi khi bật instrumentation; ngoài request thì wrapper gọi thẳng hàm gốc.
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer.data.fget, 'instrumented', False):
+        return
+    BaseSerializer.data = property(_timed_serializer(BaseSerializer.data.fget))
+    BaseSerializer.is_valid = _timed_serializer(BaseSerializer.is_valid)
+
+
+# ============================================================
+# PROFILER LẤY MẪU
+# ============================================================
+class SamplingProfiler:
+    """
+    Lấy stack của thread đang xử lý request mỗi `interval` giây từ một thread phụ
+    (không dùng sys.setprofile nên request chỉ chậm đi rất ít). Kết quả: "collapsed
+    stacks" (func;func;func số-mẫu) cho flamegraph.pl / speedscope.
+    """
+
+    def __init__(self, interval=None):
+        self.interval = interval or getattr(settings, 'INSTRUMENTATION_PROFILE_INTERVAL', DEFAULT_PROFILE_INTERVAL)
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id=None):
+        target = thread_id or threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, args=(target,), name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def _sample(self, target):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                return
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.samples
+
+    def folded(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.samples.most_common())
+
+
+def profile_requested(request):
+    """Header X-Profile phải khớp INSTRUMENTATION_PROFILE_TOKEN (không đặt token = tắt)"""
+    token = getattr(settings, 'INSTRUMENTATION_PROFILE_TOKEN', None)
+    header = getattr(settings, 'INSTRUMENTATION_PROFILE_HEADER', DEFAULT_PROFILE_HEADER)
+    value = request.META.get(header)
+    return bool(token and value and hmac.compare_digest(value, token))
+
+
+def save_profile(profiler, route):
+    directory = getattr(settings, 'INSTRUMENTATION_PROFILE_DIR',
+                        os.path.join(tempfile.gettempdir(), 'ebgreentek-profiles'))
+    os.makedirs(directory, exist_ok=True)
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+    name = f'{time.strftime("%Y%m%d-%H%M%S")}-{slug}-{threading.get_ident()}.folded'
+    with open(os.path.join(directory, name), 'w') as output:
+        output.write(profiler.folded())
+    return name
+
+
+# ============================================================
+# MIDDLEWARE
+# ============================================================
+ROUTE_GROUP_RE = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+
+
+def route_label(request):
+    """Mẫu URL đã khớp ('api/products/{pk}/'), không dùng path thật để số nhãn không phình"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None or match.route is None:
+        return 'unmatched'
+    return ROUTE_GROUP_RE.sub(r'{\1}', match.route).replace('^', '').replace('$', '')
+
+
+class InstrumentationMiddleware:
+    """
+    Đặt sớm trong MIDDLEWARE. INSTRUMENTATION_ENABLED = False → Django bỏ middleware
+    (MiddlewareNotUsed), không còn chi phí nào.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTATION_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        install_serializer_timing()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        profiler = None
+        if profile_requested(request):
+            profiler = SamplingProfiler()
+            profiler.start()
+        started = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_query_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+            if profiler is not None:
+                # View lỗi cũng phải dừng thread lấy mẫu
+                profiler.stop()
+        elapsed = time.perf_counter() - started
+
+        route = route_label(request)
+        metrics_registry.record(request.method, route, response.status_code, elapsed, stats)
+        self.report_duplicates(request, route, stats)
+        if profiler is not None:
+            response['X-Profile-Samples'] = str(sum(profiler.samples.values()))
+            response['X-Profile-File'] = save_profile(profiler, route)
+        if getattr(settings, 'INSTRUMENTATION_SERVER_TIMING', settings.DEBUG):
+            response['Server-Timing'] = (
+                f'total;dur={elapsed * 1000:.1f}, db;dur={stats.query_seconds * 1000:.1f};desc="{stats.queries} queries", '
+                f'serializer;dur={stats.serializer_seconds * 1000:.1f}'
+            )
+        return response
+
+    @staticmethod
+    def report_duplicates(request, route, stats):
+        if not logger.isEnabledFor(logging.WARNING):
+            return
+        for sql, count in stats.duplicates().items():
+            logger.warning('Possible N+1: query repeated %d times', count, extra={
+                'method': request.method, 'route': route, 'sql': sql[:300],
+            })
+
+
+# ============================================================
+# PROMETHEUS
+# ============================================================
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+
+class PrometheusWriter:
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text):
+        self.lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+        self.lines.append(f'# TYPE {METRIC_PREFIX}_{name} {kind}')
+
+    def sample(self, name, value, **labels):
+        self.lines.append(f'{METRIC_PREFIX}_{name}{_labels(**labels) if labels else ""} {value}')
+
+    def text(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def render_prometheus():
+    """Toàn bộ số liệu của process dạng text exposition 0.0.4"""
+    writer = PrometheusWriter()
+    routes = metrics_registry.snapshot()
+
+    writer.family('http_request_duration_seconds', 'histogram', 'Request latency by route')
+    for method, route, metrics in routes:
+        for bound, count in metrics.latency.cumulative():
+            writer.sample('http_request_duration_seconds_bucket', count, method=method, route=route, le=bound)
+        writer.sample('http_request_duration_seconds_sum', metrics.latency.sum, method=method, route=route)
+        writer.sample('http_request_duration_seconds_count', metrics.latency.count, method=method, route=route)
+
+    writer.family('http_requests_total', 'counter', 'Requests by route and status code')
+    for method, route, metrics in routes:
+        for code, count in sorted(metrics.statuses.items()):
+            writer.sample('http_requests_total', count, method=method, route=route, status=code)
+
+    per_route = (
+        ('db_queries_total', 'queries', 'SQL statements executed'),
+        ('db_query_seconds_total', 'query_seconds', 'Time spent executing SQL'),
+        ('db_duplicate_queries_total', 'duplicate_queries', 'Repeated executions of identical SQL (N+1 suspects)'),
+        ('db_n_plus_one_requests_total', 'n_plus_one_requests', 'Requests with at least one repeated SQL statement'),
+        ('serializer_seconds_total', 'serializer_seconds', 'Time spent in DRF serializers'),
+    )
+    for name, attribute, help_text in per_route:
+        writer.family(name, 'counter', help_text)
+        for method, route, metrics in routes:
+            writer.sample(name, getattr(metrics, attribute), method=method, route=route)
+
+    for collect in COLLECTORS:
+        collect(writer)
+    return writer.text()
+
+
+def collect_db_pool(writer):
+    from .db.pool import pool_stats
+
+    pools = pool_stats()
+    gauges = ('size', 'in_use', 'idle', 'max_size')
+    counters = ('created', 'recycled', 'health_check_failures', 'waits', 'timeouts', 'checkouts',
+                'checkout_seconds_total')
+    for name in gauges:
+        writer.family(f'db_pool_{name}', 'gauge', f'Connection pool {name.replace("_", " ")}')
+        for alias, stats in sorted(pools.items()):
+            writer.sample(f'db_pool_{name}', stats[name], database=alias)
+    for name in counters:
+        metric = name if name.endswith('_total') else f'{name}_total'
+        writer.family(f'db_pool_{metric}', 'counter', f'Connection pool {name.replace("_", " ")}')
+        for alias, stats in sorted(pools.items()):
+            writer.sample(f'db_pool_{metric}', stats[name], database=alias)
+
+
+def collect_replicas(writer):
+    from .db.router import replica_monitor
+
+    stats = replica_monitor.stats()
+    writer.family('replica_lag_seconds', 'gauge', 'Last measured replica lag (+Inf = unavailable)')
+    for alias, lag in sorted(stats['replicas'].items()):
+        writer.sample('replica_lag_seconds', '+Inf' if lag == float('inf') else lag, database=alias)
+    writer.family('replica_reads_total', 'counter', 'Requests routed to a replica')
+    writer.sample('replica_reads_total', stats['replica_reads'])
+    writer.family('replica_primary_fallbacks_total', 'counter', 'Replica-eligible requests served by the primary')
+    writer.sample('replica_primary_fallbacks_total', stats['primary_fallbacks'])
+
+
+def collect_caches(writer):
+    from .authentication import user_cache
+    from .reference_cache import reference_cache
+
+    caches = (('reference', reference_cache), ('user', user_cache))
+    writer.family('local_cache_hits_total', 'counter', 'In-process cache hits')
+    for name, cache in caches:
+        writer.sample('local_cache_hits_total', cache.hits, cache=name)
+    writer.family('local_cache_misses_total', 'counter', 'In-process cache misses')
+    for name, cache in caches:
+        writer.sample('local_cache_misses_total', cache.misses, cache=name)
+
+
+def collect_login(writer):
+    from .login_throttle import login_throttle
+
+    stats = login_throttle.stats()
+    writer.family('login_hashing', 'gauge', 'Password hashes in progress')
+    writer.sample('login_hashing', stats.pop('hashing'))
+    for name, value in stats.items():
+        metric = name if name.endswith('_total') else f'{name}_total'
+        writer.family(f'login_{metric}', 'counter', f'Login {name.replace("_", " ")}')
+        writer.sample(f'login_{metric}', value)
+
+
+# Thêm collector mới: hàm nhận PrometheusWriter
+COLLECTORS = [collect_db_pool, collect_replicas, collect_caches, collect_login]
+
+
+def metrics_view(request):
+    """
+    GET /api/_metrics cho Prometheus, header "Authorization: Bearer <METRICS_TOKEN>".
+    Không dựa vào REMOTE_ADDR: sau reverse proxy mọi request đều đến từ 127.0.0.1.
+    Không đặt token = tắt (404).
+    """
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    scheme, _, value = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if not (token and scheme.lower() == 'bearer' and hmac.compare_digest(value.strip(), token)):
+        raise Http404
+    return HttpResponse(render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# ============================================================
+# LOGGING
+# ============================================================
+_RECORD_FIELDS = set(logging.makeLogRecord({}).__dict__) | {'message', 'asctime'}
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Formatter nối các field truyền qua extra={...} vào cuối dòng dạng key=value"""
+
+    def format(self, record):
+        line = super().format(record)
+        fields = {key: value for key, value in record.__dict__.items() if key not in _RECORD_FIELDS}
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value!r}' for key, value in sorted(fields.items()))
+        return line
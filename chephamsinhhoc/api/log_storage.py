@@ -0,0 +1,190 @@
+"""
+EBGreentek Activity Log Storage
+Rollup theo ngày, archive log cũ ra file JSONL nén gzip theo ngày
+Tạo ngày: 2025-12-10
+"""
+
+import datetime
+import gzip
+import json
+import os
+from collections import Counter
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .cache import bump_generation
+from .models import ActivityLog, ActivityLogRollup
+
+DEFAULT_RETENTION_DAYS = 180
+DEFAULT_ARCHIVE_CHUNK_SIZE = 5000
+
+ARCHIVE_FIELDS = [
+    'id', 'user_id', 'action', 'entity_type', 'entity_id',
+    'description', 'ip_address', 'user_agent', 'created_at',
+]
+
+
+def archive_dir():
+    return str(getattr(settings, 'ACTIVITY_LOG_ARCHIVE_DIR',
+                       os.path.join(settings.BASE_DIR, 'archive', 'activity_logs')))
+
+
+def day_start(day):
+    """00:00 của ngày (theo TIME_ZONE) dạng datetime aware"""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+# ============================================================
+# ROLLUP
+# ============================================================
+def rollup_user_key(user_id):
+    """Giá trị cột unique user_key: user_id, hoặc 0 cho log không có user"""
+    return user_id or 0
+
+
+def add_to_rollups(logs):
+    """Cộng dồn các log vừa ghi vào rollup (gọi sau bulk_create)"""
+    counts = Counter(
+        (timezone.localdate(log.created_at), log.action, log.user_id) for log in logs
+    )
+    for (day, action, user_id), count in counts.items():
+        user_key = rollup_user_key(user_id)
+        rollups = ActivityLogRollup.objects.filter(day=day, action=action, user_key=user_key)
+        if rollups.update(count=F('count') + count):
+            continue
+        try:
+            with transaction.atomic():
+                ActivityLogRollup.objects.create(
+                    day=day, action=action, user_id=user_id, user_key=user_key, count=count
+                )
+        except IntegrityError:
+            # Worker khác vừa tạo dòng này
+            rollups.update(count=F('count') + count)
+    if counts:
+        bump_generation(ActivityLogRollup)
+
+
+def rebuild_rollups(first_day, last_day):
+    """
+    Tính lại rollup [first_day, last_day] từ log gốc.
+    Chỉ dùng cho ngày chưa archive (log gốc còn đủ).
+    """
+    rows = (
+        ActivityLog.objects
+        .filter(created_at__gte=day_start(first_day),
+                created_at__lt=day_start(last_day + datetime.timedelta(days=1)))
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'action', 'user_id')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    rollups = [ActivityLogRollup(**row, user_key=rollup_user_key(row['user_id'])) for row in rows]
+    with transaction.atomic():
+        stale = ActivityLogRollup.objects.filter(day__gte=first_day, day__lte=last_day)
+        stale._raw_delete(stale.db)
+        ActivityLogRollup.objects.bulk_create(rollups, batch_size=1000)
+    bump_generation(ActivityLogRollup)
+    return len(rollups)
+
+
+def summarize(first_day, last_day):
+    """Thống kê [first_day, last_day] chỉ từ bảng rollup"""
+    rollups = ActivityLogRollup.objects.filter(day__gte=first_day, day__lte=last_day)
+    by_action = {
+        row['action']: row['total']
+        for row in rollups.values('action').annotate(total=Sum('count')).order_by('-total')
+    }
+    by_user = list(
+        rollups.exclude(user_id=None)
+        .values('user_id', username=F('user__username'))
+        .annotate(total=Sum('count'))
+        .order_by('-total')
+    )
+    by_day = list(rollups.values('day').annotate(total=Sum('count')).order_by('day'))
+    return {
+        'from': first_day,
+        'to': last_day,
+        'total': sum(by_action.values()),
+        'by_action': by_action,
+        'by_user': by_user,
+        'by_day': by_day,
+    }
+
+
+# ============================================================
+# ARCHIVE
+# ============================================================
+def segment_path(day, directory=None):
+    """archive/activity_logs/YYYY/MM/YYYY-MM-DD.jsonl.gz"""
+    return os.path.join(directory or archive_dir(), f'{day:%Y}', f'{day:%m}', f'{day:%Y-%m-%d}.jsonl.gz')
+
+
+def _write_segment(path, rows):
+    """Ghi thêm một gzip member vào segment; gzip.open đọc liền các member"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'ab') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='ab') as segment:
+            for row in rows:
+                segment.write((json.dumps(row, ensure_ascii=False, default=str) + '\n').encode('utf-8'))
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_logs(before_day, directory=None, chunk_size=DEFAULT_ARCHIVE_CHUNK_SIZE, dry_run=False):
+    """
+    Chuyển log trước ngày before_day ra segment theo ngày, lần lượt từng ngày:
+    1. tính lại rollup của ngày từ log gốc (lúc này log của ngày còn đủ)
+    2. ghi log của ngày vào segment, mỗi lần chunk_size dòng (fsync)
+    3. xóa log của ngày bằng một câu DELETE
+    Một ngày hoặc còn nguyên log, hoặc đã xóa hết → chạy lại luôn cho rollup đúng;
+    dừng giữa chừng có thể trùng vài dòng trong segment (trùng id).
+    Trả về {ngày: số dòng}.
+    """
+    cutoff = day_start(before_day)
+    days = sorted(set(
+        ActivityLog.objects.filter(created_at__lt=cutoff)
+        .annotate(day=TruncDate('created_at')).values_list('day', flat=True).order_by()
+    ))
+
+    archived = Counter()
+    for day in days:
+        day_logs = ActivityLog.objects.filter(
+            created_at__gte=day_start(day),
+            created_at__lt=day_start(day + datetime.timedelta(days=1)),
+        )
+        if not dry_run:
+            rebuild_rollups(day, day)
+
+        last_id = 0
+        while True:
+            chunk = list(day_logs.filter(id__gt=last_id).order_by('id').values(*ARCHIVE_FIELDS)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1]['id']
+            if not dry_run:
+                _write_segment(segment_path(day, directory), chunk)
+            archived[day] += len(chunk)
+
+        if last_id and not dry_run:
+            # _raw_delete: một câu DELETE, không load object / phát post_delete từng dòng.
+            # id <= last_id: không xóa log ghi thêm sau khi quét (chưa vào segment)
+            done = day_logs.filter(id__lte=last_id)
+            done._raw_delete(done.db)
+
+    if archived and not dry_run:
+        bump_generation(ActivityLog)
+    return dict(archived)
+
+
+def retention_days():
+    return getattr(settings, 'ACTIVITY_LOG_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+
+
+def oldest_log_day():
+    """Ngày của log gốc cũ nhất còn trong DB (None nếu trống)"""
+    first = ActivityLog.objects.order_by('created_at').values_list('created_at', flat=True).first()
+    return timezone.localdate(first) if first else None
@@ -0,0 +1,223 @@
+"""
+EBGreentek Login Throttle
+Chặn đăng nhập dồn dập trước khi tới bước hash mật khẩu (PBKDF2 tốn CPU):
+token bucket theo IP + username, loại user không tồn tại / bị khóa trước khi hash,
+giới hạn số lần hash chạy đồng thời trong mỗi worker,
+IP client chỉ đọc X-Forwarded-For từ proxy tin cậy (TRUSTED_PROXIES)
+Tạo ngày: 2025-12-20
+"""
+
+import contextlib
+import ipaddress
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils.module_loading import import_string
+
+# scope → (sức chứa bucket, số giây để nạp đầy lại)
+DEFAULT_RATES = {
+    'ip': (20, 60),
+    'username': (5, 60),
+}
+DEFAULT_STORE = 'api.login_throttle.LocalBucketStore'
+DEFAULT_MAX_KEYS = 10000
+DEFAULT_HASH_CONCURRENCY = 2  # số lần hash song song mỗi worker
+DEFAULT_HASH_WAIT = 2  # giây chờ lượt hash trước khi trả 503
+
+
+# ============================================================
+# CLIENT IP
+# ============================================================
+def _is_trusted(ip, networks):
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def client_ip(request):
+    """
+    IP của client để đếm bucket / ghi log.
+    X-Forwarded-For do client tự gửi được: chỉ đọc khi REMOTE_ADDR là proxy khai báo ở
+    TRUSTED_PROXIES, và lấy địa chỉ phải nhất không thuộc proxy tin cậy (địa chỉ bên trái
+    là client tự điền). Không khai báo proxy → luôn dùng REMOTE_ADDR.
+    """
+    remote = request.META.get('REMOTE_ADDR')
+    networks = [ipaddress.ip_network(proxy, strict=False) for proxy in getattr(settings, 'TRUSTED_PROXIES', ())]
+    if not networks or not _is_trusted(remote, networks):
+        return remote
+
+    forwarded = [ip.strip() for ip in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if ip.strip()]
+    for ip in reversed(forwarded):
+        if not _is_trusted(ip, networks):
+            return ip
+    return forwarded[0] if forwarded else remote
+
+
+# ============================================================
+# STORE
+# ============================================================
+class LocalBucketStore:
+    """
+    Token bucket trong bộ nhớ process (mỗi worker đếm riêng). Store khác (vd. Redis dùng
+    chung giữa các worker) chỉ cần cùng giao diện take()/reset(), khai báo ở
+    LOGIN_THROTTLE_STORE.
+    Giữ tối đa LOGIN_THROTTLE_MAX_KEYS bucket, bỏ bucket lâu không dùng nhất.
+    """
+
+    def __init__(self, max_keys=None):
+        self.max_keys = max_keys or getattr(settings, 'LOGIN_THROTTLE_MAX_KEYS', DEFAULT_MAX_KEYS)
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()  # key → (số token, cập nhật lúc)
+
+    def take(self, key, capacity, period):
+        """Lấy 1 token → 0 nếu được phép, ngược lại số giây phải chờ"""
+        rate = capacity / period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+# ============================================================
+# THROTTLE
+# ============================================================
+class LoginThrottle:
+    """Ba lớp chặn cho login_view, kèm số liệu (stats())"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._store = None
+        self._gate = None
+        self.hashing = 0
+        self.counters = {
+            'attempts': 0,
+            'throttled_ip': 0,
+            'throttled_username': 0,
+            'rejected_before_hash': 0,
+            'gate_timeouts': 0,
+            'hashes': 0,
+            'successes': 0,
+            'failures': 0,
+        }
+        self.hash_seconds_total = 0.0
+        self.gate_wait_seconds_total = 0.0
+
+    @property
+    def store(self):
+        if self._store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = import_string(getattr(settings, 'LOGIN_THROTTLE_STORE', DEFAULT_STORE))()
+        return self._store
+
+    @property
+    def gate(self):
+        if self._gate is None:
+            with self._lock:
+                if self._gate is None:
+                    size = getattr(settings, 'LOGIN_HASH_CONCURRENCY', DEFAULT_HASH_CONCURRENCY)
+                    self._gate = threading.BoundedSemaphore(size)
+        return self._gate
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    @staticmethod
+    def username_key(username):
+        # Cùng một tài khoản dù gõ hoa/thường, thêm khoảng trắng
+        return 'username:' + username.strip().lower()
+
+    def allow(self, ip, username):
+        """0 nếu được thử đăng nhập, ngược lại số giây phải chờ (trả về Retry-After)"""
+        self.count('attempts')
+        rates = {**DEFAULT_RATES, **getattr(settings, 'LOGIN_THROTTLE_RATES', {})}
+        wait = self.store.take(f'ip:{ip}', *rates['ip'])
+        if wait:
+            self.count('throttled_ip')
+            return wait
+        wait = self.store.take(self.username_key(username), *rates['username'])
+        if wait:
+            self.count('throttled_username')
+        return wait
+
+    def may_login(self, username):
+        """
+        Kiểm tra rẻ (1 query theo cột unique) trước khi hash: user không tồn tại / bị khóa
+        thì không bao giờ đăng nhập được, không cần chạy PBKDF2.
+        """
+        model = get_user_model()
+        fields = ['is_active']
+        if any(field.name == 'status' for field in model._meta.concrete_fields):
+            fields.append('status')
+        row = model._default_manager.filter(**{model.USERNAME_FIELD: username}).values(*fields).first()
+        if row is None or not row['is_active'] or row.get('status', 'active') != 'active':
+            self.count('rejected_before_hash')
+            return False
+        return True
+
+    @contextlib.contextmanager
+    def hash_slot(self):
+        """Chờ tối đa LOGIN_HASH_WAIT giây để được hash; yield False nếu hết lượt"""
+        started = time.monotonic()
+        acquired = self.gate.acquire(timeout=getattr(settings, 'LOGIN_HASH_WAIT', DEFAULT_HASH_WAIT))
+        waited = time.monotonic() - started
+        if not acquired:
+            self.count('gate_timeouts')
+            yield False
+            return
+        with self._lock:
+            self.hashing += 1
+            self.gate_wait_seconds_total += waited
+        started = time.monotonic()
+        try:
+            yield True
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.hashing -= 1
+                self.counters['hashes'] += 1
+                self.hash_seconds_total += elapsed
+            self.gate.release()
+
+    def succeeded(self, username):
+        """Đăng nhập đúng → trả lại bucket username (IP vẫn tính)"""
+        self.count('successes')
+        self.store.reset(self.username_key(username))
+
+    def failed(self):
+        self.count('failures')
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self.counters,
+                'hashing': self.hashing,
+                'hash_seconds_total': self.hash_seconds_total,
+                'gate_wait_seconds_total': self.gate_wait_seconds_total,
+            }
+
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,118 @@
+"""Sinh dữ liệu giả + helper đo cho benchmark_api (không phải management command)"""
+
+import datetime
+import os
+import random
+import statistics
+import time
+
+from django.db import connection
+from django.utils import timezone
+
+from api.models import ActivityLog, Article, Product, Setting
+
+WORDS = (
+    'chế phẩm sinh học vi sinh xử lý nước thải ao nuôi tôm cá phân bón hữu cơ '
+    'cây trồng đất chăn nuôi men tiêu hóa khử mùi chuồng trại enzyme lợi khuẩn '
+    'hướng dẫn sử dụng liều lượng hiệu quả an toàn môi trường nông nghiệp'
+).split()
+
+
+def sentence(rng, length):
+    return ' '.join(rng.choice(WORDS) for _ in range(length))
+
+
+def seed_catalogue(products, articles, seed=42, content_words=800):
+    """Sinh sản phẩm/bài viết giả bằng bulk_create (không chạy signals)"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    Product.objects.bulk_create([
+        Product(name=sentence(rng, 4), category=rng.choice(WORDS), description=sentence(rng, 80),
+                images=['/media/uploads/a.png', '/media/uploads/b.png'],
+                features=[sentence(rng, 5), sentence(rng, 5)],
+                is_popular=rng.random() < 0.1)
+        for _ in range(products)
+    ], batch_size=500)
+    Article.objects.bulk_create([
+        Article(title=sentence(rng, 8), category=rng.choice(WORDS), excerpt=sentence(rng, 60),
+                content=sentence(rng, content_words), status='published', is_featured=rng.random() < 0.05,
+                published_at=now - datetime.timedelta(minutes=rng.randrange(365 * 1440)),
+                tags=['vi sinh', 'nông nghiệp'])
+        for _ in range(articles)
+    ], batch_size=500)
+
+
+ACTIONS = ('login', 'logout', 'create', 'update', 'delete', 'upload_image', 'reply_contact')
+ENTITY_TYPES = ('product', 'article', 'contact', 'setting', 'media')
+
+
+def seed_activity_logs(count, user_ids=(), days=365, seed=42, batch_size=5000):
+    """Sinh activity log giả rải đều trong `days` ngày gần nhất (bulk_create theo lô)"""
+    rng = random.Random(seed)
+    now = timezone.now()
+    users = list(user_ids) + [None]
+    for start in range(0, count, batch_size):
+        ActivityLog.objects.bulk_create([
+            ActivityLog(user_id=rng.choice(users), action=rng.choice(ACTIONS),
+                        entity_type=rng.choice(ENTITY_TYPES), entity_id=str(rng.randrange(100000)),
+                        description=sentence(rng, 8), ip_address=f'10.0.{rng.randrange(256)}.{rng.randrange(256)}',
+                        created_at=now - datetime.timedelta(seconds=rng.randrange(days * 86400)))
+            for _ in range(min(batch_size, count - start))
+        ], batch_size=batch_size)
+
+
+# ============================================================
+# SO SÁNH ĐƯỜNG CŨ / MỚI
+# ============================================================
+def measure(func, repeat):
+    """Chạy func repeat lần → (kết quả lần cuối, {mean_ms, p50_ms, p99_ms, queries_per_call})"""
+    executed = []
+
+    def wrapper(execute, sql, params, many, context):
+        executed.append(sql)
+        return execute(sql, params, many, context)
+
+    timings = []
+    result = None
+    with connection.execute_wrapper(wrapper):
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return result, {
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p99_ms': round(timings[min(len(timings) - 1, int(len(timings) * 0.99))], 3),
+        'queries_per_call': round(len(executed) / repeat, 2),
+    }
+
+
+def compare_stats(old, new):
+    """Chênh lệch đường mới so với đường cũ"""
+    delta = {
+        'speedup': round(old['mean_ms'] / new['mean_ms'], 2) if new['mean_ms'] else None,
+        'mean_ms_saved': round(old['mean_ms'] - new['mean_ms'], 3),
+        'queries_saved': round(old['queries_per_call'] - new['queries_per_call'], 2),
+    }
+    for key in ('bytes', 'disk_bytes'):
+        if old.get(key):
+            delta[f'{key}_saved_pct'] = round(100 * (1 - new[key] / old[key]), 1)
+    return delta
+
+
+def update_or_create_each(values):
+    """Cách cũ của settings bulk_update: update_or_create từng key, không transaction"""
+    for key, value in values.items():
+        group = key.split('.')[0] if '.' in key else 'general'
+        Setting.objects.update_or_create(
+            setting_key=key,
+            defaults={'setting_value': value, 'setting_group': group, 'is_public': True},
+        )
+
+
+def disk_usage(root):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, files in os.walk(root) for name in files
+    )
@@ -0,0 +1,31 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.log_storage import DEFAULT_ARCHIVE_CHUNK_SIZE, archive_dir, archive_logs, retention_days
+
+
+class Command(BaseCommand):
+    help = 'Chuyển activity log cũ hơn N ngày ra file JSONL nén gzip (theo ngày) và xóa khỏi DB'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Giữ lại N ngày gần nhất (mặc định ACTIVITY_LOG_RETENTION_DAYS)')
+        parser.add_argument('--output', default=None, help='Thư mục archive (mặc định ACTIVITY_LOG_ARCHIVE_DIR)')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_ARCHIVE_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ đếm, không ghi file/xóa')
+
+    def handle(self, *args, **options):
+        days = options['days'] if options['days'] is not None else retention_days()
+        before_day = timezone.localdate() - datetime.timedelta(days=days)
+        directory = options['output'] or archive_dir()
+
+        archived = archive_logs(before_day, directory=directory,
+                                chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        for day, count in sorted(archived.items()):
+            self.stdout.write(f'{day}: {count}')
+        verb = 'Would archive' if options['dry_run'] else 'Archived'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {sum(archived.values())} logs before {before_day} into {directory}'
+        ))
@@ -0,0 +1,436 @@
+import datetime
+import functools
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User as AuthUser
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from django.utils import timezone
+from PIL import Image
+from rest_framework import filters
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api.activity_log import activity_log_writer
+from api.authentication import ClaimsRefreshToken, user_cache
+from api.models import Article, Category, Product, Setting, User
+from api.reference_cache import reference_cache
+from api.search import rebuild_index, search
+from api.serializers import ArticleSerializer, ProductSerializer
+from api.settings_registry import apply_settings, settings_registry
+from api.stats import reconcile_totals
+from api.storage import ContentAddressedStorage
+from api.view_counter import view_counter
+from api.views import ArticleViewSet, ProductViewSet
+
+from ._benchmark import (
+    compare_stats, disk_usage, measure, seed_activity_logs, seed_catalogue, update_or_create_each,
+)
+
+# Khối lượng ở --scale 1
+VOLUMES = {'products': 10000, 'articles': 50000, 'activity_logs': 1000000}
+BENCHMARK_USER = 'benchmark'
+BENCHMARK_PASSWORD = 'benchmark-password'
+SEARCH_QUERIES = ['vi sinh', 'xử lý nước thải', 'phân bón hữu cơ', 'men tiêu hóa', 'chăn nuôi']
+SEARCH_LIMIT = 10
+
+# So sánh list: (case, viewset, action, serializer đầy đủ trước khi có list projection)
+LIST_PAYLOAD_ENDPOINTS = [
+    ('products_list', ProductViewSet, 'list', ProductSerializer),
+    ('products_popular', ProductViewSet, 'popular', ProductSerializer),
+    ('articles_list', ArticleViewSet, 'list', ArticleSerializer),
+    ('articles_featured', ArticleViewSet, 'featured', ArticleSerializer),
+]
+SETTINGS_KEYS = 300  # số key mỗi lần bulk_update
+SETTINGS_REPEAT = 10  # mỗi lần ghi SETTINGS_KEYS key → đo ít lần hơn endpoint
+# Upload trùng: DEDUP_FILES ảnh khác nhau, mỗi ảnh upload DEDUP_COPIES lần
+DEDUP_FILES = 100
+DEDUP_COPIES = 5
+DEDUP_SIZE_KB = 64
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=settings.BASE_DIR, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def png_bytes(index):
+    """Ảnh PNG nhỏ, mỗi index một nội dung khác (upload không bị gộp với ảnh đã có)"""
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), (index % 256, index // 256 % 256, 90)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = ('Benchmark các endpoint chính trên database test riêng (test_<NAME>, SQLite: trong bộ nhớ): '
+            'throughput, p50/p99, số query; so sánh đường cũ/mới của search, list projection, '
+            'settings bulk update, media dedup; ghi kết quả JSON để so sánh giữa các commit')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Nhân khối lượng dữ liệu (1 = 10k sản phẩm, 50k bài viết, 1M activity log)')
+        parser.add_argument('--repeat', type=int, default=50, help='Số request đo cho mỗi endpoint')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--login-repeat', type=int, default=10,
+                            help='Số request login (mỗi lần chạy PBKDF2 đầy đủ)')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Chỉ chạy endpoint / so sánh này (lặp lại được)')
+        parser.add_argument('--output', help='File JSON kết quả (mặc định .benchmarks/<thời gian>-<commit>.json)')
+        parser.add_argument('--keepdb', action='store_true',
+                            help='Giữ database test giữa các lần chạy (MariaDB), không seed lại nếu đã có dữ liệu')
+
+    def handle(self, *args, **options):
+        volumes = {name: int(count * options['scale']) for name, count in VOLUMES.items()}
+        workdir = tempfile.mkdtemp(prefix='api-benchmark-')
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False, keepdb=options['keepdb'])
+        try:
+            # Cache/media/spool riêng: không lẫn response cache và generation với site thật
+            with override_settings(
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                    'LOCATION': 'api-benchmark'}},
+                MEDIA_ROOT=os.path.join(workdir, 'media'),
+                ACTIVITY_LOG_SPOOL_DIR=os.path.join(workdir, 'spool'),
+                IMAGE_PROCESSING_WORKERS=0,
+                # Biến thể ảnh tạo nền ngoài request ở production → không tính vào upload_image
+                IMAGE_VARIANT_FORMATS=[],
+                LOGIN_THROTTLE_RATES={'ip': (10 ** 9, 1), 'username': (10 ** 9, 1)},
+                INSTRUMENTATION_PROFILE_TOKEN=None,
+            ):
+                for local_cache in (reference_cache, user_cache):
+                    local_cache.clear()
+                settings_registry.invalidate()
+                seed_seconds = self.seed(volumes, options['keepdb'])
+                results = self.run(options)
+                # Ghi xong log / lượt xem của các request trước: so sánh chạy trong transaction
+                activity_log_writer.flush()
+                view_counter.flush()
+                comparisons = self.compare(options, workdir)
+        finally:
+            teardown_databases(old_config, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        report = {
+            'commit': git_commit(),
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'volumes': volumes,
+            'seed_seconds': seed_seconds,
+            'repeat': options['repeat'],
+            'endpoints': results,
+            'comparisons': comparisons,
+        }
+        path = options['output'] or os.path.join(
+            settings.BASE_DIR, '.benchmarks',
+            f'{time.strftime("%Y%m%d-%H%M%S")}-{(report["commit"] or "nocommit")[:10]}.json',
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as output:
+            json.dump(report, output, indent=2, ensure_ascii=False)
+        self.stdout.write(f'Results written to {path}')
+
+    # ============================================================
+    # SEED
+    # ============================================================
+    def seed(self, volumes, keepdb):
+        if keepdb and Product.objects.exists():
+            self.stdout.write('Reusing seeded test database')
+            return {}
+
+        timings = {}
+
+        def step(name, func):
+            started = time.perf_counter()
+            func()
+            timings[name] = round(time.perf_counter() - started, 2)
+            self.stdout.write(f'Seeded {name} in {timings[name]}s')
+
+        auth_user = AuthUser.objects.create_user(BENCHMARK_USER, password=BENCHMARK_PASSWORD, is_staff=True)
+        User.objects.create(id=auth_user.id, username=BENCHMARK_USER, role='admin')
+
+        step('catalogue', lambda: seed_catalogue(volumes['products'], volumes['articles'], content_words=150))
+        step('categories', self.seed_categories)
+        step('settings', self.seed_settings)
+        step('activity_logs', lambda: seed_activity_logs(volumes['activity_logs'], user_ids=[auth_user.id]))
+        step('search_index', rebuild_index)
+        step('dashboard_stats', reconcile_totals)
+        return timings
+
+    def seed_categories(self, roots=20, children=10):
+        for kind in ('product', 'article'):
+            parents = Category.objects.bulk_create([
+                Category(name=f'{kind} {i}', slug=f'{kind}-{i}', type=kind, sort_order=i) for i in range(roots)
+            ])
+            Category.objects.bulk_create([
+                Category(name=f'{parent.name}.{j}', slug=f'{parent.slug}-{j}', type=kind, parent=parent, sort_order=j)
+                for parent in parents for j in range(children)
+            ])
+
+    def seed_settings(self, count=100):
+        Setting.objects.bulk_create([
+            Setting(setting_key=f'setting_{i}', setting_value=f'value {i}', setting_group=f'group_{i % 8}',
+                    is_public=i % 2 == 0)
+            for i in range(count)
+        ])
+
+    # ============================================================
+    # ĐO
+    # ============================================================
+    def scenarios(self, options):
+        """(tên, hàm(client, i) → response, client, số request)"""
+        anonymous = APIClient()
+        admin = APIClient()
+        auth_user = AuthUser.objects.get(username=BENCHMARK_USER)
+        admin.credentials(HTTP_AUTHORIZATION=f'Bearer {ClaimsRefreshToken.for_user(auth_user).access_token}')
+
+        repeat = options['repeat']
+        product_ids = [str(pk) for pk in Product.objects.values_list('id', flat=True)[:repeat]]
+        # Khách chỉ xem được bài đã xuất bản
+        article_ids = [str(pk) for pk in Article.objects.filter(
+            status='published', published_at__lte=timezone.now(),
+        ).values_list('id', flat=True)[:repeat]]
+        if not product_ids or not article_ids:
+            raise CommandError('Không có dữ liệu để đo (thử --scale lớn hơn)')
+        queries = SEARCH_QUERIES
+        images = [png_bytes(i) for i in range(repeat + options['warmup'])]
+
+        def upload(client, i):
+            image = SimpleUploadedFile(f'benchmark-{i}.png', images[i], content_type='image/png')
+            return client.post('/api/upload-image/', {'image': image}, format='multipart')
+
+        return [
+            ('products_list', lambda client, i: client.get('/api/products/', {'page': i % 5 + 1}), anonymous, repeat),
+            ('products_detail', lambda client, i: client.get(f'/api/products/{product_ids[i % len(product_ids)]}/'),
+             anonymous, repeat),
+            ('articles_list', lambda client, i: client.get('/api/articles/', {'page': i % 5 + 1}), anonymous, repeat),
+            ('articles_detail', lambda client, i: client.get(f'/api/articles/{article_ids[i % len(article_ids)]}/'),
+             anonymous, repeat),
+            ('search', lambda client, i: client.get('/api/search/', {'q': queries[i % len(queries)]}),
+             anonymous, repeat),
+            ('category_tree', lambda client, i: client.get('/api/categories/tree/'), anonymous, repeat),
+            ('settings_public', lambda client, i: client.get('/api/settings/public/'), anonymous, repeat),
+            # Một nửa key đổi giá trị mỗi lần, nửa còn lại giữ nguyên (apply_settings bỏ qua)
+            ('settings_bulk_update', lambda client, i: client.post('/api/settings/bulk_update/', {'settings': {
+                f'setting_{j}': f'value {j} #{i}' if j % 2 else f'value {j}' for j in range(100)
+            }}, format='json'), admin, repeat),
+            ('dashboard_stats', lambda client, i: client.get('/api/dashboard/stats/'), admin, repeat),
+            # Sai mật khẩu: đường tốn CPU nhất (hash đầy đủ) mà đợt đăng nhập dồn dập gây ra
+            ('login', lambda client, i: client.post(
+                '/api/auth/login/', {'username': BENCHMARK_USER, 'password': 'wrong'}, format='json',
+            ), anonymous, options['login_repeat']),
+            ('upload_image', upload, admin, repeat),
+        ]
+
+    def run(self, options):
+        executed = []
+
+        def count_queries(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        results = {}
+        self.stdout.write(f'{"endpoint":<22}{"req/s":>9}{"p50 ms":>10}{"p99 ms":>10}{"queries":>9}{"bytes":>10}  status')
+        for name, request, client, repeat in self.scenarios(options):
+            if options['endpoints'] and name not in options['endpoints']:
+                continue
+            for i in range(options['warmup']):
+                request(client, repeat + i if name == 'upload_image' else i)
+
+            timings, statuses, sizes = [], {}, []
+            executed.clear()
+            with connection.execute_wrapper(count_queries):
+                for i in range(repeat):
+                    started = time.perf_counter()
+                    response = request(client, i)
+                    timings.append((time.perf_counter() - started) * 1000)
+                    statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+                    sizes.append(len(response.content))
+
+            total = sum(timings) / 1000
+            ordered = sorted(timings)
+            results[name] = {
+                'requests': repeat,
+                'status_codes': statuses,
+                'throughput_rps': round(repeat / total, 2) if total else None,
+                'mean_ms': round(total * 1000 / repeat, 3),
+                'p50_ms': round(ordered[len(ordered) // 2], 3),
+                'p99_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+                'queries_per_request': round(len(executed) / repeat, 2),
+                'response_bytes': round(sum(sizes) / repeat),
+            }
+            result = results[name]
+            self.stdout.write(
+                f'{name:<22}{result["throughput_rps"]:>9.1f}{result["p50_ms"]:>10.2f}{result["p99_ms"]:>10.2f}'
+                f'{result["queries_per_request"]:>9.1f}{result["response_bytes"]:>10}  {statuses}'
+            )
+        return results
+
+    # ============================================================
+    # SO SÁNH ĐƯỜNG CŨ / MỚI
+    # ============================================================
+    def compare(self, options, workdir):
+        """
+        Đo đường cũ và đường mới của từng thay đổi hiệu năng trên cùng dữ liệu:
+        {tên: {case: {'old': ..., 'new': ..., 'delta': ...}}}
+        """
+        comparisons = {}
+        self.stdout.write('')
+        self.stdout.write(f'{"comparison":<22}{"case":<20}{"old ms":>10}{"new ms":>10}{"speedup":>9}'
+                          f'{"old q":>8}{"new q":>8}  saved')
+        for name, cases in (
+            ('search_index', self.search_cases),
+            ('list_projection', self.list_payload_cases),
+            ('settings_apply', self.settings_cases),
+            ('media_dedup', self.media_dedup_cases),
+        ):
+            if options['endpoints'] and name not in options['endpoints']:
+                continue
+            comparisons[name] = {}
+            # Dữ liệu ghi trong lúc đo (settings) được rollback
+            with transaction.atomic():
+                for case, old, new, repeat in cases(options, workdir):
+                    result = {'old': self.measure_path(old, repeat), 'new': self.measure_path(new, repeat)}
+                    result['delta'] = compare_stats(result['old'], result['new'])
+                    comparisons[name][case] = result
+                    self.write_comparison(name, case, result)
+                transaction.set_rollback(True)
+        return comparisons
+
+    @staticmethod
+    def measure_path(func, repeat):
+        """Kết quả của func: bytes → kích thước payload, int → số kết quả, dict → số đo thêm"""
+        value, result = measure(func, repeat)
+        if isinstance(value, bytes):
+            result['bytes'] = len(value)
+        elif isinstance(value, int):
+            result['hits'] = value
+        elif isinstance(value, dict):
+            result.update(value)
+        return result
+
+    def write_comparison(self, name, case, result):
+        old, new, delta = result['old'], result['new'], result['delta']
+        saved = ', '.join(f'{key[:-10]} {value}%' for key, value in delta.items() if key.endswith('_saved_pct'))
+        self.stdout.write(
+            f'{name:<22}{case:<20}{old["mean_ms"]:>10.2f}{new["mean_ms"]:>10.2f}{delta["speedup"] or 0:>8.1f}x'
+            f'{old["queries_per_call"]:>8.1f}{new["queries_per_call"]:>8.1f}  {saved}'
+        )
+
+    def search_cases(self, options, workdir):
+        """SearchFilter (icontains trên product + article) vs chỉ mục /api/search/"""
+        factory = APIRequestFactory()
+
+        def search_filter(query):
+            request = Request(factory.get('/', {'search': query}))
+            results = []
+            for viewset_class in (ProductViewSet, ArticleViewSet):
+                view = viewset_class(request=request, format_kwarg=None, action='list', kwargs={})
+                queryset = filters.SearchFilter().filter_queryset(request, view.get_queryset(), view)
+                results.extend(queryset[:SEARCH_LIMIT])
+            return len(results)
+
+        return [
+            (query, lambda query=query: search_filter(query),
+             lambda query=query: len(search(query, limit=SEARCH_LIMIT)), options['repeat'])
+            for query in SEARCH_QUERIES
+        ]
+
+    def list_payload_cases(self, options, workdir):
+        """Serializer đầy đủ + mọi cột vs list projection (serializer compact + .only())"""
+        request = Request(APIRequestFactory().get('/'))
+        renderer = JSONRenderer()
+
+        def page(view, action):
+            if action == 'popular':
+                return view.get_popular_queryset()
+            if action == 'featured':
+                return view.get_featured_queryset()
+            return view.filter_queryset(view.get_queryset())[:view.paginator.page_size]
+
+        def full(view, action, serializer_class):
+            view.projection_actions = ()
+            try:
+                rows = page(view, action)
+            finally:
+                del view.projection_actions
+            return renderer.render(serializer_class(rows, many=True).data)
+
+        def projected(view, action):
+            return renderer.render(view.get_serializer(page(view, action), many=True).data)
+
+        cases = []
+        for case, viewset_class, action, serializer_class in LIST_PAYLOAD_ENDPOINTS:
+            view = viewset_class(request=request, format_kwarg=None, action=action, kwargs={})
+            cases.append((case, functools.partial(full, view, action, serializer_class),
+                          functools.partial(projected, view, action), options['repeat']))
+        return cases
+
+    def settings_cases(self, options, workdir):
+        """update_or_create từng key vs apply_settings, SETTINGS_KEYS key mỗi lần"""
+        counter = itertools.count()
+
+        def created(prefix):
+            return {f'{prefix}_{next(counter)}.key_{i}': str(i) for i in range(SETTINGS_KEYS)}
+
+        def changed(prefix):
+            run = next(counter)
+            return {f'{prefix}.key_{i}': f'value {i} #{run}' for i in range(SETTINGS_KEYS)}
+
+        def unchanged(prefix):
+            return {f'{prefix}.key_{i}': f'value {i}' for i in range(SETTINGS_KEYS)}
+
+        def bulk(values):
+            apply_settings(values)
+
+        update_or_create_each(unchanged('old_same'))
+        bulk(unchanged('bulk_same'))
+        repeat = min(options['repeat'], SETTINGS_REPEAT)
+        return [
+            ('create', lambda: update_or_create_each(created('old_new')), lambda: bulk(created('bulk_new')), repeat),
+            ('change', lambda: update_or_create_each(changed('old')), lambda: bulk(changed('bulk')), repeat),
+            ('unchanged', lambda: update_or_create_each(unchanged('old_same')),
+             lambda: bulk(unchanged('bulk_same')), repeat),
+        ]
+
+    def media_dedup_cases(self, options, workdir):
+        """FileSystemStorage vs ContentAddressedStorage: cùng loạt upload có ảnh trùng nội dung"""
+        rng = random.Random(42)
+        originals = [rng.randbytes(DEDUP_SIZE_KB * 1024) for _ in range(DEDUP_FILES)]
+        uploads = [(f'image_{i}.jpg', data) for i, data in enumerate(originals)] * DEDUP_COPIES
+        rng.shuffle(uploads)
+
+        def save_all(storage_class):
+            root = tempfile.mkdtemp(prefix='media-dedup-', dir=workdir)
+            try:
+                storage = storage_class(location=root)
+                names = {storage.save(f'uploads/{name}', ContentFile(data)) for name, data in uploads}
+                return {'disk_bytes': disk_usage(root), 'files': len(names)}
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+
+        case = f'{DEDUP_FILES}x{DEDUP_COPIES}_uploads'
+        return [(case, lambda: save_all(FileSystemStorage), lambda: save_all(ContentAddressedStorage), 1)]
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+
+from api.db import pool
+
+# Backend gốc ↔ backend có pool
+POOLED_ENGINES = {
+    'django.db.backends.mysql': 'api.db.mysql',
+    'django.db.backends.sqlite3': 'api.db.sqlite3',
+}
+PLAIN_ENGINES = {pooled: plain for plain, pooled in POOLED_ENGINES.items()}
+
+
+class Command(BaseCommand):
+    help = 'So sánh requests/giây mở kết nối mỗi request (CONN_MAX_AGE=0) và dùng pool kết nối'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Tổng số request giả lập')
+        parser.add_argument('--threads', type=int, default=8, help='Số thread chạy song song')
+        parser.add_argument('--pool-size', type=int, default=4, help='MAX_SIZE của pool (nhỏ hơn threads để đo waits)')
+        parser.add_argument('--database', default='default', help='Alias trong DATABASES')
+        parser.add_argument('--sqlite', action='store_true',
+                            help='Dùng file SQLite tạm thay cho database thật (khi không có MariaDB)')
+        parser.add_argument('--connect-delay', type=float, default=0,
+                            help='ms cộng thêm cho mỗi lần mở kết nối mới, mô phỏng bắt tay TCP + xác thực')
+        parser.add_argument('--query', default='SELECT 1', help='Câu SQL mỗi request chạy')
+
+    def handle(self, *args, **options):
+        if options['sqlite']:
+            handle, path = tempfile.mkstemp(prefix='db-pool-', suffix='.sqlite3')
+            os.close(handle)
+            settings_dict = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path}
+        else:
+            path = None
+            if options['database'] not in settings.DATABASES:
+                raise CommandError(f'Không có database "{options["database"]}"')
+            settings_dict = dict(settings.DATABASES[options['database']])
+
+        engine = PLAIN_ENGINES.get(settings_dict['ENGINE'], settings_dict['ENGINE'])
+        if engine not in POOLED_ENGINES:
+            raise CommandError(f'Chưa có backend pool cho {engine}')
+
+        self.stdout.write(
+            f'{engine}: {options["requests"]} requests, {options["threads"]} threads, '
+            f'pool {options["pool_size"]}, connect delay {options["connect_delay"]} ms'
+        )
+        self.stdout.write(f'{"mode":<10}{"req/s":>10}{"avg ms":>9}{"connects":>10}{"waits":>7}{"max wait ms":>13}')
+        try:
+            for label, backend in (('plain', engine), ('pooled', POOLED_ENGINES[engine])):
+                alias = f'benchmark-{label}'
+                # configure_settings điền các key mặc định (TIME_ZONE, OPTIONS...) như DATABASES thật
+                config = connections.configure_settings({'default': dict(
+                    settings_dict, ENGINE=backend, CONN_MAX_AGE=0, POOL={'MAX_SIZE': options['pool_size']},
+                )})['default']
+                rate, avg_ms, connects = self.run(alias, config, options)
+                stats = pool.pool_stats().get(alias, {})
+                self.stdout.write(
+                    f'{label:<10}{rate:>10.0f}{avg_ms:>9.3f}{connects:>10}{stats.get("waits", "-"):>7}'
+                    f'{stats.get("checkout_seconds_max", 0) * 1000:>13.2f}'
+                )
+                if alias in pool._pools:
+                    pool._pools.pop(alias).clear()
+        finally:
+            if path:
+                os.remove(path)
+
+    def wrapper_class(self, config, options, connects):
+        """DatabaseWrapper đếm (và trì hoãn) lần mở kết nối thật — nằm dưới pool trong MRO"""
+        plain = load_backend(PLAIN_ENGINES.get(config['ENGINE'], config['ENGINE'])).DatabaseWrapper
+        delay = options['connect_delay'] / 1000
+
+        def get_new_connection(self, conn_params):
+            connects.append(1)
+            if delay:
+                time.sleep(delay)
+            return plain.get_new_connection(self, conn_params)
+
+        counted = type('CountedDatabaseWrapper', (plain,), {'get_new_connection': get_new_connection})
+        if config['ENGINE'] in PLAIN_ENGINES:
+            # Pooled → mixin pool → Counted → backend gốc
+            return type('PooledDatabaseWrapper', (load_backend(config['ENGINE']).DatabaseWrapper, counted), {})
+        return counted
+
+    def run(self, alias, config, options):
+        """Mỗi request: wrapper mới (như connections[alias] của Django), 1 query, close()"""
+        connects = []
+        wrapper_class = self.wrapper_class(config, options, connects)
+        per_thread = [options['requests'] // options['threads']] * options['threads']
+        for i in range(options['requests'] % options['threads']):
+            per_thread[i] += 1
+
+        errors = []
+
+        def worker(count):
+            try:
+                for _ in range(count):
+                    wrapper = wrapper_class(dict(config), alias)
+                    with wrapper.cursor() as cursor:
+                        cursor.execute(options['query'])
+                        cursor.fetchall()
+                    wrapper.close()
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        if errors:
+            raise CommandError(f'{len(errors)} thread lỗi: {errors[0]!r}')
+        return options['requests'] / elapsed, elapsed * 1000 * options['threads'] / options['requests'], len(connects)
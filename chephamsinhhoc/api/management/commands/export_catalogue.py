@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_io import FORMATS, RESOURCES, export_stream
+
+
+class Command(BaseCommand):
+    help = 'Xuất sản phẩm/bài viết ra CSV hoặc JSONL (đọc theo lô khóa chính, bộ nhớ không tăng theo bảng)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=list(RESOURCES))
+        parser.add_argument('--format', choices=FORMATS, default='csv')
+        parser.add_argument('--output', default='-', help='File đích ("-" = stdout)')
+        parser.add_argument('--fields', default='', help='Danh sách field, cách nhau bởi dấu phẩy')
+
+    def handle(self, *args, **options):
+        fields = [name for name in options['fields'].split(',') if name] or None
+        try:
+            content = export_stream(options['resource'], options['format'], fields)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if options['output'] == '-':
+            for text in content:
+                sys.stdout.write(text)
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+            for text in content:
+                output.write(text)
+        self.stderr.write(self.style.SUCCESS(f'Exported {options["resource"]} to {options["output"]}'))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from api.media_blobs import DEFAULT_GRACE_HOURS, collect_garbage, collect_orphans, recount_references
+
+
+class Command(BaseCommand):
+    help = 'Xóa blob media không còn Media nào tham chiếu (ref_count = 0 quá thời gian chờ)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, default=DEFAULT_GRACE_HOURS,
+                            help='Chỉ xóa blob hết tham chiếu lâu hơn N giờ')
+        parser.add_argument('--recount', action='store_true',
+                            help='Tính lại ref_count từ bảng media trước khi dọn')
+        parser.add_argument('--orphans', action='store_true',
+                            help='Xóa cả file trong blobs/ không có dòng media_blobs và file tạm còn sót')
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ đếm, không xóa')
+
+    def handle(self, *args, **options):
+        grace_hours, dry_run = options['grace_hours'], options['dry_run']
+        if options['recount'] and not dry_run:
+            self.stdout.write(f'Recounted: fixed {recount_references()} blobs')
+
+        verb = 'Would remove' if dry_run else 'Removed'
+        removed, freed = collect_garbage(grace_hours, dry_run=dry_run)
+        self.stdout.write(self.style.SUCCESS(f'{verb} {removed} unreferenced blobs ({freed} bytes)'))
+        if options['orphans']:
+            removed, freed = collect_orphans(grace_hours, dry_run=dry_run)
+            self.stdout.write(self.style.SUCCESS(f'{verb} {removed} orphan files ({freed} bytes)'))
@@ -0,0 +1,43 @@
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.bulk_io import DEFAULT_CHUNK_SIZE, FORMATS, RESOURCES, import_rows, open_text
+
+
+class Command(BaseCommand):
+    help = 'Nhập sản phẩm/bài viết từ CSV hoặc JSONL (validate theo lô, bulk_create/bulk_update)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=list(RESOURCES))
+        parser.add_argument('path', help='File CSV/JSONL ("-" = stdin)')
+        parser.add_argument('--format', choices=FORMATS, default=None,
+                            help='Mặc định theo đuôi file')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Chỉ validate, không ghi')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Không xác định được định dạng của {path}, dùng --format')
+
+        if path == '-':
+            report = import_rows(options['resource'], open_text(sys.stdin.buffer), fmt,
+                                 chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        else:
+            with open(path, 'rb') as binary:
+                report = import_rows(options['resource'], open_text(binary), fmt,
+                                     chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+
+        for error in report.errors:
+            self.stderr.write(f'line {error["line"]}: {json.dumps(error["errors"], ensure_ascii=False)}')
+        if report.error_count > len(report.errors):
+            self.stderr.write(f'... {report.error_count - len(report.errors)} more errors')
+        verb = 'Would import' if options['dry_run'] else 'Imported'
+        self.stdout.write(self.style.SUCCESS(
+            f'{verb} {options["resource"]}: {report.created} created, {report.updated} updated, '
+            f'{report.unchanged} unchanged, {report.error_count} errors'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from api.images import process_media
+from api.models import Media
+
+
+class Command(BaseCommand):
+    help = 'Tạo biến thể WebP/AVIF + ghi kích thước cho ảnh Media (mặc định: ảnh chưa có biến thể)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Xử lý lại mọi ảnh')
+        parser.add_argument('--id', action='append', dest='ids', help='Chỉ xử lý Media id này (lặp lại được)')
+
+    def handle(self, *args, **options):
+        medias = Media.objects.filter(file_type='image').exclude(file='')
+        if options['ids']:
+            medias = medias.filter(pk__in=options['ids'])
+        elif not options['all']:
+            medias = medias.filter(variants__isnull=True)
+
+        total = 0
+        for media_id in medias.values_list('id', flat=True).distinct():
+            try:
+                count = process_media(media_id)
+            except Exception as e:
+                self.stderr.write(f'{media_id}: {e}')
+                continue
+            total += count
+            self.stdout.write(f'{media_id}: {count} variants')
+        self.stdout.write(self.style.SUCCESS(f'Created {total} variants'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.stats import reconcile_contacts, reconcile_totals
+
+
+class Command(BaseCommand):
+    help = 'Đối soát dashboard_stats với bảng gốc (tổng + số liên hệ theo ngày), chạy định kỳ bằng cron'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Số ngày liên hệ gần nhất cần tính lại')
+
+    def handle(self, *args, **options):
+        for metric, value in reconcile_totals().items():
+            self.stdout.write(f'{metric}: {value}')
+        counts = reconcile_contacts(options['days'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Reconciled totals and {options["days"]} days of contacts ({sum(counts.values())} contacts)'
+        ))
@@ -0,0 +1,27 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.log_storage import oldest_log_day, rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Tính lại rollup activity log theo ngày từ log gốc (đối soát / backfill)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Tính lại N ngày gần nhất (gồm hôm nay)')
+        parser.add_argument('--all', action='store_true', help='Tính lại mọi ngày còn log gốc')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        oldest = oldest_log_day()
+        if oldest is None:
+            self.stdout.write('No activity logs')
+            return
+
+        first_day = oldest if options['all'] else today - datetime.timedelta(days=options['days'] - 1)
+        # Ngày đã archive không còn log gốc → giữ rollup cũ
+        first_day = max(first_day, oldest)
+        rows = rebuild_rollups(first_day, today)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {rows} rollup rows for {first_day} → {today}'))
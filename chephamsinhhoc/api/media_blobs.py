@@ -0,0 +1,149 @@
+"""
+EBGreentek Media Blobs
+Đếm tham chiếu Media → blob và dọn blob không còn dùng
+Tạo ngày: 2025-12-14
+"""
+
+import datetime
+import os
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Media, MediaBlob
+from .storage import BLOB_PREFIX, content_addressed_storage
+
+# Blob hết tham chiếu được giữ thêm N giờ (upload đang dở / Media vừa xóa nhầm)
+DEFAULT_GRACE_HOURS = 24
+
+
+def is_blob(name):
+    return bool(name) and name.startswith(BLOB_PREFIX + '/')
+
+
+# ============================================================
+# ĐẾM THAM CHIẾU
+# ============================================================
+def add_reference(name):
+    """Một Media vừa trỏ tới blob name"""
+    if not is_blob(name):
+        return
+    blobs = MediaBlob.objects.filter(name=name)
+    if blobs.update(ref_count=F('ref_count') + 1, updated_at=timezone.now()):
+        return
+    try:
+        with transaction.atomic():
+            MediaBlob.objects.create(
+                name=name, size=content_addressed_storage.size(name), ref_count=1,
+            )
+    except IntegrityError:
+        blobs.update(ref_count=F('ref_count') + 1, updated_at=timezone.now())
+
+
+def release_reference(name):
+    """Một Media thôi trỏ tới blob name (về 0 thì GC xóa sau thời gian chờ)"""
+    if not is_blob(name):
+        return
+    MediaBlob.objects.filter(name=name).update(ref_count=F('ref_count') - 1, updated_at=timezone.now())
+
+
+def snapshot_before_save(instance):
+    """pre_save: tên file đang lưu trong DB để biết blob cũ khi file đổi"""
+    if instance._state.adding:
+        instance._blob_previous = None
+        return
+    instance._blob_previous = Media.objects.filter(pk=instance.pk).values_list('file', flat=True).first()
+
+
+def record_save(instance):
+    previous = getattr(instance, '_blob_previous', None) or ''
+    instance._blob_previous = None
+    current = instance.file.name or ''
+    if current != previous:
+        add_reference(current)
+        release_reference(previous)
+
+
+def recount_references():
+    """Tính lại ref_count từ bảng media (sau bulk/raw SQL bỏ qua signals), trả số blob bị sửa"""
+    actual = dict(
+        Media.objects.filter(file__startswith=BLOB_PREFIX + '/')
+        .values_list('file')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    fixed = 0
+    for blob in MediaBlob.objects.all().only('id', 'name', 'ref_count'):
+        count = actual.pop(blob.name, 0)
+        if blob.ref_count != count:
+            MediaBlob.objects.filter(pk=blob.pk).update(ref_count=count, updated_at=timezone.now())
+            fixed += 1
+    # Blob có Media trỏ tới nhưng chưa có dòng đếm
+    for name, count in actual.items():
+        if content_addressed_storage.exists(name):
+            MediaBlob.objects.get_or_create(
+                name=name, defaults={'size': content_addressed_storage.size(name), 'ref_count': count},
+            )
+            fixed += 1
+    return fixed
+
+
+# ============================================================
+# DỌN RÁC
+# ============================================================
+def collect_garbage(grace_hours=DEFAULT_GRACE_HOURS, dry_run=False):
+    """
+    Xóa blob ref_count <= 0 không đổi trong grace_hours.
+    Khóa từng dòng và kiểm tra lại trước khi xóa (Media trỏ tới, mtime file) để
+    upload trùng nội dung vào đúng lúc không mất file.
+    Trả (số blob, số byte).
+    """
+    cutoff = timezone.now() - datetime.timedelta(hours=grace_hours)
+    candidates = MediaBlob.objects.filter(ref_count__lte=0, updated_at__lt=cutoff)
+    removed = freed = 0
+    for blob_id in list(candidates.values_list('id', flat=True)):
+        with transaction.atomic():
+            blob = candidates.select_for_update().filter(pk=blob_id).first()
+            if blob is None or Media.objects.filter(file=blob.name).exists():
+                continue
+            # store_blob làm mới mtime khi gặp lại nội dung → upload trùng đang dở
+            path = content_addressed_storage.path(blob.name)
+            if os.path.exists(path) and os.path.getmtime(path) >= cutoff.timestamp():
+                continue
+            if not dry_run:
+                blob.delete()
+                content_addressed_storage.delete(blob.name)
+        removed += 1
+        freed += blob.size
+    return removed, freed
+
+
+def collect_orphans(grace_hours=DEFAULT_GRACE_HOURS, dry_run=False):
+    """
+    File trong blobs/ không có dòng MediaBlob (crash giữa lúc ghi file và tạo Media)
+    và file tạm .incoming-* còn sót, cũ hơn grace_hours. Trả (số file, số byte).
+    """
+    root = content_addressed_storage.path(BLOB_PREFIX)
+    if not os.path.isdir(root):
+        return 0, 0
+    cutoff = time.time() - grace_hours * 3600
+    known = set(MediaBlob.objects.values_list('name', flat=True))
+    referenced = set(Media.objects.filter(file__startswith=BLOB_PREFIX + '/').values_list('file', flat=True))
+
+    removed = freed = 0
+    for directory, _, files in os.walk(root):
+        for file_name in files:
+            path = os.path.join(directory, file_name)
+            name = os.path.relpath(path, content_addressed_storage.location).replace(os.sep, '/')
+            if name in known or name in referenced:
+                continue
+            stat = os.stat(path)
+            if stat.st_mtime >= cutoff:
+                continue
+            if not dry_run:
+                os.remove(path)
+            removed += 1
+            freed += stat.st_size
+    return removed, freed
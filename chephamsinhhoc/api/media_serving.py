@@ -0,0 +1,179 @@
+"""
+EBGreentek Media Serving
+Phục vụ MEDIA_URL: URL có fingerprint → cache vĩnh viễn, ETag/Last-Modified, Range,
+nhường file cho nginx/Apache (X-Accel-Redirect / X-Sendfile) nếu có
+Tạo ngày: 2025-12-15
+"""
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote, urlparse
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+# Python < 3.13 chưa biết .avif
+mimetypes.add_type('image/avif', '.avif')
+mimetypes.add_type('image/webp', '.webp')
+
+DEFAULT_MAX_AGE = 3600
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Tên file chứa hash nội dung: blobs/ab/cd/<sha256>.png, variants/<id>/640w-<hash12>.webp
+FINGERPRINT_RE = re.compile(r'(?:^|[/-])(?P<digest>[0-9a-f]{12,64})\.[A-Za-z0-9]+$')
+RANGE_RE = re.compile(r'^bytes=(?P<start>\d*)-(?P<end>\d*)$')
+
+
+def fingerprint(name):
+    """Hash nội dung trong tên file, None nếu tên không có fingerprint"""
+    match = FINGERPRINT_RE.search(name)
+    return match.group('digest') if match else None
+
+
+def cache_control(name):
+    if fingerprint(name):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={getattr(settings, "MEDIA_CACHE_MAX_AGE", DEFAULT_MAX_AGE)}'
+
+
+def parse_range(header, size):
+    """
+    'bytes=a-b' / 'bytes=a-' / 'bytes=-n' → (start, end) (end tính cả), None nếu không dùng
+    range (không có / nhiều range / sai cú pháp), False nếu ngoài kích thước file.
+    """
+    match = RANGE_RE.match(header.strip()) if header and size else None
+    if match is None:
+        return None
+    start, end = match.group('start'), match.group('end')
+    if not start:
+        if not end:
+            return None
+        length = int(end)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size:
+        return False
+    if end < start:
+        return None
+    return start, end
+
+
+class FileRange:
+    """Đọc tối đa length byte từ vị trí start; giữ fileno() để server WSGI vẫn dùng sendfile"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def offload(response, name, path):
+    """Có proxy phía trước → trả header để proxy tự gửi file, worker Python không đọc file"""
+    prefix = getattr(settings, 'MEDIA_ACCEL_REDIRECT_PREFIX', None)
+    if prefix:
+        response['X-Accel-Redirect'] = prefix.rstrip('/') + '/' + quote(name)
+        return True
+    header = getattr(settings, 'MEDIA_SENDFILE_HEADER', None)
+    if header:
+        response[header] = path
+        return True
+    return False
+
+
+@require_safe
+def serve_media(request, path):
+    """GET/HEAD một file trong MEDIA_ROOT"""
+    name = path.replace('\\', '/')
+    if any(part.startswith('.') for part in name.split('/')):
+        # File tạm (.incoming-*) và file ẩn
+        raise Http404
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+        stat = os.stat(full_path)
+    except (ValueError, OSError):
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    digest = fingerprint(name)
+    etag = f'"{digest}"' if digest else f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = int(stat.st_mtime)
+    headers = {
+        'ETag': etag,
+        'Last-Modified': http_date(last_modified),
+        'Cache-Control': cache_control(name),
+        'Accept-Ranges': 'bytes',
+    }
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+    # 304 / 412 theo If-None-Match, If-Modified-Since, If-Match, If-Unmodified-Since
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    response = HttpResponse(content_type=content_type)
+    if offload(response, name, full_path):
+        for header, value in headers.items():
+            response[header] = value
+        return response
+
+    size = stat.st_size
+    byte_range = None
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified:
+        byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if request.method == 'HEAD':
+        response['Content-Length'] = size
+    elif byte_range:
+        start, end = byte_range
+        response = FileResponse(FileRange(open(full_path, 'rb'), start, end - start + 1),
+                                 content_type=content_type, status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        # Cả file: server WSGI hỗ trợ wsgi.file_wrapper (gunicorn, uWSGI) gửi bằng sendfile()
+        response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    for header, value in headers.items():
+        response[header] = value
+    return response
+
+
+def media_urlpatterns():
+    """URL cho MEDIA_URL (bỏ qua nếu MEDIA_URL là domain khác, vd. CDN)"""
+    prefix = settings.MEDIA_URL
+    if not prefix or urlparse(prefix).netloc:
+        return []
+    return [
+        re_path(r'^%s(?P<path>.*)$' % re.escape(prefix.lstrip('/')), serve_media, name='media'),
+    ]
@@ -0,0 +1,310 @@
+# Generated by Django 4.2.26 on 2026-10-18 13:42
+
+# Schema ban đầu = "ebgreentek_db (1).sql". Database import từ dump chỉ ghi nhận migration này:
+#     python manage.py migrate api 0001 --fake
+#     python manage.py migrate
+# Database tạo mới (test, benchmark_api) chạy migrate bình thường.
+
+import api.models
+import django.contrib.auth.models
+import django.contrib.auth.validators
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AboutFeature',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('feature_text', models.CharField(max_length=200, verbose_name='Nội dung')),
+                ('sort_order', models.IntegerField(default=0, verbose_name='Thứ tự')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+            ],
+            options={
+                'verbose_name': 'About Feature',
+                'verbose_name_plural': 'About Features',
+                'db_table': 'about_features',
+                'ordering': ['sort_order'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AboutValue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100, verbose_name='Tiêu đề')),
+                ('description', models.TextField(verbose_name='Mô tả')),
+                ('color', models.CharField(default='blue', max_length=50, verbose_name='Màu')),
+                ('icon', models.CharField(blank=True, max_length=50, null=True, verbose_name='Icon')),
+                ('sort_order', models.IntegerField(default=0, verbose_name='Thứ tự')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+            ],
+            options={
+                'verbose_name': 'About Value',
+                'verbose_name_plural': 'About Values',
+                'db_table': 'about_values',
+                'ordering': ['sort_order'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Certification',
+            fields=[
+                ('id', models.CharField(default=api.models.generate_uuid, editable=False, max_length=36, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, verbose_name='Tên chứng nhận')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Mô tả')),
+                ('icon', models.CharField(default='Award', max_length=50, verbose_name='Icon')),
+                ('icon_color', models.CharField(default='blue', max_length=50, verbose_name='Màu icon')),
+                ('image_url', models.URLField(blank=True, max_length=500, null=True, verbose_name='Hình ảnh')),
+                ('certificate_number', models.CharField(blank=True, max_length=100, null=True, verbose_name='Số chứng nhận')),
+                ('issued_by', models.CharField(blank=True, max_length=200, null=True, verbose_name='Cơ quan cấp')),
+                ('issued_date', models.DateField(blank=True, null=True, verbose_name='Ngày cấp')),
+                ('expiry_date', models.DateField(blank=True, null=True, verbose_name='Ngày hết hạn')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('sort_order', models.IntegerField(default=0, verbose_name='Thứ tự')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+            ],
+            options={
+                'verbose_name': 'Certification',
+                'verbose_name_plural': 'Certifications',
+                'db_table': 'certifications',
+                'ordering': ['sort_order', 'name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SocialMedia',
+            fields=[
+                ('id', models.CharField(default=api.models.generate_uuid, editable=False, max_length=36, primary_key=True, serialize=False)),
+                ('platform', models.CharField(max_length=50, verbose_name='Platform')),
+                ('url', models.URLField(max_length=500, verbose_name='URL')),
+                ('icon_url', models.URLField(blank=True, max_length=500, null=True, verbose_name='Icon URL')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('sort_order', models.IntegerField(default=0, verbose_name='Thứ tự')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+            ],
+            options={
+                'verbose_name': 'Social Media',
+                'verbose_name_plural': 'Social Media',
+                'db_table': 'social_media',
+                'ordering': ['sort_order', 'platform'],
+            },
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('username', models.CharField(error_messages={'unique': 'A user with that username already exists.'}, help_text='Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=150, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator()], verbose_name='username')),
+                ('email', models.EmailField(blank=True, max_length=254, verbose_name='email address')),
+                ('full_name', models.CharField(blank=True, max_length=100, null=True, verbose_name='Họ tên')),
+                ('role', models.CharField(choices=[('admin', 'Admin'), ('editor', 'Editor'), ('viewer', 'Viewer')], default='editor', max_length=10, verbose_name='Vai trò')),
+                ('status', models.CharField(choices=[('active', 'Active'), ('inactive', 'Inactive')], default='active', max_length=10, verbose_name='Trạng thái')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='Lần đăng nhập cuối')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+                ('is_superuser', models.BooleanField(default=False)),
+                ('is_staff', models.BooleanField(default=False)),
+                ('is_active', models.BooleanField(default=True)),
+                ('first_name', models.CharField(blank=True, max_length=150)),
+                ('last_name', models.CharField(blank=True, max_length=150)),
+                ('date_joined', models.DateTimeField(auto_now_add=True)),
+                ('groups', models.ManyToManyField(blank=True, related_name='api_user_groups', to='auth.group')),
+                ('user_permissions', models.ManyToManyField(blank=True, related_name='api_user_permissions', to='auth.permission')),
+            ],
+            options={
+                'verbose_name': 'User',
+                'verbose_name_plural': 'Users',
+                'db_table': 'users',
+                'ordering': ['-created_at'],
+            },
+            managers=[
+                ('objects', django.contrib.auth.models.UserManager()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Setting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('setting_key', models.CharField(max_length=100, unique=True, verbose_name='Key')),
+                ('setting_value', models.TextField(blank=True, null=True, verbose_name='Value')),
+                ('setting_type', models.CharField(choices=[('text', 'Text'), ('json', 'JSON'), ('number', 'Number'), ('boolean', 'Boolean'), ('image', 'Image')], default='text', max_length=10, verbose_name='Type')),
+                ('setting_group', models.CharField(default='general', max_length=50, verbose_name='Group')),
+                ('description', models.CharField(blank=True, max_length=300, null=True, verbose_name='Mô tả')),
+                ('is_public', models.BooleanField(default=False, verbose_name='Public')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+            ],
+            options={
+                'verbose_name': 'Setting',
+                'verbose_name_plural': 'Settings',
+                'db_table': 'settings',
+                'ordering': ['setting_group', 'setting_key'],
+                'indexes': [models.Index(fields=['setting_key'], name='settings_setting_a14441_idx'), models.Index(fields=['setting_group'], name='settings_setting_a2ff9f_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.CharField(default=api.models.generate_uuid, editable=False, max_length=36, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=200, verbose_name='Tên sản phẩm')),
+                ('category', models.CharField(max_length=100, verbose_name='Danh mục')),
+                ('description', models.TextField(verbose_name='Mô tả')),
+                ('features', models.TextField(blank=True, null=True, verbose_name='Tính năng')),
+                ('usage', models.TextField(blank=True, null=True, verbose_name='Hướng dẫn sử dụng')),
+                ('ingredients', models.TextField(blank=True, null=True, verbose_name='Thành phần')),
+                ('benefits', models.TextField(blank=True, null=True, verbose_name='Lợi ích')),
+                ('packaging', models.TextField(blank=True, null=True, verbose_name='Đóng gói')),
+                ('images', models.TextField(blank=True, null=True, verbose_name='Hình ảnh')),
+                ('image_labels', models.TextField(blank=True, null=True, verbose_name='Nhãn ảnh')),
+                ('status', models.CharField(choices=[('active', 'Active'), ('inactive', 'Inactive')], default='active', max_length=10, verbose_name='Trạng thái')),
+                ('is_popular', models.BooleanField(default=False, verbose_name='Phổ biến')),
+                ('sort_order', models.IntegerField(default=0, verbose_name='Thứ tự')),
+                ('view_count', models.PositiveIntegerField(default=0, verbose_name='Lượt xem')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+            ],
+            options={
+                'verbose_name': 'Product',
+                'verbose_name_plural': 'Products',
+                'db_table': 'products',
+                'ordering': ['-is_popular', 'sort_order', '-created_at'],
+                'indexes': [models.Index(fields=['category'], name='products_categor_fce6e6_idx'), models.Index(fields=['status'], name='products_status_a30e64_idx'), models.Index(fields=['is_popular'], name='products_is_popu_ec4582_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Article',
+            fields=[
+                ('id', models.CharField(default=api.models.generate_uuid, editable=False, max_length=36, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=300, verbose_name='Tiêu đề')),
+                ('category', models.CharField(max_length=100, verbose_name='Danh mục')),
+                ('excerpt', models.TextField(verbose_name='Tóm tắt')),
+                ('content', models.TextField(verbose_name='Nội dung')),
+                ('image', models.URLField(blank=True, max_length=500, null=True, verbose_name='Hình ảnh')),
+                ('author', models.CharField(default='Admin', max_length=100, verbose_name='Tác giả')),
+                ('tags', models.TextField(blank=True, null=True, verbose_name='Tags')),
+                ('status', models.CharField(choices=[('published', 'Published'), ('draft', 'Draft')], default='draft', max_length=20, verbose_name='Trạng thái')),
+                ('is_featured', models.BooleanField(default=False, verbose_name='Nổi bật')),
+                ('view_count', models.PositiveIntegerField(default=0, verbose_name='Lượt xem')),
+                ('read_time', models.CharField(blank=True, max_length=20, null=True, verbose_name='Thời gian đọc')),
+                ('published_at', models.DateTimeField(blank=True, null=True, verbose_name='Ngày xuất bản')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+            ],
+            options={
+                'verbose_name': 'Article',
+                'verbose_name_plural': 'Articles',
+                'db_table': 'articles',
+                'ordering': ['-is_featured', '-published_at', '-created_at'],
+                'indexes': [models.Index(fields=['category'], name='articles_categor_052161_idx'), models.Index(fields=['status'], name='articles_status_a4f178_idx'), models.Index(fields=['is_featured'], name='articles_is_feat_9387e0_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Media',
+            fields=[
+                ('id', models.CharField(default=api.models.generate_uuid, editable=False, max_length=36, primary_key=True, serialize=False)),
+                ('file', models.FileField(blank=True, null=True, upload_to='uploads/%Y/%m/%d/', verbose_name='File')),
+                ('file_name', models.CharField(max_length=255, verbose_name='Tên file')),
+                ('file_path', models.CharField(blank=True, max_length=500, null=True, verbose_name='Đường dẫn')),
+                ('file_url', models.URLField(blank=True, max_length=500, null=True, verbose_name='URL')),
+                ('file_type', models.CharField(blank=True, max_length=50, null=True, verbose_name='Loại file')),
+                ('file_size', models.BigIntegerField(blank=True, null=True, verbose_name='Kích thước')),
+                ('width', models.PositiveIntegerField(blank=True, null=True, verbose_name='Chiều rộng')),
+                ('height', models.PositiveIntegerField(blank=True, null=True, verbose_name='Chiều cao')),
+                ('entity_type', models.CharField(blank=True, max_length=50, null=True, verbose_name='Liên kết')),
+                ('entity_id', models.CharField(blank=True, max_length=36, null=True, verbose_name='ID liên kết')),
+                ('is_public', models.BooleanField(default=True, verbose_name='Public')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.user', verbose_name='Người upload')),
+            ],
+            options={
+                'verbose_name': 'Media',
+                'verbose_name_plural': 'Media',
+                'db_table': 'media',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['entity_type'], name='media_entity__92a602_idx'), models.Index(fields=['file_type'], name='media_file_ty_da91ba_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Contact',
+            fields=[
+                ('id', models.CharField(default=api.models.generate_uuid, editable=False, max_length=36, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100, verbose_name='Tên')),
+                ('email', models.EmailField(max_length=254, validators=[django.core.validators.EmailValidator()], verbose_name='Email')),
+                ('phone', models.CharField(blank=True, max_length=20, null=True, verbose_name='Điện thoại')),
+                ('subject', models.CharField(blank=True, max_length=200, null=True, verbose_name='Chủ đề')),
+                ('message', models.TextField(verbose_name='Nội dung')),
+                ('status', models.CharField(choices=[('new', 'New'), ('replied', 'Replied'), ('closed', 'Closed')], default='new', max_length=10, verbose_name='Trạng thái')),
+                ('admin_reply', models.TextField(blank=True, null=True, verbose_name='Phản hồi')),
+                ('replied_at', models.DateTimeField(blank=True, null=True, verbose_name='Ngày phản hồi')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP')),
+                ('user_agent', models.CharField(blank=True, max_length=500, null=True, verbose_name='User Agent')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+                ('replied_by', models.ForeignKey(blank=True, db_column='replied_by_id', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='contact_replies', to='api.user', verbose_name='Người phản hồi')),
+            ],
+            options={
+                'verbose_name': 'Contact',
+                'verbose_name_plural': 'Contacts',
+                'db_table': 'contacts',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status'], name='contacts_status_f623d1_idx'), models.Index(fields=['email'], name='contacts_email_2eb381_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, verbose_name='Tên danh mục')),
+                ('slug', models.SlugField(max_length=150, unique=True, verbose_name='Slug')),
+                ('type', models.CharField(choices=[('product', 'Product'), ('article', 'Article')], max_length=10, verbose_name='Loại')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Mô tả')),
+                ('icon', models.CharField(blank=True, max_length=50, null=True, verbose_name='Icon')),
+                ('color', models.CharField(blank=True, max_length=50, null=True, verbose_name='Màu')),
+                ('sort_order', models.IntegerField(default=0, verbose_name='Thứ tự')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to='api.category', verbose_name='Danh mục cha')),
+            ],
+            options={
+                'verbose_name': 'Category',
+                'verbose_name_plural': 'Categories',
+                'db_table': 'categories',
+                'ordering': ['type', 'sort_order', 'name'],
+                'indexes': [models.Index(fields=['slug'], name='categories_slug_b4303a_idx'), models.Index(fields=['type'], name='categories_type_735b1a_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(max_length=50, verbose_name='Hành động')),
+                ('entity_type', models.CharField(blank=True, max_length=50, null=True, verbose_name='Loại')),
+                ('entity_id', models.CharField(blank=True, max_length=36, null=True, verbose_name='ID')),
+                ('description', models.TextField(blank=True, null=True, verbose_name='Mô tả')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP')),
+                ('user_agent', models.CharField(blank=True, max_length=500, null=True, verbose_name='User Agent')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.user', verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Activity Log',
+                'verbose_name_plural': 'Activity Logs',
+                'db_table': 'activity_logs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['action'], name='activity_lo_action_b49f28_idx'), models.Index(fields=['entity_type'], name='activity_lo_entity__97ab7c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.26 on 2026-10-18 13:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('doc_type', models.CharField(choices=[('product', 'Product'), ('article', 'Article')], max_length=10, verbose_name='Loại')),
+                ('doc_id', models.CharField(max_length=36, verbose_name='ID')),
+                ('length', models.FloatField(default=0, verbose_name='Độ dài (đã nhân trọng số)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+            ],
+            options={
+                'verbose_name': 'Search Document',
+                'verbose_name_plural': 'Search Documents',
+                'db_table': 'search_documents',
+                'unique_together': {('doc_type', 'doc_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Term')),
+                ('frequency', models.FloatField(default=0, verbose_name='Tần suất (đã nhân trọng số)')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='api.searchdocument', verbose_name='Document')),
+            ],
+            options={
+                'verbose_name': 'Search Posting',
+                'verbose_name_plural': 'Search Postings',
+                'db_table': 'search_postings',
+                'indexes': [models.Index(fields=['term'], name='search_post_term_683492_idx')],
+                'unique_together': {('term', 'document')},
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.26 on 2026-10-18 13:43
+
+import api.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='article',
+            name='tags',
+            field=api.fields.JSONTextField(blank=True, null=True, verbose_name='Tags'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='benefits',
+            field=api.fields.JSONTextField(blank=True, null=True, verbose_name='Lợi ích'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='features',
+            field=api.fields.JSONTextField(blank=True, null=True, verbose_name='Tính năng'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='image_labels',
+            field=api.fields.JSONTextField(blank=True, null=True, verbose_name='Nhãn ảnh'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='images',
+            field=api.fields.JSONTextField(blank=True, null=True, verbose_name='Hình ảnh'),
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='packaging',
+            field=api.fields.JSONTextField(blank=True, null=True, verbose_name='Đóng gói'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.26 on 2026-10-18 13:43
+
+import api.db.operations
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_activitylog_created_at_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityLogRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Ngày')),
+                ('action', models.CharField(max_length=50, verbose_name='Hành động')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Số lượng')),
+            ],
+            options={
+                'verbose_name': 'Activity Log Rollup',
+                'verbose_name_plural': 'Activity Log Rollups',
+                'db_table': 'activity_log_rollups',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['user', 'created_at'], name='activity_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['action', 'created_at'], name='activity_action_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['entity_type', 'created_at'], name='activity_entity_created_idx'),
+        ),
+        # Dump đã có idx_created (created_at)
+        api.db.operations.AddIndexIfMissing(
+            model_name='activitylog',
+            index=models.Index(fields=['created_at'], name='activity_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='activitylogrollup',
+            name='user',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.user', verbose_name='User'),
+        ),
+        migrations.AddIndex(
+            model_name='activitylogrollup',
+            index=models.Index(fields=['day', 'action'], name='activity_lo_day_3e1cba_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='activitylogrollup',
+            unique_together={('day', 'action', 'user')},
+        ),
+    ]
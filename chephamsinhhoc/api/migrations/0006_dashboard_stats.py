@@ -0,0 +1,38 @@
+# Generated by Django 4.2.26 on 2026-10-18 13:43
+
+import api.db.operations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_activity_log_indexes_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=50, verbose_name='Chỉ số')),
+                ('day', models.DateField(verbose_name='Ngày')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Giá trị')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+            ],
+            options={
+                'verbose_name': 'Dashboard Stat',
+                'verbose_name_plural': 'Dashboard Stats',
+                'db_table': 'dashboard_stats',
+            },
+        ),
+        # Dump đã có idx_created (created_at)
+        api.db.operations.AddIndexIfMissing(
+            model_name='contact',
+            index=models.Index(fields=['created_at'], name='contacts_created_4c6582_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dashboardstat',
+            unique_together={('day', 'metric')},
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.26 on 2026-10-18 13:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_dashboard_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaVariant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(max_length=255, upload_to='variants/', verbose_name='File')),
+                ('format', models.CharField(choices=[('webp', 'WebP'), ('avif', 'AVIF')], max_length=10, verbose_name='Định dạng')),
+                ('width', models.PositiveIntegerField(verbose_name='Chiều rộng')),
+                ('height', models.PositiveIntegerField(verbose_name='Chiều cao')),
+                ('file_size', models.PositiveIntegerField(verbose_name='Kích thước')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('media', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='variants', to='api.media', verbose_name='Media')),
+            ],
+            options={
+                'verbose_name': 'Media Variant',
+                'verbose_name_plural': 'Media Variants',
+                'db_table': 'media_variants',
+                'ordering': ['format', 'width'],
+                'unique_together': {('media', 'format', 'width')},
+            },
+        ),
+    ]
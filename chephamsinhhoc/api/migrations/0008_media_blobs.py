@@ -0,0 +1,36 @@
+# Generated by Django 4.2.26 on 2026-10-18 13:43
+
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_media_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='media',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=api.storage.ContentAddressedStorage(), upload_to='uploads/%Y/%m/%d/', verbose_name='File'),
+        ),
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True, verbose_name='Tên blob')),
+                ('size', models.BigIntegerField(default=0, verbose_name='Kích thước')),
+                ('ref_count', models.IntegerField(default=0, verbose_name='Số tham chiếu')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')),
+            ],
+            options={
+                'verbose_name': 'Media Blob',
+                'verbose_name_plural': 'Media Blobs',
+                'db_table': 'media_blobs',
+                'indexes': [models.Index(fields=['ref_count', 'updated_at'], name='media_blobs_ref_cou_5a80b2_idx')],
+            },
+        ),
+    ]
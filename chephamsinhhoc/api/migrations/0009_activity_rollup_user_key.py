@@ -0,0 +1,46 @@
+# Generated by Django 4.2.26 on 2026-10-18 14:07
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Sum
+
+
+def fill_user_key(apps, schema_editor):
+    """user_key = user_id; gộp các dòng rollup ẩn danh bị trùng (day, action)"""
+    ActivityLogRollup = apps.get_model('api', 'ActivityLogRollup')
+    ActivityLogRollup.objects.exclude(user_id=None).update(user_key=F('user_id'))
+
+    duplicates = (
+        ActivityLogRollup.objects.filter(user_id=None)
+        .values('day', 'action')
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('count'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        group = ActivityLogRollup.objects.filter(user_id=None, day=row['day'], action=row['action'])
+        group.filter(id=row['keep']).update(count=row['total'])
+        group.exclude(id=row['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_media_blobs'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='activitylogrollup',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='activitylogrollup',
+            name='user_key',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='User key'),
+        ),
+        migrations.RunPython(fill_user_key, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='activitylogrollup',
+            unique_together={('day', 'action', 'user_key')},
+        ),
+    ]
@@ -3,8 +3,21 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import EmailValidator
+from django.utils import timezone
+import datetime
+import logging
 import uuid
-import json
+
+from .fields import JSONTextField
+from .storage import content_addressed_storage
+from .view_counter import view_counter
+
+logger = logging.getLogger(__name__)
+
+
+def generate_uuid():
+    """Khóa chính dạng chuỗi UUID (hàm có tên: migrations không serialize được lambda)"""
+    return str(uuid.uuid4())
 
 
 # ============================================================
@@ -69,19 +82,19 @@ class Product(models.Model):
     ]
     
     # MariaDB 10.4: Use CHAR(36) instead of UUIDField for better compatibility
-    id = models.CharField(max_length=36, primary_key=True, default=lambda: str(uuid.uuid4()), editable=False)
+    id = models.CharField(max_length=36, primary_key=True, default=generate_uuid, editable=False)
     name = models.CharField(max_length=200, verbose_name='Tên sản phẩm')
     category = models.CharField(max_length=100, verbose_name='Danh mục')
     description = models.TextField(verbose_name='Mô tả')
     
-    # MariaDB 10.4: Use TextField with JSON for better compatibility
-    features = models.TextField(null=True, blank=True, verbose_name='Tính năng')
+    # MariaDB 10.4: JSON lưu trong cột TEXT, giải mã qua JSONTextField
+    features = JSONTextField(null=True, blank=True, verbose_name='Tính năng')
     usage = models.TextField(null=True, blank=True, verbose_name='Hướng dẫn sử dụng')
     ingredients = models.TextField(null=True, blank=True, verbose_name='Thành phần')
-    benefits = models.TextField(null=True, blank=True, verbose_name='Lợi ích')
-    packaging = models.TextField(null=True, blank=True, verbose_name='Đóng gói')
-    images = models.TextField(null=True, blank=True, verbose_name='Hình ảnh')
-    image_labels = models.TextField(null=True, blank=True, verbose_name='Nhãn ảnh')
+    benefits = JSONTextField(null=True, blank=True, verbose_name='Lợi ích')
+    packaging = JSONTextField(null=True, blank=True, verbose_name='Đóng gói')
+    images = JSONTextField(null=True, blank=True, verbose_name='Hình ảnh')
+    image_labels = JSONTextField(null=True, blank=True, verbose_name='Nhãn ảnh')
     
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active', verbose_name='Trạng thái')
     is_popular = models.BooleanField(default=False, verbose_name='Phổ biến')
@@ -105,75 +118,13 @@ class Product(models.Model):
         return self.name
     
     def increment_view(self):
-        """Tăng lượt xem"""
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
-    
-    # Helper methods for JSON fields
-    def get_features(self):
-        """Parse features từ JSON string"""
-        if self.features:
-            try:
-                return json.loads(self.features)
-            except (json.JSONDecodeError, TypeError):
-                return []
-        return []
-    
-    def set_features(self, value):
-        """Set features as JSON string"""
-        self.features = json.dumps(value) if value else None
-    
-    def get_benefits(self):
-        """Parse benefits từ JSON string"""
-        if self.benefits:
-            try:
-                return json.loads(self.benefits)
-            except (json.JSONDecodeError, TypeError):
-                return []
-        return []
-    
-    def set_benefits(self, value):
-        """Set benefits as JSON string"""
-        self.benefits = json.dumps(value) if value else None
-    
-    def get_packaging(self):
-        """Parse packaging từ JSON string"""
-        if self.packaging:
-            try:
-                return json.loads(self.packaging)
-            except (json.JSONDecodeError, TypeError):
-                return []
-        return []
-    
-    def set_packaging(self, value):
-        """Set packaging as JSON string"""
-        self.packaging = json.dumps(value) if value else None
-    
-    def get_images(self):
-        """Parse images từ JSON string"""
-        if self.images:
-            try:
-                return json.loads(self.images)
-            except (json.JSONDecodeError, TypeError):
-                return []
-        return []
-    
-    def set_images(self, value):
-        """Set images as JSON string"""
-        self.images = json.dumps(value) if value else None
-    
-    def get_image_labels(self):
-        """Parse image_labels từ JSON string"""
-        if self.image_labels:
-            try:
-                return json.loads(self.image_labels)
-            except (json.JSONDecodeError, TypeError):
-                return []
-        return []
-    
-    def set_image_labels(self, value):
-        """Set image_labels as JSON string"""
-        self.image_labels = json.dumps(value) if value else None
+        """Tăng lượt xem (ghi trễ theo lô qua view_counter)"""
+        view_counter.increment(type(self), self.pk)
+    
+    @property
+    def current_view_count(self):
+        """Lượt xem đã ghi DB + phần đang chờ flush"""
+        return self.view_count + view_counter.pending(type(self), self.pk)
 
 
 # ============================================================
@@ -189,14 +140,14 @@ class Article(models.Model):
         ('draft', 'Draft'),
     ]
     
-    id = models.CharField(max_length=36, primary_key=True, default=lambda: str(uuid.uuid4()), editable=False)
+    id = models.CharField(max_length=36, primary_key=True, default=generate_uuid, editable=False)
     title = models.CharField(max_length=300, verbose_name='Tiêu đề')
     category = models.CharField(max_length=100, verbose_name='Danh mục')
     excerpt = models.TextField(verbose_name='Tóm tắt')
     content = models.TextField(verbose_name='Nội dung')
     image = models.URLField(max_length=500, null=True, blank=True, verbose_name='Hình ảnh')
     author = models.CharField(max_length=100, default='Admin', verbose_name='Tác giả')
-    tags = models.TextField(null=True, blank=True, verbose_name='Tags')
+    tags = JSONTextField(null=True, blank=True, verbose_name='Tags')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft', verbose_name='Trạng thái')
     is_featured = models.BooleanField(default=False, verbose_name='Nổi bật')
     view_count = models.PositiveIntegerField(default=0, verbose_name='Lượt xem')
@@ -220,38 +171,30 @@ class Article(models.Model):
         return self.title
     
     def increment_view(self):
-        """Tăng lượt xem"""
-        self.view_count += 1
-        self.save(update_fields=['view_count'])
-    
-    def get_tags(self):
-        """Parse tags từ JSON string"""
-        if self.tags:
-            try:
-                return json.loads(self.tags)
-            except (json.JSONDecodeError, TypeError):
-                return []
-        return []
-    
-    def set_tags(self, value):
-        """Set tags as JSON string"""
-        self.tags = json.dumps(value) if value else None
+        """Tăng lượt xem (ghi trễ theo lô qua view_counter)"""
+        view_counter.increment(type(self), self.pk)
+    
+    @property
+    def current_view_count(self):
+        """Lượt xem đã ghi DB + phần đang chờ flush"""
+        return self.view_count + view_counter.pending(type(self), self.pk)
     
     def save(self, *args, **kwargs):
         """Override save để auto-set published_at khi publish"""
-        from django.utils import timezone
-        
+        self.sync_published_at()
+        super().save(*args, **kwargs)
+    
+    def sync_published_at(self):
+        """published_at theo status (dùng cả khi ghi hàng loạt không qua save())"""
         # Auto-set published_at khi status chuyển sang published
         if self.status == 'published' and self.published_at is None:
             self.published_at = timezone.now()
-            print(f'✅ Auto-set published_at for article: {self.title}')
+            logger.debug('Auto-set published_at for article %s', self.pk, extra={'title': self.title})
         
         # Clear published_at khi chuyển về draft
         if self.status == 'draft' and self.published_at is not None:
             self.published_at = None
-            print(f'🔄 Cleared published_at for draft article: {self.title}')
-        
-        super().save(*args, **kwargs)
+            logger.debug('Cleared published_at for draft article %s', self.pk, extra={'title': self.title})
 
 
 
@@ -267,7 +210,7 @@ class Contact(models.Model):
         ('closed', 'Closed'),
     ]
     
-    id = models.CharField(max_length=36, primary_key=True, default=lambda: str(uuid.uuid4()), editable=False)
+    id = models.CharField(max_length=36, primary_key=True, default=generate_uuid, editable=False)
     name = models.CharField(max_length=100, verbose_name='Tên')
     email = models.EmailField(validators=[EmailValidator()], verbose_name='Email')
     phone = models.CharField(max_length=20, null=True, blank=True, verbose_name='Điện thoại')
@@ -299,6 +242,7 @@ class Contact(models.Model):
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['email']),
+            models.Index(fields=['created_at']),
         ]
     
     def __str__(self):
@@ -346,7 +290,7 @@ class Setting(models.Model):
 # ============================================================
 class SocialMedia(models.Model):
     """Quản lý mạng xã hội"""
-    id = models.CharField(max_length=36, primary_key=True, default=lambda: str(uuid.uuid4()), editable=False)
+    id = models.CharField(max_length=36, primary_key=True, default=generate_uuid, editable=False)
     platform = models.CharField(max_length=50, verbose_name='Platform')
     url = models.URLField(max_length=500, verbose_name='URL')
     icon_url = models.URLField(max_length=500, null=True, blank=True, verbose_name='Icon URL')
@@ -370,7 +314,7 @@ class SocialMedia(models.Model):
 # ============================================================
 class Certification(models.Model):
     """Chứng nhận chất lượng"""
-    id = models.CharField(max_length=36, primary_key=True, default=lambda: str(uuid.uuid4()), editable=False)
+    id = models.CharField(max_length=36, primary_key=True, default=generate_uuid, editable=False)
     name = models.CharField(max_length=200, verbose_name='Tên chứng nhận')
     description = models.TextField(null=True, blank=True, verbose_name='Mô tả')
     icon = models.CharField(max_length=50, default='Award', verbose_name='Icon')
@@ -486,7 +430,8 @@ class ActivityLog(models.Model):
     description = models.TextField(null=True, blank=True, verbose_name='Mô tả')
     ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name='IP')
     user_agent = models.CharField(max_length=500, null=True, blank=True, verbose_name='User Agent')
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')
+    # default thay vì auto_now_add: writer nền giữ thời điểm xảy ra sự kiện khi bulk_create
+    created_at = models.DateTimeField(default=timezone.now, editable=False, verbose_name='Ngày tạo')
     
     class Meta:
         db_table = 'activity_logs'
@@ -496,12 +441,43 @@ class ActivityLog(models.Model):
         indexes = [
             models.Index(fields=['action']),
             models.Index(fields=['entity_type']),
+            # Khớp filter (user / action / entity_type) + ORDER BY created_at DESC của ActivityLogViewSet
+            models.Index(fields=['user', 'created_at'], name='activity_user_created_idx'),
+            models.Index(fields=['action', 'created_at'], name='activity_action_created_idx'),
+            models.Index(fields=['entity_type', 'created_at'], name='activity_entity_created_idx'),
+            # Trang log không filter + lệnh archive (created_at < cutoff)
+            models.Index(fields=['created_at'], name='activity_created_idx'),
         ]
     
     def __str__(self):
         return f"{self.action} - {self.entity_type} - {self.created_at}"
 
 
+class ActivityLogRollup(models.Model):
+    """Số activity log theo ngày × action × user (tính sẵn, giữ cả khi log gốc đã archive)"""
+    day = models.DateField(verbose_name='Ngày')
+    action = models.CharField(max_length=50, verbose_name='Hành động')
+    # Không ràng buộc FK: rollup vẫn giữ khi user bị xóa
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                             null=True, blank=True, related_name='+', verbose_name='User')
+    # Khóa unique thay cho user: NULL không bằng NULL trong unique index (MariaDB không có
+    # partial/functional index) → log không có user dùng 0
+    user_key = models.PositiveIntegerField(default=0, editable=False, verbose_name='User key')
+    count = models.PositiveIntegerField(default=0, verbose_name='Số lượng')
+    
+    class Meta:
+        db_table = 'activity_log_rollups'
+        verbose_name = 'Activity Log Rollup'
+        verbose_name_plural = 'Activity Log Rollups'
+        unique_together = [('day', 'action', 'user_key')]
+        indexes = [
+            models.Index(fields=['day', 'action']),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} - {self.action} - {self.user_id}: {self.count}"
+
+
 
 
 # ============================================================
@@ -512,8 +488,10 @@ class ActivityLog(models.Model):
 # ============================================================
 class Media(models.Model):
     """Quản lý media files"""
-    id = models.CharField(max_length=36, primary_key=True, default=lambda: str(uuid.uuid4()), editable=False)
-    file = models.FileField(upload_to='uploads/%Y/%m/%d/', null=True, blank=True, verbose_name='File')
+    id = models.CharField(max_length=36, primary_key=True, default=generate_uuid, editable=False)
+    # File mới lưu theo nội dung (blobs/ab/cd/<sha256>.ext), file cũ uploads/... vẫn đọc được
+    file = models.FileField(upload_to='uploads/%Y/%m/%d/', storage=content_addressed_storage,
+                            null=True, blank=True, verbose_name='File')
     file_name = models.CharField(max_length=255, verbose_name='Tên file')
     file_path = models.CharField(max_length=500, null=True, blank=True, verbose_name='Đường dẫn')
     file_url = models.URLField(max_length=500, null=True, blank=True, verbose_name='URL')
@@ -539,3 +517,119 @@ class Media(models.Model):
     
     def __str__(self):
         return self.file_name
+
+
+class MediaBlob(models.Model):
+    """Một file lưu theo nội dung; ref_count = số Media đang trỏ tới (0 → GC được)"""
+    name = models.CharField(max_length=255, unique=True, verbose_name='Tên blob')
+    size = models.BigIntegerField(default=0, verbose_name='Kích thước')
+    ref_count = models.IntegerField(default=0, verbose_name='Số tham chiếu')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')
+    
+    class Meta:
+        db_table = 'media_blobs'
+        verbose_name = 'Media Blob'
+        verbose_name_plural = 'Media Blobs'
+        indexes = [
+            models.Index(fields=['ref_count', 'updated_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count})"
+
+
+class MediaVariant(models.Model):
+    """Bản resize (WebP/AVIF, đã bỏ metadata) của một ảnh Media, dùng cho srcset"""
+    FORMAT_CHOICES = [
+        ('webp', 'WebP'),
+        ('avif', 'AVIF'),
+    ]
+    
+    media = models.ForeignKey(Media, on_delete=models.CASCADE, related_name='variants', verbose_name='Media')
+    file = models.FileField(upload_to='variants/', max_length=255, verbose_name='File')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, verbose_name='Định dạng')
+    width = models.PositiveIntegerField(verbose_name='Chiều rộng')
+    height = models.PositiveIntegerField(verbose_name='Chiều cao')
+    file_size = models.PositiveIntegerField(verbose_name='Kích thước')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Ngày tạo')
+    
+    class Meta:
+        db_table = 'media_variants'
+        verbose_name = 'Media Variant'
+        verbose_name_plural = 'Media Variants'
+        ordering = ['format', 'width']
+        unique_together = [('media', 'format', 'width')]
+    
+    def __str__(self):
+        return f"{self.media_id} {self.width}w.{self.format}"
+
+
+# ============================================================
+# 13. MODEL SEARCH INDEX - Chỉ mục tìm kiếm
+# ============================================================
+class SearchDocument(models.Model):
+    """Sản phẩm/bài viết đã được đưa vào chỉ mục tìm kiếm"""
+    TYPE_CHOICES = [
+        ('product', 'Product'),
+        ('article', 'Article'),
+    ]
+    
+    doc_type = models.CharField(max_length=10, choices=TYPE_CHOICES, verbose_name='Loại')
+    doc_id = models.CharField(max_length=36, verbose_name='ID')
+    length = models.FloatField(default=0, verbose_name='Độ dài (đã nhân trọng số)')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')
+    
+    class Meta:
+        db_table = 'search_documents'
+        verbose_name = 'Search Document'
+        verbose_name_plural = 'Search Documents'
+        unique_together = [('doc_type', 'doc_id')]
+    
+    def __str__(self):
+        return f"{self.doc_type}:{self.doc_id}"
+
+
+class SearchPosting(models.Model):
+    """Một term xuất hiện trong một document (inverted index)"""
+    term = models.CharField(max_length=64, verbose_name='Term')
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings', verbose_name='Document')
+    frequency = models.FloatField(default=0, verbose_name='Tần suất (đã nhân trọng số)')
+    
+    class Meta:
+        db_table = 'search_postings'
+        verbose_name = 'Search Posting'
+        verbose_name_plural = 'Search Postings'
+        unique_together = [('term', 'document')]
+        indexes = [
+            models.Index(fields=['term']),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} → {self.document}"
+
+
+
+# ============================================================
+# 14. MODEL DASHBOARD STAT - Thống kê dashboard tính sẵn
+# ============================================================
+class DashboardStat(models.Model):
+    """
+    Một số liệu dashboard: tổng hiện tại (day = TOTALS_DAY) hoặc giá trị theo ngày.
+    Cập nhật dần qua signals / view_counter, đối soát bằng reconcile_dashboard_stats.
+    """
+    TOTALS_DAY = datetime.date(1970, 1, 1)
+    
+    metric = models.CharField(max_length=50, verbose_name='Chỉ số')
+    day = models.DateField(verbose_name='Ngày')
+    value = models.BigIntegerField(default=0, verbose_name='Giá trị')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Ngày cập nhật')
+    
+    class Meta:
+        db_table = 'dashboard_stats'
+        verbose_name = 'Dashboard Stat'
+        verbose_name_plural = 'Dashboard Stats'
+        unique_together = [('day', 'metric')]
+    
+    def __str__(self):
+        return f"{self.metric} @ {self.day}: {self.value}"
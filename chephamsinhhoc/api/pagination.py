@@ -0,0 +1,245 @@
+"""
+EBGreentek Pagination
+Keyset (cursor) pagination theo ordering của viewset, dùng song song với page-number
+Tạo ngày: 2025-12-11
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Ngưỡng đếm khi ?count=estimate trên queryset đã filter (COUNT trên tối đa N dòng)
+DEFAULT_ESTIMATE_CAP = 1000
+
+
+def table_row_estimate(model, using):
+    """Số dòng ước lượng từ thống kê của DB (không quét bảng), None nếu backend không hỗ trợ"""
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'mysql':
+        sql = ('SELECT TABLE_ROWS FROM information_schema.TABLES '
+               'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s')
+    elif connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    return max(int(row[0]), 0) if row and row[0] is not None else None
+
+
+class KeysetPagination(BasePagination):
+    """
+    Phân trang theo khóa: WHERE (ordering) sau/ trước giá trị của dòng cuối/đầu trang,
+    không OFFSET, không COUNT(*).
+
+    - Ordering lấy từ queryset (OrderingFilter / order_by / Meta.ordering), luôn thêm
+      pk làm khóa phụ để thứ tự là duy nhất
+    - ?cursor= là base64 của giá trị khóa (client coi như chuỗi mờ)
+    - ?count=exact → COUNT(*); ?count=estimate → ước lượng (thống kê bảng nếu không
+      filter, ngược lại COUNT tối đa estimate_cap dòng); mặc định không đếm
+    - Cột nullable: NULL đứng đầu khi tăng dần, cuối khi giảm dần (như MySQL)
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    estimate_cap = DEFAULT_ESTIMATE_CAP
+
+    def __init__(self, **options):
+        for name, value in options.items():
+            setattr(self, name, value)
+
+    # ------------------------------------------------------------
+    # Ordering / cursor
+    # ------------------------------------------------------------
+    def get_ordering(self, queryset):
+        """[(field, descending)] gồm khóa phụ pk"""
+        model = queryset.model
+        ordering = list(queryset.query.order_by) or list(model._meta.ordering)
+        keys = []
+        for name in ordering:
+            if not isinstance(name, str):
+                raise ValidationError({'ordering': 'Keyset pagination chỉ hỗ trợ ordering theo tên cột'})
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            try:
+                field = model._meta.get_field('id' if name == 'pk' else name)
+            except FieldDoesNotExist:
+                raise ValidationError({'ordering': f'Keyset pagination không hỗ trợ ordering "{name}"'})
+            if not field.concrete or field.is_relation and not field.many_to_one:
+                raise ValidationError({'ordering': f'Keyset pagination không hỗ trợ ordering "{name}"'})
+            keys.append((field, descending))
+            if field.primary_key:
+                break
+        else:
+            keys.append((model._meta.pk, keys[0][1] if keys else False))
+        return keys
+
+    def order_by(self, keys, reverse=False):
+        expressions = []
+        for field, descending in keys:
+            descending = descending != reverse
+            if field.null:
+                expressions.append(F(field.attname).desc(nulls_last=True) if descending
+                                   else F(field.attname).asc(nulls_first=True))
+            else:
+                expressions.append(f'-{field.attname}' if descending else field.attname)
+        return expressions
+
+    def after(self, keys, values, reverse=False):
+        """Q cho các dòng đứng sau values theo thứ tự keys (hoặc trước nếu reverse)"""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(keys, values):
+            descending = descending != reverse
+            name = field.attname
+            if value is None:
+                # NULL đứng đầu khi tăng dần → sau nó là mọi giá trị khác NULL
+                strictly = None if descending else Q(**{f'{name}__isnull': False})
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                strictly = Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+                if field.null and descending:
+                    strictly |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            if strictly is not None:
+                condition |= equal & strictly
+            equal &= same
+        return condition
+
+    def encode_cursor(self, keys, row, reverse):
+        values = [getattr(row, field.attname) for field, _ in keys]
+        payload = json.dumps({'v': values, 'r': int(reverse)}, default=str, separators=(',', ':'))
+        cursor = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, keys):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            values = payload['v']
+            if len(values) != len(keys):
+                raise ValueError
+            values = [None if value is None else field.to_python(value)
+                      for (field, _), value in zip(keys, values)]
+            return values, bool(payload.get('r'))
+        except (binascii.Error, UnicodeError, ValueError, TypeError, KeyError, DjangoValidationError):
+            raise NotFound('Invalid cursor')
+
+    # ------------------------------------------------------------
+    # Pagination API
+    # ------------------------------------------------------------
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size) if self.max_page_size else size
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == 'exact':
+            return queryset.count(), False
+        if mode == 'estimate':
+            if not queryset.query.where:
+                estimate = table_row_estimate(queryset.model, queryset.db)
+                if estimate is not None:
+                    return estimate, True
+            count = queryset[:self.estimate_cap].count()
+            return count, count >= self.estimate_cap
+        return None, False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = remove_query_param(request.build_absolute_uri(), 'page')
+        page_size = self.get_page_size(request)
+        keys = self.get_ordering(queryset)
+        values, reverse = self.decode_cursor(request, keys)
+        self.count, self.count_is_estimate = self.get_count(queryset, request)
+
+        queryset = queryset.order_by(*self.order_by(keys, reverse))
+        if values is not None:
+            queryset = queryset.filter(self.after(keys, values, reverse))
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if reverse:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        self.next_link = self.encode_cursor(keys, rows[-1], False) if rows and has_next else None
+        self.previous_link = self.encode_cursor(keys, rows[0], True) if rows and has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = [('next', self.next_link), ('previous', self.previous_link)]
+        if self.count is not None:
+            payload += [('count', self.count), ('count_is_estimate', self.count_is_estimate)]
+        return Response(OrderedDict(payload + [('results', data)]))
+
+    def get_paginated_response_schema(self, schema):
+        properties = {
+            'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+            'count': {'type': 'integer'},
+            'count_is_estimate': {'type': 'boolean'},
+            'results': schema,
+        }
+        return {'type': 'object', 'required': ['results'], 'properties': properties}
+
+
+class HybridPaginationMixin:
+    """
+    Mixin cho PageNumberPagination: chọn keyset hoặc page-number cho từng request.
+    - ?paginate=keyset hoặc có ?cursor= → keyset
+    - ?paginate=page hoặc có ?page= → page-number
+    - còn lại theo view.pagination_mode ('page' mặc định)
+    """
+    keyset_class = KeysetPagination
+    mode_query_param = 'paginate'
+
+    def use_keyset(self, request, view):
+        mode = request.query_params.get(self.mode_query_param)
+        if mode in ('keyset', 'page'):
+            return mode == 'keyset'
+        if KeysetPagination.cursor_query_param in request.query_params:
+            return True
+        if self.page_query_param in request.query_params:
+            return False
+        return getattr(view, 'pagination_mode', 'page') == 'keyset'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_keyset(request, view):
+            self.keyset = self.keyset_class(
+                page_size=self.page_size,
+                page_size_query_param=self.page_size_query_param,
+                max_page_size=self.max_page_size,
+            )
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,72 @@
+"""
+EBGreentek Projection
+Sparse fieldsets (?fields= / ?exclude=) và .only() theo serializer
+Tạo ngày: 2025-12-05
+"""
+
+
+def _split(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin: khi GET, client chọn field trả về
+    ?fields=id,name  → chỉ các field này
+    ?exclude=content → bỏ các field này
+    Meta.optional_fields: field chỉ trả về khi được nêu trong ?fields=
+    Field bị bỏ không được tính (không gọi get_* / không đọc cột).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and request.method in ('GET', 'HEAD'):
+            fields = _split(request.query_params.get('fields'))
+            exclude = _split(request.query_params.get('exclude'))
+        else:
+            fields, exclude = [], []
+
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        else:
+            for name in getattr(getattr(self, 'Meta', None), 'optional_fields', ()):
+                self.fields.pop(name, None)
+        for name in exclude:
+            self.fields.pop(name, None)
+
+
+def project_queryset(queryset, serializer):
+    """
+    .only() đúng các cột mà serializer sẽ đọc.
+    Nếu có field không xác định được cột → giữ nguyên queryset
+    (tránh mỗi dòng phát sinh thêm 1 query để load cột bị defer).
+    """
+    model = queryset.model
+    concrete = {field.name for field in model._meta.concrete_fields}
+    extra_sources = getattr(getattr(serializer, 'Meta', None), 'projection_sources', {})
+
+    columns = {model._meta.pk.name}
+    for name, field in serializer.fields.items():
+        source = field.source.split('.')[0] if field.source and field.source != '*' else None
+        if name in extra_sources:
+            columns.update(extra_sources[name])
+        elif source in concrete:
+            columns.add(source)
+        elif name in concrete:
+            # SerializerMethodField / property đặt tên trùng cột (images, tags, view_count)
+            columns.add(name)
+        else:
+            return queryset
+    return queryset.only(*columns)
+
+
+class ListProjectionMixin:
+    """Viewset mixin: list actions chỉ load các cột serializer list cần"""
+    projection_actions = ('list',)
+
+    def project_queryset(self, queryset):
+        if self.action in self.projection_actions:
+            return project_queryset(queryset, self.get_serializer())
+        return queryset
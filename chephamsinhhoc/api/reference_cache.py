@@ -0,0 +1,140 @@
+"""
+EBGreentek Reference Cache
+Cache trong bộ nhớ process cho payload đã serialize của các bảng tham chiếu nhỏ
+(SocialMedia, Certification, Category, AboutFeature, AboutValue)
+Tạo ngày: 2025-12-16
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+from .cache import cacheable_read, get_generation
+
+DEFAULT_TTL = 300  # giây
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_VERSION_CHECK_INTERVAL = 2  # giây
+
+
+class ReferenceCache:
+    """
+    LRU (tối đa REFERENCE_CACHE_MAX_ENTRIES payload) + TTL (REFERENCE_CACHE_TTL giây).
+
+    Mỗi model có một generation dùng chung giữa các worker (api/cache.py, tăng ở
+    post_save/post_delete). Payload ghi kèm generation lúc dựng; generation được đọc
+    lại tối đa mỗi REFERENCE_CACHE_VERSION_CHECK giây, khác thì bỏ payload của model.
+    Process tự ghi model thì invalidate() bỏ ngay, không chờ.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # (model label, key) → (generation, hết hạn lúc, payload)
+        self._generations = {}  # model label → (generation, lúc kiểm tra)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'REFERENCE_CACHE_TTL', DEFAULT_TTL)
+
+    @property
+    def max_entries(self):
+        return getattr(settings, 'REFERENCE_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'REFERENCE_CACHE_VERSION_CHECK', DEFAULT_VERSION_CHECK_INTERVAL)
+
+    def generation(self, model):
+        """Generation của model, đọc cache dùng chung tối đa mỗi check_interval giây"""
+        label = model._meta.label_lower
+        now = time.monotonic()
+        known = self._generations.get(label)
+        if known is not None and now - known[1] < self.check_interval:
+            return known[0]
+        generation = get_generation(model)
+        self._generations[label] = (generation, now)
+        return generation
+
+    def get(self, model, key):
+        """Payload đã cache, None nếu chưa có / hết hạn / model đã đổi"""
+        entry_key = (model._meta.label_lower, key)
+        generation = self.generation(model)
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is None or entry[0] != generation or entry[1] <= time.monotonic():
+                self._entries.pop(entry_key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(entry_key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, model, key, payload, generation):
+        """generation: đọc TRƯỚC khi dựng payload, để lần ghi xen giữa làm payload hết hiệu lực"""
+        with self._lock:
+            self._entries[(model._meta.label_lower, key)] = (generation, time.monotonic() + self.ttl, payload)
+            self._entries.move_to_end((model._meta.label_lower, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model):
+        """Bỏ payload của model và đọc lại generation ở lần get sau"""
+        label = model._meta.label_lower
+        with self._lock:
+            self._generations.pop(label, None)
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == label]:
+                del self._entries[entry_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generations.clear()
+
+
+reference_cache = ReferenceCache()
+
+
+class ReferenceCacheMixin:
+    """
+    Mixin cho viewset của bảng tham chiếu: list/retrieve trả payload từ reference_cache.
+    Key: action + kwargs + query params + public/admin (anonymous thấy dữ liệu khác).
+    """
+
+    def get_reference_cache_key(self, request, **kwargs):
+        params = tuple(sorted(
+            (key, value)
+            for key in request.query_params
+            for value in request.query_params.getlist(key)
+            if value != ''
+        ))
+        audience = 'admin' if request.user and request.user.is_authenticated else 'public'
+        return (self.action, audience, tuple(sorted(kwargs.items())), params)
+
+    def reference_response(self, handler, request, *args, **kwargs):
+        model = self.queryset.model
+        key = self.get_reference_cache_key(request, **kwargs)
+        payload = reference_cache.get(model, key)
+        if payload is not None:
+            response = Response(payload)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        generation = reference_cache.generation(model)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK and cacheable_read([model]):
+            # ReturnList/ReturnDict giữ tham chiếu serializer → bỏ trước khi cache lâu
+            data = list(response.data) if isinstance(response.data, list) else dict(response.data)
+            reference_cache.set(model, key, data, generation)
+            response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.reference_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.reference_response(super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,277 @@
+"""
+EBGreentek Search
+Chỉ mục đảo (inverted index) cho sản phẩm và bài viết, xếp hạng BM25
+Tạo ngày: 2025-12-04
+"""
+
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.utils.html import strip_tags
+
+from .cache import bump_generation, get_generation
+from .models import Article, Product, SearchDocument, SearchPosting
+
+# Tham số BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 10
+# Prefix ngắn hơn mức này không mở rộng (2 ký tự như "ch" khớp gần hết chỉ mục)
+MIN_PREFIX_LENGTH = 3
+# Prefix chỉ mở rộng thành n term có nhiều document nhất
+MAX_PREFIX_TERMS = 20
+# Term có nhiều posting hơn mức này (từ quá phổ biến, idf thấp) chỉ lấy n posting tần suất cao nhất
+MAX_POSTINGS_PER_TERM = 1000
+# (số document, độ dài trung bình) cache theo generation của SearchDocument
+STATS_CACHE_TIMEOUT = 3600
+
+# Trọng số từng field khi index
+FIELD_WEIGHTS = {
+    'product': {'name': 3.0, 'category': 2.0, 'description': 1.0},
+    'article': {'title': 3.0, 'excerpt': 2.0, 'category': 2.0, 'content': 1.0},
+}
+
+DOC_MODELS = {
+    'product': Product,
+    'article': Article,
+}
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+# ============================================================
+# TOKENIZER
+# ============================================================
+def fold(text):
+    """Chữ thường + bỏ dấu tiếng Việt: 'Chế Phẩm Đặc' → 'che pham dac'"""
+    text = text.lower().replace('đ', 'd')
+    decomposed = unicodedata.normalize('NFD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    if not text:
+        return []
+    return [token[:MAX_TERM_LENGTH] for token in TOKEN_RE.findall(fold(strip_tags(text)))]
+
+
+def doc_type_of(instance):
+    for doc_type, model in DOC_MODELS.items():
+        if isinstance(instance, model):
+            return doc_type
+    return None
+
+
+def weighted_terms(doc_type, instance):
+    """term → tần suất đã nhân trọng số field"""
+    frequencies = Counter()
+    for field, weight in FIELD_WEIGHTS[doc_type].items():
+        for token in tokenize(getattr(instance, field, '')):
+            frequencies[token] += weight
+    return frequencies
+
+
+# ============================================================
+# INDEXING
+# ============================================================
+def index_document(instance):
+    """Index lại một Product/Article (gọi từ post_save)"""
+    doc_type = doc_type_of(instance)
+    frequencies = weighted_terms(doc_type, instance)
+
+    with transaction.atomic():
+        document, _ = SearchDocument.objects.update_or_create(
+            doc_type=doc_type, doc_id=str(instance.pk),
+            defaults={'length': sum(frequencies.values())},
+        )
+        SearchPosting.objects.filter(document=document).delete()
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term=term, document=document, frequency=frequency)
+            for term, frequency in frequencies.items()
+        ])
+
+
+def remove_document(instance):
+    """Xóa document khỏi chỉ mục (gọi từ post_delete)"""
+    SearchDocument.objects.filter(doc_type=doc_type_of(instance), doc_id=str(instance.pk)).delete()
+
+
+def rebuild_index(batch_size=500):
+    """Xóa và dựng lại toàn bộ chỉ mục, trả về số document đã index"""
+    total = 0
+    with transaction.atomic():
+        SearchPosting.objects.all().delete()
+        SearchDocument.objects.all().delete()
+
+        for doc_type, model in DOC_MODELS.items():
+            fields = ['pk', *FIELD_WEIGHTS[doc_type]]
+            rows = model.objects.only(*fields).order_by().iterator(chunk_size=batch_size)
+            batch = []
+            for instance in rows:
+                batch.append((instance.pk, weighted_terms(doc_type, instance)))
+                if len(batch) >= batch_size:
+                    _bulk_index(doc_type, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                _bulk_index(doc_type, batch)
+                total += len(batch)
+        # bulk_create không phát post_save → tự làm mới thống kê chỉ mục
+        transaction.on_commit(lambda: bump_generation(SearchDocument))
+    return total
+
+
+def index_documents(instances, batch_size=500):
+    """Index lại nhiều Product/Article (ghi hàng loạt bằng bulk_create/bulk_update, không có post_save)"""
+    by_type = defaultdict(list)
+    for instance in instances:
+        by_type[doc_type_of(instance)].append(instance)
+    with transaction.atomic():
+        for doc_type, items in by_type.items():
+            SearchDocument.objects.filter(
+                doc_type=doc_type, doc_id__in=[str(instance.pk) for instance in items]
+            ).delete()
+            for start in range(0, len(items), batch_size):
+                _bulk_index(doc_type, [
+                    (instance.pk, weighted_terms(doc_type, instance))
+                    for instance in items[start:start + batch_size]
+                ])
+        transaction.on_commit(lambda: bump_generation(SearchDocument))
+    return len(instances)
+
+
+def _bulk_index(doc_type, batch):
+    documents = SearchDocument.objects.bulk_create([
+        SearchDocument(doc_type=doc_type, doc_id=str(pk), length=sum(frequencies.values()))
+        for pk, frequencies in batch
+    ])
+    # bulk_create không trả pk trên MySQL → đọc lại id theo doc_id
+    if any(document.pk is None for document in documents):
+        ids = dict(SearchDocument.objects.filter(
+            doc_type=doc_type, doc_id__in=[str(pk) for pk, _ in batch]
+        ).values_list('doc_id', 'id'))
+    else:
+        ids = {document.doc_id: document.pk for document in documents}
+
+    SearchPosting.objects.bulk_create([
+        SearchPosting(term=term, document_id=ids[str(pk)], frequency=frequency)
+        for pk, frequencies in batch
+        for term, frequency in frequencies.items()
+    ], batch_size=2000)
+
+
+# ============================================================
+# QUERY
+# ============================================================
+def parse_query(query):
+    """
+    Tách query thành các term (tối đa MAX_QUERY_TERMS); term cuối được mở rộng theo prefix
+    (gõ tới đâu gợi ý tới đó) trừ khi query kết thúc bằng khoảng trắng.
+    """
+    terms = tokenize(query)[:MAX_QUERY_TERMS]
+    prefix = None
+    if terms and not query[-1:].isspace() and len(terms[-1]) >= MIN_PREFIX_LENGTH:
+        prefix = terms[-1]
+    return terms, prefix
+
+
+def collection_stats(doc_type=None):
+    """(số document, độ dài trung bình) cho BM25; chỉ tính lại khi chỉ mục đổi"""
+    key = f'search:stats:{doc_type or "all"}:{get_generation(SearchDocument)}'
+    stats = cache.get(key)
+    if stats is None:
+        documents = SearchDocument.objects.all()
+        if doc_type:
+            documents = documents.filter(doc_type=doc_type)
+        row = documents.aggregate(total=Count('id'), avg_length=Avg('length'))
+        stats = (row['total'] or 0, row['avg_length'] or 1.0)
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def expand_prefix(prefix):
+    """Term bắt đầu bằng prefix, nhiều document nhất trước (chỉ đọc index trên term)"""
+    return list(
+        SearchPosting.objects.filter(term__startswith=prefix)
+        .values('term').annotate(df=Count('id')).order_by('-df', 'term')
+        .values_list('term', flat=True)[:MAX_PREFIX_TERMS]
+    )
+
+
+def fetch_postings(terms, doc_type=None):
+    """
+    → ({term: số document}, [(term, frequency, document_id, doc_type, doc_id, length)]).
+    Term phổ biến chỉ lấy MAX_POSTINGS_PER_TERM posting tần suất cao nhất.
+    """
+    postings = SearchPosting.objects.all()
+    if doc_type:
+        postings = postings.filter(document__doc_type=doc_type)
+    doc_freq = dict(
+        postings.filter(term__in=terms).values('term').annotate(df=Count('id')).order_by()
+        .values_list('term', 'df')
+    )
+    fields = ('term', 'frequency', 'document_id', 'document__doc_type', 'document__doc_id', 'document__length')
+    rare = [term for term, df in doc_freq.items() if df <= MAX_POSTINGS_PER_TERM]
+    rows = list(postings.filter(term__in=rare).values_list(*fields)) if rare else []
+    for term, df in doc_freq.items():
+        if df > MAX_POSTINGS_PER_TERM:
+            rows.extend(postings.filter(term=term).order_by('-frequency').values_list(*fields)[:MAX_POSTINGS_PER_TERM])
+    return doc_freq, rows
+
+
+def search(query, doc_type=None, limit=10):
+    """
+    Tìm và xếp hạng BM25, trả về [(doc_type, doc_id, score), ...].
+    Document khớp nhiều term của query hơn luôn đứng trước.
+    """
+    terms, prefix = parse_query(query)
+    if not terms:
+        return []
+
+    total_docs, avg_length = collection_stats(doc_type)
+    if not total_docs:
+        return []
+
+    exact_terms = set(terms)
+    expanded = set(expand_prefix(prefix)) if prefix else set()
+    doc_freq, postings = fetch_postings(exact_terms | expanded, doc_type)
+
+    # Mỗi term của query → term trong chỉ mục có thể khớp nó
+    def query_slots(term):
+        slots = [index for index, query_term in enumerate(terms) if query_term == term]
+        if term in expanded:
+            slots.append(len(terms) - 1)
+        return set(slots)
+
+    # (document) → {slot query: điểm tốt nhất}
+    slot_scores = defaultdict(dict)
+    documents_info = {}
+    for term, frequency, document_id, dtype, doc_id, length in postings:
+        df = doc_freq[term]
+        idf = math.log(1 + (total_docs - df + 0.5) / (df + 0.5))
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+        score = idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        # Khớp prefix (chưa gõ xong) được điểm thấp hơn khớp trọn từ
+        if term not in exact_terms:
+            score *= 0.8
+        documents_info[document_id] = (dtype, doc_id)
+        for slot in query_slots(term):
+            if score > slot_scores[document_id].get(slot, 0):
+                slot_scores[document_id][slot] = score
+
+    ranked = sorted(
+        (
+            (len(scores), sum(scores.values()), documents_info[document_id])
+            for document_id, scores in slot_scores.items()
+        ),
+        key=lambda item: (item[0], item[1]),
+        reverse=True,
+    )
+    return [(dtype, doc_id, round(score, 4)) for _, score, (dtype, doc_id) in ranked[:limit]]
@@ -12,13 +12,58 @@ from .models import (
     AboutFeature, AboutValue, ActivityLog, Media
 )
 from django.contrib.auth.hashers import make_password
+from django.utils.text import Truncator
+from urllib.parse import urljoin
 import json
+import logging
+
+from .category_tree import build_children_map
+from .images import variant_data, variants_for_urls
+from .login_throttle import client_ip
+from .projection import SparseFieldsetMixin
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# 0. FIELDS DÙNG CHUNG
+# ============================================================
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Danh sách biến thể [{url, width, height, format}] của một URL ảnh (dùng cho srcset).
+    Biến thể của cả danh sách đang serialize được tra 1 lần, lưu trong context.
+    URL biến thể dùng cùng host với URL ảnh gốc.
+    first=True: source là list URL, lấy ảnh đầu tiên.
+    """
+
+    def __init__(self, first=False, **kwargs):
+        self.first = first
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        value = super().get_attribute(instance)
+        if self.first:
+            return value[0] if value else None
+        return value
+
+    def to_representation(self, url):
+        if not url:
+            return []
+        lookup = self.context.get('image_variants')
+        if lookup is None or url not in lookup:
+            instances = self.root.instance if isinstance(self.root, serializers.ListSerializer) else None
+            urls = {self.get_attribute(instance) for instance in instances or []} | {url}
+            lookup = {**(lookup or {}), **dict.fromkeys(urls, []), **variants_for_urls(urls)}
+            if isinstance(self.context, dict):
+                self.context['image_variants'] = lookup
+        # Biến thể nằm cùng host với ảnh gốc (URL ảnh gốc thường là tuyệt đối)
+        return [{**variant, 'url': urljoin(url, variant['url'])} for variant in lookup[url]]
 
 
 # ============================================================
 # 1. USER SERIALIZERS
 # ============================================================
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho User"""
     password = serializers.CharField(write_only=True, required=False)
     
@@ -49,7 +94,7 @@ class UserLoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True)
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho user profile (không có password)"""
     class Meta:
         model = User
@@ -59,15 +104,16 @@ class UserProfileSerializer(serializers.ModelSerializer):
 # ============================================================
 # 2. PRODUCT SERIALIZERS
 # ============================================================
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho Product - Compatible với MariaDB 10.4"""
     
-    # Override JSON fields to handle TextField storage
+    # JSON fields (JSONTextField): client gửi/nhận list
     features = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True)
     benefits = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True)
     packaging = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True)
     images = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True)
     image_labels = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True)
+    view_count = serializers.IntegerField(source='current_view_count', read_only=True)
     
     class Meta:
         model = Product
@@ -79,79 +125,6 @@ class ProductSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'view_count', 'created_at', 'updated_at']
     
-    def to_representation(self, instance):
-        """Convert TextField JSON to list when reading"""
-        data = super().to_representation(instance)
-        
-        # Parse JSON fields
-        data['features'] = instance.get_features()
-        data['benefits'] = instance.get_benefits()
-        data['packaging'] = instance.get_packaging()
-        data['images'] = instance.get_images()
-        data['image_labels'] = instance.get_image_labels()
-        
-        return data
-    
-    def to_internal_value(self, data):
-        """Convert list to JSON string when writing"""
-        internal_data = super().to_internal_value(data)
-        return internal_data
-    
-    def create(self, validated_data):
-        """Create product with JSON field conversion"""
-        # Extract list fields
-        features = validated_data.pop('features', None)
-        benefits = validated_data.pop('benefits', None)
-        packaging = validated_data.pop('packaging', None)
-        images = validated_data.pop('images', None)
-        image_labels = validated_data.pop('image_labels', None)
-        
-        # Create instance
-        instance = Product(**validated_data)
-        
-        # Set JSON fields using helper methods
-        if features is not None:
-            instance.set_features(features)
-        if benefits is not None:
-            instance.set_benefits(benefits)
-        if packaging is not None:
-            instance.set_packaging(packaging)
-        if images is not None:
-            instance.set_images(images)
-        if image_labels is not None:
-            instance.set_image_labels(image_labels)
-        
-        instance.save()
-        return instance
-    
-    def update(self, instance, validated_data):
-        """Update product with JSON field conversion"""
-        # Extract list fields
-        features = validated_data.pop('features', None)
-        benefits = validated_data.pop('benefits', None)
-        packaging = validated_data.pop('packaging', None)
-        images = validated_data.pop('images', None)
-        image_labels = validated_data.pop('image_labels', None)
-        
-        # Update regular fields
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        
-        # Update JSON fields using helper methods
-        if features is not None:
-            instance.set_features(features)
-        if benefits is not None:
-            instance.set_benefits(benefits)
-        if packaging is not None:
-            instance.set_packaging(packaging)
-        if images is not None:
-            instance.set_images(images)
-        if image_labels is not None:
-            instance.set_image_labels(image_labels)
-        
-        instance.save()
-        return instance
-    
     def validate_features(self, value):
         """Validate features phải là list"""
         if value and not isinstance(value, list):
@@ -165,56 +138,59 @@ class ProductSerializer(serializers.ModelSerializer):
         return value
 
 
-class ProductListSerializer(serializers.ModelSerializer):
-    """Serializer cho danh sách sản phẩm (compact)"""
-    images = serializers.SerializerMethodField()
+class ProductListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Serializer cho danh sách sản phẩm (compact)
+    Mặc định chỉ có ảnh đại diện (image); cả mảng images phải xin qua ?fields=...,images
+    """
+    description = serializers.SerializerMethodField()
+    image = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source='images', first=True)
+    images = serializers.ListField(read_only=True)
+    view_count = serializers.IntegerField(source='current_view_count', read_only=True)
+    
+    # Độ dài tối đa của mô tả trong danh sách (bản đầy đủ ở API chi tiết)
+    description_length = 300
     
     class Meta:
         model = Product
         fields = [
-            'id', 'name', 'category', 'description', 
+            'id', 'name', 'category', 'description', 'image', 'image_variants',
             'images', 'status', 'is_popular', 'view_count'
         ]
+        projection_sources = {'image': ['images']}
+        optional_fields = ['images']
     
-    def get_images(self, obj):
-        """Get parsed images"""
-        return obj.get_images()
+    def get_description(self, obj):
+        """Mô tả rút gọn cho card sản phẩm"""
+        return Truncator(obj.description or '').chars(self.description_length)
+    
+    def get_image(self, obj):
+        """Ảnh đại diện (ảnh đầu tiên)"""
+        return obj.images[0] if obj.images else None
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho chi tiết sản phẩm"""
-    features = serializers.SerializerMethodField()
-    benefits = serializers.SerializerMethodField()
-    packaging = serializers.SerializerMethodField()
-    images = serializers.SerializerMethodField()
-    image_labels = serializers.SerializerMethodField()
+    features = serializers.ListField(read_only=True)
+    benefits = serializers.ListField(read_only=True)
+    packaging = serializers.ListField(read_only=True)
+    images = serializers.ListField(read_only=True)
+    image_labels = serializers.ListField(read_only=True)
+    view_count = serializers.IntegerField(source='current_view_count', read_only=True)
     
     class Meta:
         model = Product
         fields = '__all__'
-    
-    def get_features(self, obj):
-        return obj.get_features()
-    
-    def get_benefits(self, obj):
-        return obj.get_benefits()
-    
-    def get_packaging(self, obj):
-        return obj.get_packaging()
-    
-    def get_images(self, obj):
-        return obj.get_images()
-    
-    def get_image_labels(self, obj):
-        return obj.get_image_labels()
 
 
 # ============================================================
 # 3. ARTICLE SERIALIZERS
 # ============================================================
-class ArticleSerializer(serializers.ModelSerializer):
+class ArticleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho Article - Compatible với MariaDB 10.4"""
     tags = serializers.ListField(child=serializers.CharField(), required=False, allow_null=True)
+    view_count = serializers.IntegerField(source='current_view_count', read_only=True)
     
     class Meta:
         model = Article
@@ -226,36 +202,27 @@ class ArticleSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'view_count', 'created_at', 'updated_at']
     
-    def to_representation(self, instance):
-        """Convert TextField JSON to list when reading"""
-        data = super().to_representation(instance)
-        data['tags'] = instance.get_tags()
-        return data
-    
     def create(self, validated_data):
-        """Create article with JSON field conversion"""
-        tags = validated_data.pop('tags', None)
-        
-        print(f'✅ [ArticleSerializer] Creating article with data: {validated_data.keys()}')
-        print(f'📝 [ArticleSerializer] Content length: {len(validated_data.get("content", ""))} chars')
-        print(f'📝 [ArticleSerializer] Status: {validated_data.get("status")}')
+        """Create article"""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Creating article', extra={
+                'fields': sorted(validated_data),
+                'content_length': len(validated_data.get('content') or ''),
+                'status': validated_data.get('status'),
+            })
         
         instance = Article(**validated_data)
-        
-        if tags is not None:
-            instance.set_tags(tags)
-        
-        print(f'📝 Creating new article: "{instance.title}" with status: {instance.status}')
         instance.save()  # Model.save() will auto-set published_at if status='published'
         return instance
     
     def update(self, instance, validated_data):
-        """Update article with JSON field conversion"""
-        tags = validated_data.pop('tags', None)
-        
-        print(f'✅ [ArticleSerializer] Updating article "{instance.title}" with data: {validated_data.keys()}')
-        print(f'📝 [ArticleSerializer] Content length: {len(validated_data.get("content", instance.content))} chars')
-        print(f'📝 [ArticleSerializer] Status: {validated_data.get("status", instance.status)}')
+        """Update article"""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Updating article %s', instance.pk, extra={
+                'fields': sorted(validated_data),
+                'content_length': len(validated_data.get('content', instance.content) or ''),
+                'status': validated_data.get('status', instance.status),
+            })
         
         # Track status change
         old_status = instance.status
@@ -264,50 +231,55 @@ class ArticleSerializer(serializers.ModelSerializer):
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
         
-        if tags is not None:
-            instance.set_tags(tags)
-        
         # Log status change
         if old_status != new_status:
-            print(f'📝 Article status changed: {old_status} → {new_status} for "{instance.title}"')
+            logger.info('Article %s status changed', instance.pk, extra={'old_status': old_status, 'new_status': new_status})
         
         instance.save()  # Model.save() will auto-set published_at
         return instance
 
 
-class ArticleListSerializer(serializers.ModelSerializer):
-    """Serializer cho danh sách bài viết (compact)"""
-    tags = serializers.SerializerMethodField()
+class ArticleListSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Serializer cho danh sách bài viết (compact)
+    Mặc định không có content: đọc bài qua /articles/{id}/ hoặc ?fields=...,content
+    """
+    excerpt = serializers.SerializerMethodField()
+    image_variants = ImageVariantsField(source='image')
+    tags = serializers.ListField(read_only=True)
+    view_count = serializers.IntegerField(source='current_view_count', read_only=True)
+    
+    # Độ dài tối đa của tóm tắt trong danh sách
+    excerpt_length = 250
     
     class Meta:
         model = Article
         fields = [
             'id', 'title', 'category', 'excerpt', 'content',
-            'image', 'author', 'tags', 'status', 'is_featured', 
+            'image', 'image_variants', 'author', 'tags', 'status', 'is_featured', 
             'read_time', 'published_at', 'view_count'
         ]
+        optional_fields = ['content']
     
-    def get_tags(self, obj):
-        """Get parsed tags"""
-        return obj.get_tags()
+    def get_excerpt(self, obj):
+        """Tóm tắt rút gọn cho card bài viết"""
+        return Truncator(obj.excerpt or '').chars(self.excerpt_length)
 
 
-class ArticleDetailSerializer(serializers.ModelSerializer):
+class ArticleDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho chi tiết bài viết"""
-    tags = serializers.SerializerMethodField()
+    tags = serializers.ListField(read_only=True)
+    view_count = serializers.IntegerField(source='current_view_count', read_only=True)
     
     class Meta:
         model = Article
         fields = '__all__'
-    
-    def get_tags(self, obj):
-        return obj.get_tags()
 
 
 # ============================================================
 # 4. CONTACT SERIALIZERS
 # ============================================================
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho Contact"""
     replied_by_username = serializers.CharField(source='replied_by.username', read_only=True)
     
@@ -322,7 +294,7 @@ class ContactSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at', 'replied_by_username']
 
 
-class ContactCreateSerializer(serializers.ModelSerializer):
+class ContactCreateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho tạo liên hệ từ frontend"""
     class Meta:
         model = Contact
@@ -337,13 +309,8 @@ class ContactCreateSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
     
     def get_client_ip(self, request):
-        """Lấy IP của client"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        """Lấy IP của client (chỉ tin X-Forwarded-For từ TRUSTED_PROXIES)"""
+        return client_ip(request)
 
 
 class ContactReplySerializer(serializers.Serializer):
@@ -354,7 +321,7 @@ class ContactReplySerializer(serializers.Serializer):
 # ============================================================
 # 5. SETTING SERIALIZERS
 # ============================================================
-class SettingSerializer(serializers.ModelSerializer):
+class SettingSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho Setting"""
     
     class Meta:
@@ -367,7 +334,7 @@ class SettingSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class SettingPublicSerializer(serializers.ModelSerializer):
+class SettingPublicSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho settings public (không cần auth)"""
     class Meta:
         model = Setting
@@ -382,7 +349,7 @@ class SettingBulkUpdateSerializer(serializers.Serializer):
 # ============================================================
 # 6. SOCIAL MEDIA SERIALIZERS
 # ============================================================
-class SocialMediaSerializer(serializers.ModelSerializer):
+class SocialMediaSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho Social Media"""
     
     class Meta:
@@ -397,7 +364,7 @@ class SocialMediaSerializer(serializers.ModelSerializer):
 # ============================================================
 # 7. CERTIFICATION SERIALIZERS
 # ============================================================
-class CertificationSerializer(serializers.ModelSerializer):
+class CertificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho Certification"""
     
     class Meta:
@@ -414,7 +381,7 @@ class CertificationSerializer(serializers.ModelSerializer):
 # ============================================================
 # 8. CATEGORY SERIALIZERS
 # ============================================================
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho Category"""
     children = serializers.SerializerMethodField()
     
@@ -428,30 +395,22 @@ class CategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
     
     def get_children(self, obj):
-        """Lấy danh mục con"""
-        if obj.children.exists():
-            return CategorySerializer(obj.children.all(), many=True).data
-        return []
-
-
-class CategoryTreeSerializer(serializers.ModelSerializer):
-    """Serializer cho cây danh mục"""
-    children = serializers.SerializerMethodField()
-    
-    class Meta:
-        model = Category
-        fields = ['id', 'name', 'slug', 'type', 'icon', 'color', 'children']
-    
-    def get_children(self, obj):
-        if obj.children.exists():
-            return CategoryTreeSerializer(obj.children.filter(is_active=True), many=True).data
+        """Lấy danh mục con (children_map load 1 lần cho cả lượt serialize)"""
+        children_map = self.context.get('children_map')
+        if children_map is None:
+            children_map = build_children_map()
+            if isinstance(self.context, dict):
+                self.context['children_map'] = children_map
+        children = children_map.get(obj.id)
+        if children:
+            return CategorySerializer(children, many=True, context={'children_map': children_map}).data
         return []
 
 
 # ============================================================
 # 9. ABOUT FEATURE SERIALIZERS
 # ============================================================
-class AboutFeatureSerializer(serializers.ModelSerializer):
+class AboutFeatureSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho About Feature"""
     
     class Meta:
@@ -463,7 +422,7 @@ class AboutFeatureSerializer(serializers.ModelSerializer):
 # ============================================================
 # 10. ABOUT VALUE SERIALIZERS
 # ============================================================
-class AboutValueSerializer(serializers.ModelSerializer):
+class AboutValueSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho About Value"""
     
     class Meta:
@@ -475,7 +434,7 @@ class AboutValueSerializer(serializers.ModelSerializer):
 # ============================================================
 # 11. ACTIVITY LOG SERIALIZERS
 # ============================================================
-class ActivityLogSerializer(serializers.ModelSerializer):
+class ActivityLogSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho Activity Log"""
     username = serializers.CharField(source='user.username', read_only=True)
     
@@ -492,9 +451,10 @@ class ActivityLogSerializer(serializers.ModelSerializer):
 # ============================================================
 # 12. MEDIA SERIALIZERS
 # ============================================================
-class MediaSerializer(serializers.ModelSerializer):
+class MediaSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer cho Media"""
     uploaded_by_username = serializers.CharField(source='uploaded_by.username', read_only=True)
+    variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Media
@@ -502,9 +462,18 @@ class MediaSerializer(serializers.ModelSerializer):
             'id', 'file_name', 'file_path', 'file_url', 'file_type', 
             'file_size', 'width', 'height', 'uploaded_by', 
             'uploaded_by_username', 'entity_type', 'entity_id', 
-            'is_public', 'created_at'
+            'is_public', 'created_at', 'variants'
         ]
         read_only_fields = ['id', 'created_at', 'uploaded_by', 'uploaded_by_username']
+    
+    def get_variants(self, obj):
+        """Biến thể WebP/AVIF theo độ rộng (prefetch 'variants' ở viewset)"""
+        request = self.context.get('request')
+        variants = [variant_data(variant) for variant in obj.variants.all()]
+        if request is not None:
+            for variant in variants:
+                variant['url'] = request.build_absolute_uri(variant['url'])
+        return variants
 
 
 class MediaUploadSerializer(serializers.Serializer):
@@ -525,3 +494,7 @@ class DashboardStatsSerializer(serializers.Serializer):
     today_contacts = serializers.IntegerField()
     total_product_views = serializers.IntegerField()
     total_article_views = serializers.IntegerField()
+    series = serializers.DictField(
+        child=serializers.ListField(child=serializers.DictField()),
+        help_text='contacts / product_views / article_views theo ngày: [{day, value}]'
+    )
@@ -0,0 +1,185 @@
+"""
+EBGreentek Settings Registry
+Giữ toàn bộ Setting trong bộ nhớ process, đồng bộ giữa các worker qua generation
+Tạo ngày: 2025-12-08
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .cache import bump_generation, get_generation
+from .fields import JSON_DECODE_ERRORS, json_loads
+from .models import Setting
+
+DEFAULT_VERSION_CHECK_INTERVAL = 2  # giây
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+
+
+def coerce_setting_value(value, setting_type):
+    """Chuyển setting_value (chuỗi) sang kiểu Python theo setting_type"""
+    if value is None:
+        return None
+    if setting_type == 'json':
+        try:
+            return json_loads(value)
+        except JSON_DECODE_ERRORS:
+            return None
+    if setting_type == 'number':
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        return int(number) if number.is_integer() and '.' not in value else number
+    if setting_type == 'boolean':
+        return value.strip().lower() in TRUE_VALUES
+    return value
+
+
+class SettingsRegistry:
+    """
+    Snapshot tất cả Setting:
+    - rows: dữ liệu SettingSerializer, theo thứ tự mặc định của model
+    - by_key: setting_key → row
+    - values: setting_key → giá trị đã ép kiểu
+
+    Snapshot được dựng lại khi generation của Setting thay đổi (save/delete
+    ở bất kỳ worker nào, hoặc bump thủ công sau bulk_update). Generation được
+    kiểm tra tối đa mỗi SETTINGS_REGISTRY_VERSION_CHECK giây.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._generation = None
+        self._checked_at = 0.0
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'SETTINGS_REGISTRY_VERSION_CHECK', DEFAULT_VERSION_CHECK_INTERVAL)
+
+    def invalidate(self):
+        """Bỏ snapshot hiện tại (gọi khi chính process này ghi Setting)"""
+        self._checked_at = 0.0
+        self._generation = None
+
+    def _load(self):
+        from .serializers import SettingSerializer
+
+        rows = SettingSerializer(Setting.objects.all(), many=True).data
+        return {
+            'rows': rows,
+            'by_key': {row['setting_key']: row for row in rows},
+            'values': {
+                row['setting_key']: coerce_setting_value(row['setting_value'], row['setting_type'])
+                for row in rows
+            },
+        }
+
+    def snapshot(self):
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._checked_at < self.check_interval:
+            return self._snapshot
+
+        generation = get_generation(Setting)
+        with self._lock:
+            if self._snapshot is None or generation != self._generation:
+                self._snapshot = self._load()
+                self._generation = generation
+            self._checked_at = now
+        return self._snapshot
+
+    def get(self, key, default=None):
+        value = self.snapshot()['values'].get(key)
+        return default if value is None else value
+
+    def rows(self, public_only=False):
+        rows = self.snapshot()['rows']
+        if public_only:
+            return [row for row in rows if row['is_public']]
+        return list(rows)
+
+    def row(self, key):
+        return self.snapshot()['by_key'].get(key)
+
+    def public_grouped(self):
+        """Settings public dạng {group: {key: value}} (value giữ nguyên chuỗi)"""
+        grouped = {}
+        for row in self.rows(public_only=True):
+            grouped.setdefault(row['setting_group'], {})[row['setting_key']] = row['setting_value']
+        return grouped
+
+
+settings_registry = SettingsRegistry()
+
+
+def get_setting(key, default=None):
+    """
+    Đọc setting đã ép kiểu (json → list/dict, number → int/float,
+    boolean → bool), không tốn query. Trả default nếu không có/rỗng.
+    """
+    return settings_registry.get(key, default)
+
+
+# ============================================================
+# BULK WRITE
+# ============================================================
+def apply_settings(values, batch_size=200):
+    """
+    Ghi nhiều setting trong một transaction:
+    1 query đọc các key đã có, bulk_create key mới, bulk_update key thay đổi,
+    bỏ qua key không đổi. Group lấy từ tiền tố key ("general.logo_url" → "general"),
+    setting ghi theo lô luôn public (giống update_or_create trước đây).
+
+    bulk_* không phát signal → tự bump generation sau khi commit.
+    Trả {'created': [...], 'updated': [...], 'unchanged': [...]}.
+    """
+    result = {'created': [], 'updated': [], 'unchanged': []}
+    now = timezone.now()
+
+    with transaction.atomic():
+        existing = {
+            setting.setting_key: setting
+            for setting in Setting.objects.select_for_update().filter(setting_key__in=list(values))
+        }
+        to_create = []
+        to_update = []
+        for key, value in values.items():
+            group = key.split('.')[0] if '.' in key else 'general'
+            setting = existing.get(key)
+            if setting is None:
+                to_create.append(Setting(
+                    setting_key=key, setting_value=value, setting_group=group,
+                    is_public=True, created_at=now, updated_at=now,
+                ))
+                result['created'].append(key)
+            elif (setting.setting_value, setting.setting_group, setting.is_public) == (value, group, True):
+                result['unchanged'].append(key)
+            else:
+                setting.setting_value = value
+                setting.setting_group = group
+                setting.is_public = True
+                setting.updated_at = now
+                to_update.append(setting)
+                result['updated'].append(key)
+
+        if to_create:
+            Setting.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            Setting.objects.bulk_update(
+                to_update, ['setting_value', 'setting_group', 'is_public', 'updated_at'],
+                batch_size=batch_size,
+            )
+        if to_create or to_update:
+            transaction.on_commit(_settings_changed)
+
+    return result
+
+
+def _settings_changed():
+    bump_generation(Setting)
+    settings_registry.invalidate()
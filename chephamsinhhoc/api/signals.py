@@ -0,0 +1,129 @@
+"""
+EBGreentek Signals
+Vô hiệu hóa cache và cập nhật chỉ mục tìm kiếm khi dữ liệu thay đổi
+Tạo ngày: 2025-12-02
+"""
+
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .cache import bump_generation, bump_object_versions
+from . import media_blobs
+from .models import Article, Contact, Media, Product, Setting
+from .reference_cache import reference_cache
+from .search import index_document, remove_document
+from .settings_registry import settings_registry
+from . import stats
+from .view_counter import views_flushed
+
+
+@receiver(post_save, dispatch_uid='api_bump_generation_on_save')
+@receiver(post_delete, dispatch_uid='api_bump_generation_on_delete')
+def bump_model_generation(sender, **kwargs):
+    """Mỗi lần save/delete một model của app api → tăng generation của model đó"""
+    if sender._meta.app_label == 'api':
+        bump_generation(sender)
+
+
+@receiver(views_flushed, dispatch_uid='api_bump_object_versions_on_views_flushed')
+def bump_object_versions_after_views_flushed(sender, pks, **kwargs):
+    """
+    view_counter ghi bằng .update() (không có post_save) → làm mới cache trang chi tiết vừa được xem.
+    Không tăng generation: flush chạy vài giây một lần, tăng generation sẽ xóa cache list/bootstrap
+    (và cache đọc replica) liên tục; list hiển thị view_count cũ tối đa API_RESPONSE_CACHE_TIMEOUT giây.
+    """
+    for model, model_pks in pks.items():
+        bump_object_versions(model, model_pks)
+
+
+@receiver(post_save, dispatch_uid='api_reference_cache_on_save')
+@receiver(post_delete, dispatch_uid='api_reference_cache_on_delete')
+def invalidate_reference_cache(sender, **kwargs):
+    """Process hiện tại bỏ payload cache ngay; worker khác thấy qua generation"""
+    if sender._meta.app_label == 'api':
+        reference_cache.invalidate(sender)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL, dispatch_uid='api_user_cache_on_save')
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL, dispatch_uid='api_user_cache_on_delete')
+def invalidate_user_cache(sender, instance, **kwargs):
+    """User đổi (khóa, đổi mật khẩu, đổi role...) → bỏ bản cache dùng cho xác thực"""
+    user_cache.invalidate(instance.pk)
+    if sender._meta.app_label != 'api':
+        # Model của app api đã được bump_model_generation tăng generation
+        bump_generation(sender)
+
+
+@receiver(post_save, sender=Product, dispatch_uid='api_index_product')
+@receiver(post_save, sender=Article, dispatch_uid='api_index_article')
+def update_search_index(sender, instance, update_fields=None, **kwargs):
+    """Index lại sản phẩm/bài viết sau khi lưu"""
+    if update_fields and update_fields <= {'view_count', 'updated_at'}:
+        return
+    index_document(instance)
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='api_unindex_product')
+@receiver(post_delete, sender=Article, dispatch_uid='api_unindex_article')
+def remove_from_search_index(sender, instance, **kwargs):
+    """Xóa sản phẩm/bài viết khỏi chỉ mục"""
+    remove_document(instance)
+
+
+@receiver(post_save, sender=Setting, dispatch_uid='api_invalidate_settings_on_save')
+@receiver(post_delete, sender=Setting, dispatch_uid='api_invalidate_settings_on_delete')
+def invalidate_settings_registry(sender, **kwargs):
+    """Process hiện tại đọc lại settings ngay; worker khác thấy qua generation"""
+    settings_registry.invalidate()
+
+
+@receiver(pre_save, sender=Product, dispatch_uid='api_stats_product_pre_save')
+@receiver(pre_save, sender=Article, dispatch_uid='api_stats_article_pre_save')
+@receiver(pre_save, sender=Contact, dispatch_uid='api_stats_contact_pre_save')
+def snapshot_dashboard_stats(sender, instance, update_fields=None, **kwargs):
+    """Ghi nhớ status/view_count cũ để tính delta cho dashboard stats"""
+    if update_fields and not {'status', 'view_count'} & set(update_fields):
+        instance._stats_previous = None
+        return
+    stats.snapshot_before_save(instance)
+
+
+@receiver(post_save, sender=Product, dispatch_uid='api_stats_product_save')
+@receiver(post_save, sender=Article, dispatch_uid='api_stats_article_save')
+@receiver(post_save, sender=Contact, dispatch_uid='api_stats_contact_save')
+def update_dashboard_stats(sender, instance, created, update_fields=None, **kwargs):
+    """Cập nhật dashboard stats theo delta của lần lưu"""
+    if update_fields and not {'status', 'view_count'} & set(update_fields):
+        return
+    stats.record_save(instance, created)
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='api_stats_product_delete')
+@receiver(post_delete, sender=Article, dispatch_uid='api_stats_article_delete')
+@receiver(post_delete, sender=Contact, dispatch_uid='api_stats_contact_delete')
+def remove_from_dashboard_stats(sender, instance, **kwargs):
+    stats.record_delete(instance)
+
+
+@receiver(views_flushed, dispatch_uid='api_stats_views_flushed')
+def add_views_to_dashboard_stats(sender, counts, **kwargs):
+    """Lượt xem vừa được view_counter ghi xuống DB"""
+    stats.record_views(counts)
+
+
+@receiver(pre_save, sender=Media, dispatch_uid='api_media_blob_pre_save')
+def snapshot_media_blob(sender, instance, **kwargs):
+    media_blobs.snapshot_before_save(instance)
+
+
+@receiver(post_save, sender=Media, dispatch_uid='api_media_blob_save')
+def update_media_blob_references(sender, instance, **kwargs):
+    """Đếm tham chiếu blob: +1 file mới, -1 file cũ"""
+    media_blobs.record_save(instance)
+
+
+@receiver(post_delete, sender=Media, dispatch_uid='api_media_blob_delete')
+def release_media_blob(sender, instance, **kwargs):
+    media_blobs.release_reference(instance.file.name)
@@ -0,0 +1,181 @@
+"""
+EBGreentek Dashboard Stats
+Số liệu dashboard tính sẵn trong bảng dashboard_stats, cập nhật dần theo thay đổi
+Tạo ngày: 2025-12-12
+"""
+
+import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .log_storage import day_start
+from .models import Article, Contact, DashboardStat, Product
+
+TOTALS_DAY = DashboardStat.TOTALS_DAY
+
+# Tổng hiện tại → hàm tính lại từ bảng gốc (dùng khi đối soát)
+TOTAL_METRICS = {
+    'total_products': lambda: Product.objects.filter(status='active').count(),
+    'total_articles': lambda: Article.objects.filter(status='published').count(),
+    'new_contacts': lambda: Contact.objects.filter(status='new').count(),
+    'total_product_views': lambda: Product.objects.aggregate(total=Sum('view_count'))['total'] or 0,
+    'total_article_views': lambda: Article.objects.aggregate(total=Sum('view_count'))['total'] or 0,
+}
+
+# Chuỗi theo ngày; views chỉ có từ view_counter nên không tính lại được
+SERIES_METRICS = ['contacts', 'product_views', 'article_views']
+
+# Model → (metric đếm theo status, status được đếm, metric tổng lượt xem, metric lượt xem theo ngày, metric số bản ghi theo ngày)
+TRACKED_MODELS = {
+    Product: ('total_products', 'active', 'total_product_views', 'product_views', None),
+    Article: ('total_articles', 'published', 'total_article_views', 'article_views', None),
+    Contact: ('new_contacts', 'new', None, None, 'contacts'),
+}
+
+
+def total_metrics(model):
+    """Các tổng phụ thuộc model (đối soát sau khi ghi hàng loạt không qua signals)"""
+    status_metric, _, views_metric, _, _ = TRACKED_MODELS[model]
+    return [metric for metric in (status_metric, views_metric) if metric]
+
+
+# ============================================================
+# GHI
+# ============================================================
+def increment(metric, delta, day=TOTALS_DAY):
+    """Cộng delta vào metric; tổng chưa có thì tính lại từ bảng gốc"""
+    if not delta:
+        return
+    rows = DashboardStat.objects.filter(day=day, metric=metric)
+    if rows.update(value=F('value') + delta):
+        return
+    if day == TOTALS_DAY:
+        # Tính sau khi thay đổi đã nằm trong DB nên đã gồm delta
+        reconcile_totals([metric])
+        return
+    if delta < 0:
+        return
+    try:
+        with transaction.atomic():
+            DashboardStat.objects.create(day=day, metric=metric, value=delta)
+    except IntegrityError:
+        rows.update(value=F('value') + delta)
+
+
+def set_value(metric, value, day=TOTALS_DAY):
+    DashboardStat.objects.update_or_create(day=day, metric=metric, defaults={'value': value})
+
+
+def snapshot_before_save(instance):
+    """pre_save: đọc status/view_count đang có trong DB để tính delta sau khi lưu"""
+    status_metric, status, views_metric, _, _ = TRACKED_MODELS[type(instance)]
+    if instance._state.adding:
+        instance._stats_previous = None
+        return
+    fields = ['status'] + (['view_count'] if views_metric else [])
+    instance._stats_previous = type(instance).objects.filter(pk=instance.pk).values(*fields).first()
+
+
+def record_save(instance, created):
+    status_metric, status, views_metric, _, count_series = TRACKED_MODELS[type(instance)]
+    previous = getattr(instance, '_stats_previous', None) or {}
+    instance._stats_previous = None
+
+    increment(status_metric, int(instance.status == status) - int(previous.get('status') == status))
+    if views_metric:
+        increment(views_metric, instance.view_count - previous.get('view_count', 0))
+    if created and count_series:
+        increment(count_series, 1, timezone.localdate(instance.created_at))
+
+
+def record_delete(instance):
+    status_metric, status, views_metric, _, count_series = TRACKED_MODELS[type(instance)]
+    increment(status_metric, -int(instance.status == status))
+    if views_metric:
+        increment(views_metric, -instance.view_count)
+    if count_series and instance.created_at:
+        increment(count_series, -1, timezone.localdate(instance.created_at))
+
+
+def record_views(counts):
+    """view_counter vừa ghi counts = {model: lượt xem} xuống DB"""
+    today = timezone.localdate()
+    with transaction.atomic():
+        for model, views in counts.items():
+            if model not in TRACKED_MODELS:
+                continue
+            _, _, total_metric, daily_metric, _ = TRACKED_MODELS[model]
+            increment(total_metric, views)
+            increment(daily_metric, views, today)
+
+
+# ============================================================
+# ĐỐI SOÁT
+# ============================================================
+def reconcile_totals(metrics=None):
+    """Tính lại các tổng từ bảng gốc, trả về {metric: giá trị}"""
+    values = {metric: TOTAL_METRICS[metric]() for metric in metrics or TOTAL_METRICS}
+    for metric, value in values.items():
+        set_value(metric, value)
+    return values
+
+
+def reconcile_contacts(days):
+    """Tính lại số liên hệ/ngày của N ngày gần nhất (range trên created_at, dùng được index)"""
+    today = timezone.localdate()
+    first_day = today - datetime.timedelta(days=days - 1)
+    counts = dict(
+        Contact.objects.filter(created_at__gte=day_start(first_day))
+        .annotate(day=TruncDate('created_at'))
+        .values_list('day')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    with transaction.atomic():
+        for offset in range(days):
+            day = first_day + datetime.timedelta(days=offset)
+            set_value('contacts', counts.get(day, 0), day)
+    return counts
+
+
+# ============================================================
+# ĐỌC
+# ============================================================
+def get_dashboard_stats(days=30):
+    """
+    Tổng + chuỗi N ngày gần nhất, đọc bằng 1 query trên unique index (day, metric).
+    Lần đầu (chưa có tổng) → đối soát tổng và số liên hệ/ngày từ bảng gốc.
+    """
+    today = timezone.localdate()
+    first_day = today - datetime.timedelta(days=days - 1)
+    rows = list(
+        DashboardStat.objects
+        .filter(Q(day=TOTALS_DAY) | Q(day__gte=first_day, day__lte=today))
+        .values_list('day', 'metric', 'value')
+    )
+
+    totals = {metric: value for day, metric, value in rows if day == TOTALS_DAY}
+    daily = {(day, metric): value for day, metric, value in rows if day != TOTALS_DAY}
+    missing = set(TOTAL_METRICS) - set(totals)
+    if missing:
+        totals.update(reconcile_totals(missing))
+        for day, total in reconcile_contacts(days).items():
+            daily[(day, 'contacts')] = total
+
+    series = {
+        metric: [
+            {'day': first_day + datetime.timedelta(days=offset),
+             'value': daily.get((first_day + datetime.timedelta(days=offset), metric), 0)}
+            for offset in range(days)
+        ]
+        for metric in SERIES_METRICS
+    }
+
+    return {
+        **totals,
+        'today_contacts': daily.get((today, 'contacts'), 0),
+        'series': series,
+    }
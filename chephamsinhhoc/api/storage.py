@@ -0,0 +1,132 @@
+"""
+EBGreentek Content-Addressed Storage
+Lưu mỗi nội dung file đúng 1 lần dưới tên là sha256 của nó (blobs/ab/cd/<sha256>.<ext>)
+Tạo ngày: 2025-12-14
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_PREFIX = 'blobs'
+# File tạm đang ghi dở trong blobs/ (gc_media_blobs --orphans dọn file sót)
+INCOMING_PREFIX = '.incoming-'
+
+
+# Magic bytes → content type
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+SNIFF_LENGTH = 12
+# Đuôi blob theo content type đã sniff. Đuôi quyết định Content-Type khi serve, nên không lấy
+# từ tên file client gửi: PNG hợp lệ đặt tên x.html sẽ thành trang HTML (stored XSS)
+BLOB_EXTENSIONS = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+}
+
+
+def sniff_image_type(head):
+    """Content type theo magic bytes của vài byte đầu, None nếu không phải ảnh được hỗ trợ"""
+    for signature, content_type in SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+def blob_name(digest, content_type=None):
+    """sha256 + đuôi theo content type → blobs/ab/cd/<sha256>.png (không rõ loại → không có đuôi)"""
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{BLOB_EXTENSIONS.get(content_type, "")}'
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage đặt tên file theo nội dung.
+
+    - save(): băm sha256 trong lúc ghi ra file tạm cùng thư mục, rồi đổi tên
+      thành blob; blob đã có → bỏ file tạm, trả tên blob cũ (không ghi lần 2)
+    - File cũ không theo dạng blob (uploads/...) vẫn đọc/xóa bình thường
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Tên thật do nội dung quyết định trong _save; cùng nội dung → cùng tên
+        return name
+
+    def _save(self, name, content):
+        return self.save_blob(content)[0]
+
+    def incoming_dir(self):
+        """Thư mục file tạm: cùng filesystem với blob nên đổi tên là xong, không copy"""
+        directory = os.path.join(self.location, BLOB_PREFIX)
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def save_blob(self, content):
+        """Ghi content (băm + sniff loại file trong lúc ghi), trả (tên blob, created)"""
+        hasher = hashlib.sha256()
+        head = b''
+        if hasattr(content, 'seek'):
+            content.seek(0)
+        fd, temp_path = tempfile.mkstemp(dir=self.incoming_dir(), prefix=INCOMING_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in content.chunks():
+                    head += chunk[:SNIFF_LENGTH - len(head)]
+                    hasher.update(chunk)
+                    temp.write(chunk)
+            return self._commit(temp_path, blob_name(hasher.hexdigest(), sniff_image_type(head)))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _commit(self, temp_path, name):
+        """Đưa file tạm vào vị trí blob; blob đã có thì bỏ file tạm"""
+        path = self.path(name)
+        if os.path.exists(path):
+            os.remove(temp_path)
+            # Làm mới mtime để GC không xóa blob vừa được dùng lại
+            os.utime(path)
+            return name, False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if self.file_permissions_mode is not None:
+            os.chmod(temp_path, self.file_permissions_mode)
+        os.replace(temp_path, path)
+        return name, True
+
+    def commit_incoming(self, temp_path, digest, content_type):
+        """
+        File tạm đã băm sẵn (upload handler ghi thẳng vào incoming_dir) → blob, trả (tên, created).
+        content_type: đã xác định theo magic bytes, không phải header của client.
+        """
+        if os.path.dirname(os.path.abspath(temp_path)) != os.path.abspath(self.incoming_dir()):
+            raise ValueError(f'{temp_path} không nằm trong {self.incoming_dir()}')
+        return self._commit(temp_path, blob_name(digest, content_type))
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def store_blob(content):
+    """
+    Lưu file upload theo nội dung, trả (tên blob, created).
+    File từ ImageUploadHandler (api/uploads.py) đã băm, đã sniff content_type và nằm sẵn
+    trong incoming_dir → chỉ đổi tên (hoặc bỏ nếu nội dung đã có), không đọc/ghi lại.
+    """
+    digest = getattr(content, 'sha256', None)
+    if digest and hasattr(content, 'temporary_file_path'):
+        return content_addressed_storage.commit_incoming(
+            content.temporary_file_path(), digest, content.content_type,
+        )
+    return content_addressed_storage.save_blob(content)
@@ -1,3 +1,896 @@
-from django.test import TestCase
+"""
+EBGreentek Tests
+Kiểm tra hành vi các lớp hiệu năng: view counter, response cache, pagination, settings, stats,
+upload, đăng nhập
+Tạo ngày: 2025-12-22
+"""
 
-# Create your tests here.
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from .cache import get_generation, get_object_version
+from .instrumentation import InstrumentationMiddleware, SamplingProfiler, metrics_view
+from .login_throttle import LocalBucketStore, LoginThrottle, client_ip, login_throttle
+from . import bulk_io, log_storage, search, stats
+from .models import ActivityLog, ActivityLogRollup, Article, Contact, DashboardStat, Product, SearchDocument, Setting
+from .pagination import KeysetPagination
+from .settings_registry import apply_settings
+from .storage import content_addressed_storage
+from .uploads import ImageUploadHandler, UploadRejected
+from .view_counter import ViewCounter, view_counter, views_flushed
+
+# Cache riêng cho test: không đụng file cache / generation của site thật
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'api-tests'}}
+
+
+def make_product(**fields):
+    return Product.objects.create(**{'name': 'Men vi sinh', 'category': 'vi-sinh', 'description': 'Mô tả', **fields})
+
+
+class CacheIsolatedTestCase(TestCase):
+    """TestCase với LocMemCache trống cho mỗi test"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls._cache_override = override_settings(CACHES=TEST_CACHES)
+        cls._cache_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._cache_override.disable()
+
+    def setUp(self):
+        cache.clear()
+
+
+# ============================================================
+# VIEW COUNTER
+# ============================================================
+@override_settings(VIEW_COUNTER_FLUSH_INTERVAL=10)
+class ViewCounterTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Không chạy thread flush nền: test gọi flush() trực tiếp
+        patcher = mock.patch.object(ViewCounter, '_ensure_flusher')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.counter = ViewCounter()
+        self.product = make_product()
+
+    def view_count(self):
+        return Product.objects.values_list('view_count', flat=True).get(pk=self.product.pk)
+
+    def test_increment_stays_in_memory_until_flush(self):
+        for _ in range(3):
+            self.counter.increment(Product, self.product.pk)
+
+        self.assertEqual(self.view_count(), 0)
+        self.assertEqual(self.counter.pending(Product, self.product.pk), 3)
+
+        self.assertEqual(self.counter.flush(), 3)
+        self.assertEqual(self.view_count(), 3)
+        self.assertEqual(self.counter.pending(Product, self.product.pk), 0)
+
+    def test_failed_flush_requeues_deltas(self):
+        self.counter.increment(Product, self.product.pk, amount=2)
+
+        with mock.patch('api.view_counter.transaction.atomic', side_effect=DatabaseError), \
+                self.assertLogs('api.view_counter', 'ERROR'):
+            self.assertEqual(self.counter.flush(), 0)
+
+        self.assertEqual(self.view_count(), 0)
+        self.assertEqual(self.counter.pending(Product, self.product.pk), 2)
+
+        self.counter.increment(Product, self.product.pk)
+        self.assertEqual(self.counter.flush(), 3)
+        self.assertEqual(self.view_count(), 3)
+
+    def test_flush_notifies_receivers_without_bumping_generation(self):
+        received = []
+
+        def receiver(sender, counts, pks, **kwargs):
+            received.append((counts, pks))
+
+        views_flushed.connect(receiver)
+        self.addCleanup(views_flushed.disconnect, receiver)
+        generation = get_generation(Product)
+        version = get_object_version(Product, self.product.pk)
+
+        self.counter.increment(Product, self.product.pk)
+        self.counter.flush()
+
+        self.assertEqual(received, [({Product: 1}, {Product: [self.product.pk]})])
+        # Chỉ trang chi tiết được làm mới; cache list/bootstrap giữ nguyên
+        self.assertEqual(get_generation(Product), generation)
+        self.assertNotEqual(get_object_version(Product, self.product.pk), version)
+
+    def test_flush_without_pending_is_noop(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.counter.flush(), 0)
+
+
+# ============================================================
+# RESPONSE CACHE
+# ============================================================
+class ResponseCacheTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.product = make_product()
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.client.get('/api/products/')
+        second = self.client.get('/api/products/')
+
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertEqual(first.data, second.data)
+
+    def test_matching_if_none_match_returns_304(self):
+        etag = self.client.get('/api/products/')['ETag']
+
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(response.content)
+
+    def test_save_bumps_generation_and_invalidates(self):
+        generation = get_generation(Product)
+        etag = self.client.get('/api/products/')['ETag']
+
+        self.product.name = 'Men vi sinh mới'
+        self.product.save()
+
+        self.assertGreater(get_generation(Product), generation)
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['results'][0]['name'], 'Men vi sinh mới')
+
+    @override_settings(VIEW_COUNTER_FLUSH_INTERVAL=10)
+    @mock.patch.object(ViewCounter, '_ensure_flusher')
+    def test_view_flush_refreshes_detail_but_keeps_list_cached(self, ensure_flusher):
+        self.addCleanup(view_counter.flush)
+        detail_url = f'/api/products/{self.product.pk}/'
+        self.client.get('/api/products/')
+        self.client.get(detail_url)
+        self.assertEqual(self.client.get(detail_url)['X-Cache'], 'HIT')
+
+        view_counter.flush()
+
+        self.assertEqual(self.client.get('/api/products/')['X-Cache'], 'HIT')
+        detail = self.client.get(detail_url)
+        self.assertEqual(detail['X-Cache'], 'MISS')
+        # 2 lượt đã ghi DB + lượt của chính request này (đang chờ flush)
+        self.assertEqual(detail.data['view_count'], 3)
+
+    def test_cache_key_separates_anonymous_and_authenticated(self):
+        self.client.get('/api/products/')
+        self.client.force_authenticate(user=get_user_model().objects.create_user('editor', password='secret-123'))
+
+        self.assertEqual(self.client.get('/api/products/')['X-Cache'], 'MISS')
+
+
+# ============================================================
+# LIST PROJECTION
+# ============================================================
+class ListProjectionTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.images = [f'https://cdn.example.com/men-vi-sinh-{i}.jpg' for i in range(6)]
+        make_product(images=self.images)
+        Article.objects.create(
+            title='Nuôi tôm', category='thuy-san', excerpt='Tóm tắt', content='Nội dung ' * 500,
+            status='published', published_at=timezone.now(),
+        )
+
+    def first(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, response.data['results'][0]
+
+    def test_public_product_list_ships_only_cover_image(self):
+        _, product = self.first('/api/products/')
+
+        self.assertNotIn('images', product)
+        self.assertEqual(product['image'], self.images[0])
+
+    def test_admin_projection_opts_into_images(self):
+        self.first('/api/products/')
+        projected, product = self.first('/api/products/?fields=id,name,image,images')
+
+        self.assertEqual(set(product), {'id', 'name', 'image', 'images'})
+        self.assertEqual(product['images'], self.images)
+        # Projection riêng có cache key riêng, không dùng lại bản công khai
+        self.assertEqual(projected['X-Cache'], 'MISS')
+
+    def test_article_content_only_through_fields(self):
+        slim, article = self.first('/api/articles/')
+        self.assertNotIn('content', article)
+
+        full, article = self.first('/api/articles/?fields=id,title,content')
+        self.assertEqual(article['content'], 'Nội dung ' * 500)
+        self.assertLess(len(slim.content), len(full.content))
+
+
+# ============================================================
+# JSON TEXT FIELD
+# ============================================================
+class JSONTextFieldTests(TestCase):
+    # Định dạng khác với json_dumps: encode lại sẽ đổi chuỗi trong DB
+    RAW = '["a.jpg",   "b.jpg"]'
+
+    def setUp(self):
+        self.pk = make_product().pk
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE products SET images = %s WHERE id = %s', [self.RAW, self.pk])
+
+    def raw_images(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT images FROM products WHERE id = %s', [self.pk])
+            return cursor.fetchone()[0]
+
+    def test_read_but_unchanged_value_keeps_raw_string(self):
+        product = Product.objects.get(pk=self.pk)
+        self.assertEqual(product.images, ['a.jpg', 'b.jpg'])
+        product.images = ['a.jpg', 'b.jpg']
+
+        with mock.patch('api.fields.json_dumps') as json_dumps:
+            product.save()
+
+        json_dumps.assert_not_called()
+        self.assertEqual(self.raw_images(), self.RAW)
+
+    def test_mutated_value_is_encoded(self):
+        product = Product.objects.get(pk=self.pk)
+        product.images.append('c.jpg')
+        product.save()
+
+        self.assertEqual(json.loads(self.raw_images()), ['a.jpg', 'b.jpg', 'c.jpg'])
+
+    def test_refresh_drops_stale_original(self):
+        product = Product.objects.get(pk=self.pk)
+        product.images
+        Product.objects.filter(pk=self.pk).update(images=['z.jpg'])
+        product.refresh_from_db()
+
+        product.images = ['a.jpg', 'b.jpg']
+        product.save()
+
+        self.assertEqual(json.loads(self.raw_images()), ['a.jpg', 'b.jpg'])
+
+
+# ============================================================
+# SEARCH
+# ============================================================
+class SearchTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.vi_sinh = make_product(name='Men vi sinh xử lý nước thải', description='Chế phẩm vi sinh')
+        self.phan_bon = make_product(name='Phân bón hữu cơ', description='Chế phẩm cho cây trồng')
+        self.chan_nuoi = make_product(name='Men tiêu hóa chăn nuôi', description='Khử mùi chuồng trại')
+
+    def ids(self, query, **kwargs):
+        return [doc_id for _, doc_id, _ in search.search(query, **kwargs)]
+
+    def test_ranks_documents_matching_more_terms_first(self):
+        self.assertEqual(self.ids('vi sinh nuoc')[0], self.vi_sinh.pk)
+        self.assertEqual(set(self.ids('che pham')), {self.vi_sinh.pk, self.phan_bon.pk})
+
+    def test_prefix_expands_only_from_min_length(self):
+        self.assertEqual(self.ids('chuo'), [self.chan_nuoi.pk])
+        # "ch" quá ngắn để mở rộng: chỉ khớp trọn từ
+        self.assertEqual(self.ids('ch'), [])
+
+    def test_prefix_expansion_is_capped_by_document_frequency(self):
+        with mock.patch.object(search, 'MAX_PREFIX_TERMS', 1):
+            # che (2 document) giữ lại; chan, chuong (1 document) bị bỏ
+            self.assertEqual(search.expand_prefix('ch'), ['che'])
+
+    def test_common_term_postings_are_bounded(self):
+        with mock.patch.object(search, 'MAX_POSTINGS_PER_TERM', 1):
+            doc_freq, rows = search.fetch_postings({'che', 'trai'})
+
+        self.assertEqual(doc_freq, {'che': 2, 'trai': 1})
+        self.assertEqual(sorted(term for term, *_ in rows), ['che', 'trai'])
+
+    def test_collection_stats_are_cached_until_index_changes(self):
+        search.collection_stats()
+        with self.assertNumQueries(0):
+            self.assertEqual(search.collection_stats()[0], 3)
+
+        make_product(name='Enzyme', description='Lợi khuẩn')
+        self.assertEqual(search.collection_stats()[0], 4)
+
+
+# ============================================================
+# KEYSET PAGINATION
+# ============================================================
+class KeysetPaginationTests(TestCase):
+    ENTITY_TYPES = [None, 'b', 'a', None, 'c', 'a', None, 'b', 'a']
+
+    @classmethod
+    def setUpTestData(cls):
+        ActivityLog.objects.bulk_create([
+            ActivityLog(action='update', entity_type=entity_type) for entity_type in cls.ENTITY_TYPES
+        ])
+
+    def expected(self, descending):
+        """Thứ tự mong đợi: NULL đầu khi tăng dần / cuối khi giảm dần, pk cùng chiều làm khóa phụ"""
+        rows = list(ActivityLog.objects.values_list('entity_type', 'pk'))
+        rows.sort(key=lambda row: (row[0] is not None, row[0] or '', row[1]), reverse=descending)
+        return [pk for _, pk in rows]
+
+    def test_order_by_puts_nulls_like_mysql(self):
+        paginator = KeysetPagination()
+        for ordering, descending in (('entity_type', False), ('-entity_type', True)):
+            with self.subTest(ordering=ordering):
+                queryset = ActivityLog.objects.order_by(ordering)
+                keys = paginator.get_ordering(queryset)
+                ordered = queryset.order_by(*paginator.order_by(keys)).values_list('pk', flat=True)
+                self.assertEqual(list(ordered), self.expected(descending))
+
+    def test_after_matches_rows_following_each_key(self):
+        paginator = KeysetPagination()
+        for ordering, descending in (('entity_type', False), ('-entity_type', True)):
+            queryset = ActivityLog.objects.order_by(ordering)
+            keys = paginator.get_ordering(queryset)
+            expected = self.expected(descending)
+            for index, pk in enumerate(expected):
+                row = ActivityLog.objects.get(pk=pk)
+                values = [getattr(row, field.attname) for field, _ in keys]
+                with self.subTest(ordering=ordering, entity_type=row.entity_type, pk=pk):
+                    after = queryset.filter(paginator.after(keys, values)).values_list('pk', flat=True)
+                    before = queryset.filter(paginator.after(keys, values, reverse=True)).values_list('pk', flat=True)
+                    self.assertEqual(set(after), set(expected[index + 1:]))
+                    self.assertEqual(set(before), set(expected[:index]))
+
+    def paginate(self, url, ordering):
+        paginator = KeysetPagination(page_size=2)
+        request = Request(APIRequestFactory().get(url))
+        rows = paginator.paginate_queryset(ActivityLog.objects.order_by(ordering), request)
+        return [row.pk for row in rows], paginator.next_link, paginator.previous_link
+
+    def test_cursor_round_trip(self):
+        for ordering, descending in (('entity_type', False), ('-entity_type', True)):
+            with self.subTest(ordering=ordering):
+                pages, url = [], '/api/activity-logs/'
+                while url:
+                    rows, url, previous = self.paginate(url, ordering)
+                    self.assertEqual(previous is None, not pages)
+                    pages.append(rows)
+                self.assertEqual(sum(pages, []), self.expected(descending))
+
+                # Từ trang cuối đi ngược bằng previous về trang đầu
+                backwards = [pages[-1]]
+                while previous:
+                    rows, _, previous = self.paginate(previous, ordering)
+                    backwards.append(rows)
+                self.assertEqual(backwards[::-1], pages)
+
+    def test_invalid_cursor_is_not_found(self):
+        with self.assertRaises(NotFound):
+            self.paginate('/api/activity-logs/?cursor=not-a-cursor', 'entity_type')
+
+
+# ============================================================
+# ACTIVITY LOG STORAGE
+# ============================================================
+class ActivityLogStorageTests(CacheIsolatedTestCase):
+    DAY = datetime.date(2025, 1, 10)
+
+    def setUp(self):
+        super().setUp()
+        self.archive = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive, ignore_errors=True)
+
+    def make_logs(self, count, action='login'):
+        created_at = log_storage.day_start(self.DAY) + datetime.timedelta(hours=9)
+        return ActivityLog.objects.bulk_create(
+            [ActivityLog(action=action, created_at=created_at) for _ in range(count)]
+        )
+
+    def rollup_counts(self):
+        return list(ActivityLogRollup.objects.values_list('day', 'action', 'user_key', 'count'))
+
+    def test_anonymous_rollups_share_one_row(self):
+        log_storage.add_to_rollups(self.make_logs(2))
+        log_storage.add_to_rollups(self.make_logs(3))
+
+        self.assertEqual(self.rollup_counts(), [(self.DAY, 'login', 0, 5)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ActivityLogRollup.objects.create(day=self.DAY, action='login', count=1)
+
+    def test_archive_rebuilds_existing_rollup_of_archived_day(self):
+        self.make_logs(4)
+        # Rollup lệch (vd. ghi rollup lỗi lúc chạy) → archive phải sửa, không giữ nguyên
+        ActivityLogRollup.objects.create(day=self.DAY, action='login', count=1)
+
+        archived = log_storage.archive_logs(self.DAY + datetime.timedelta(days=1), directory=self.archive)
+
+        self.assertEqual(archived, {self.DAY: 4})
+        self.assertFalse(ActivityLog.objects.exists())
+        self.assertEqual(self.rollup_counts(), [(self.DAY, 'login', 0, 4)])
+
+        # Chạy lại: ngày đã xóa hết log, rollup giữ nguyên
+        self.assertEqual(log_storage.archive_logs(self.DAY + datetime.timedelta(days=1), directory=self.archive), {})
+        self.assertEqual(self.rollup_counts(), [(self.DAY, 'login', 0, 4)])
+
+    def test_archive_segment_holds_every_log_of_the_day(self):
+        self.make_logs(5)
+
+        log_storage.archive_logs(self.DAY + datetime.timedelta(days=1), directory=self.archive, chunk_size=2)
+
+        with gzip.open(log_storage.segment_path(self.DAY, self.archive), 'rt', encoding='utf-8') as segment:
+            self.assertEqual(len(segment.readlines()), 5)
+
+
+# ============================================================
+# SETTINGS BULK UPDATE
+# ============================================================
+class ApplySettingsTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        Setting.objects.create(setting_key='general.site_name', setting_value='EBGreentek',
+                               setting_group='general', is_public=True)
+        Setting.objects.create(setting_key='contact.phone', setting_value='0900000000',
+                               setting_group='contact', is_public=True)
+        # Giá trị giữ nguyên nhưng chưa public → vẫn phải ghi
+        Setting.objects.create(setting_key='contact.email', setting_value='info@example.com',
+                               setting_group='general', is_public=False)
+
+    def test_classifies_created_updated_unchanged(self):
+        generation = get_generation(Setting)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            result = apply_settings({
+                'general.site_name': 'EBGreentek',
+                'contact.phone': '0911111111',
+                'contact.email': 'info@example.com',
+                'social.zalo': 'https://zalo.me/ebgreentek',
+            })
+
+        self.assertEqual(result, {
+            'created': ['social.zalo'],
+            'updated': ['contact.phone', 'contact.email'],
+            'unchanged': ['general.site_name'],
+        })
+        self.assertEqual(len(callbacks), 1)
+        self.assertGreater(get_generation(Setting), generation)
+
+        rows = {row.setting_key: row for row in Setting.objects.all()}
+        self.assertEqual(rows['contact.phone'].setting_value, '0911111111')
+        self.assertEqual((rows['contact.email'].setting_group, rows['contact.email'].is_public), ('contact', True))
+        self.assertEqual((rows['social.zalo'].setting_group, rows['social.zalo'].is_public), ('social', True))
+
+    def test_unchanged_values_write_nothing(self):
+        updated_at = Setting.objects.get(setting_key='general.site_name').updated_at
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            result = apply_settings({'general.site_name': 'EBGreentek', 'contact.phone': '0900000000'})
+
+        self.assertEqual(result['unchanged'], ['general.site_name', 'contact.phone'])
+        self.assertEqual(result['created'] + result['updated'], [])
+        self.assertEqual(callbacks, [])
+        self.assertEqual(Setting.objects.get(setting_key='general.site_name').updated_at, updated_at)
+
+    def test_key_without_prefix_goes_to_general_group(self):
+        result = apply_settings({'hotline': '1900 0000'})
+
+        self.assertEqual(result['created'], ['hotline'])
+        self.assertEqual(Setting.objects.get(setting_key='hotline').setting_group, 'general')
+
+
+# ============================================================
+# DASHBOARD STATS
+# ============================================================
+class DashboardStatsTests(CacheIsolatedTestCase):
+
+    def setUp(self):
+        super().setUp()
+        stats.reconcile_totals()
+
+    def stat(self, metric, day=DashboardStat.TOTALS_DAY):
+        row = DashboardStat.objects.filter(day=day, metric=metric).first()
+        return row.value if row else 0
+
+    def test_product_save_and_delete_deltas(self):
+        product = make_product(view_count=5)
+        self.assertEqual((self.stat('total_products'), self.stat('total_product_views')), (1, 5))
+
+        product.status = 'inactive'
+        product.view_count = 7
+        product.save()
+        self.assertEqual((self.stat('total_products'), self.stat('total_product_views')), (0, 7))
+
+        # Trạng thái không đổi → tổng giữ nguyên
+        product.name = 'Tên khác'
+        product.save()
+        self.assertEqual(self.stat('total_products'), 0)
+
+        product.status = 'active'
+        product.save(update_fields=['status'])
+        self.assertEqual(self.stat('total_products'), 1)
+
+        product.delete()
+        self.assertEqual((self.stat('total_products'), self.stat('total_product_views')), (0, 0))
+
+    def test_contact_deltas_update_total_and_daily_series(self):
+        contact = Contact.objects.create(name='Khách', email='khach@example.com', message='Xin báo giá')
+        day = timezone.localdate(contact.created_at)
+        self.assertEqual((self.stat('new_contacts'), self.stat('contacts', day)), (1, 1))
+
+        contact.status = 'replied'
+        contact.save()
+        self.assertEqual((self.stat('new_contacts'), self.stat('contacts', day)), (0, 1))
+
+        contact.delete()
+        self.assertEqual((self.stat('new_contacts'), self.stat('contacts', day)), (0, 0))
+
+    def test_inactive_product_never_counts(self):
+        product = make_product(status='inactive')
+        product.delete()
+        self.assertEqual((self.stat('total_products'), self.stat('total_product_views')), (0, 0))
+
+    def test_missing_total_is_reconciled_from_source_tables(self):
+        make_product()
+        make_product()
+        DashboardStat.objects.filter(metric='total_products').delete()
+
+        make_product()
+
+        self.assertEqual(self.stat('total_products'), 3)
+
+    def test_incremental_totals_match_reconcile(self):
+        products = [make_product(view_count=i) for i in range(4)]
+        products[0].status = 'inactive'
+        products[0].save()
+        products[1].delete()
+        Contact.objects.create(name='Khách', email='khach@example.com', message='Xin báo giá')
+
+        incremental = {metric: self.stat(metric) for metric in stats.TOTAL_METRICS}
+        self.assertEqual(incremental, stats.reconcile_totals())
+
+
+# ============================================================
+# UPLOAD
+# ============================================================
+def png_bytes(size=(32, 24)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (40, 160, 90)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class MediaRootTestCase(CacheIsolatedTestCase):
+    """MEDIA_ROOT tạm cho mỗi test"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp(prefix='api-tests-media-')
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def incoming_files(self):
+        return os.listdir(content_addressed_storage.incoming_dir())
+
+
+class ImageUploadHandlerTests(MediaRootTestCase):
+
+    def start(self, max_size=1024 * 1024, content_length=None):
+        handler = ImageUploadHandler(max_size=max_size)
+        handler.new_file('image', 'anh.png', 'image/png', content_length)
+        return handler
+
+    def test_accepts_image_and_sniffs_type(self):
+        data = png_bytes()
+        handler = self.start()
+        handler.receive_data_chunk(data[:5], 0)
+        handler.receive_data_chunk(data[5:], 5)
+
+        file = handler.file_complete(len(data))
+
+        self.assertEqual(file.content_type, 'image/png')
+        self.assertEqual(file.size, len(data))
+        self.assertEqual(file.sha256, hashlib.sha256(data).hexdigest())
+        file.close()
+
+    def test_rejects_bad_magic_bytes_on_first_chunk(self):
+        handler = self.start()
+
+        with self.assertRaisesMessage(UploadRejected, 'Chỉ chấp nhận file ảnh'):
+            handler.receive_data_chunk(b'<html><script>alert(1)</script></html>', 0)
+
+        self.assertEqual(self.incoming_files(), [])
+
+    def test_rejects_short_non_image_on_complete(self):
+        handler = self.start()
+        handler.receive_data_chunk(b'GIF', 0)
+
+        with self.assertRaises(UploadRejected):
+            handler.file_complete(3)
+
+        self.assertEqual(self.incoming_files(), [])
+
+    def test_rejects_declared_oversize_before_reading(self):
+        handler = ImageUploadHandler(max_size=1024)
+
+        with self.assertRaisesMessage(UploadRejected, 'File quá lớn'):
+            handler.new_file('image', 'anh.png', 'image/png', 2048)
+        with self.assertRaisesMessage(UploadRejected, 'File quá lớn'):
+            handler.handle_raw_input(None, {}, 1024 * 1024, b'boundary')
+
+    def test_rejects_oversize_while_streaming(self):
+        data = png_bytes((256, 256)) + bytes(4096)
+        handler = self.start(max_size=len(data) - 1)
+        handler.receive_data_chunk(data[:1024], 0)
+
+        with self.assertRaisesMessage(UploadRejected, 'File quá lớn'):
+            handler.receive_data_chunk(data[1024:], 1024)
+
+        self.assertEqual(self.incoming_files(), [])
+
+
+class UploadImageViewTests(MediaRootTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(user=get_user_model().objects.create_user('editor', password='secret-123'))
+
+    def upload(self, name, data, content_type='image/png'):
+        image = SimpleUploadedFile(name, data, content_type=content_type)
+        return self.client.post('/api/upload-image/', {'image': image}, format='multipart')
+
+    def test_non_image_with_image_name_is_rejected(self):
+        response = self.upload('anh.png', b'<svg onload="alert(1)"></svg>' * 4)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Chỉ chấp nhận file ảnh', response.data['error'])
+        self.assertEqual(self.incoming_files(), [])
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1024)
+    def test_oversize_upload_is_rejected(self):
+        response = self.upload('anh.png', png_bytes((128, 128)) + bytes(4096))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('File quá lớn', response.data['error'])
+        self.assertEqual(self.incoming_files(), [])
+
+
+# ============================================================
+# LOGIN THROTTLE
+# ============================================================
+class LocalBucketStoreTests(TestCase):
+
+    @mock.patch('api.login_throttle.time.monotonic')
+    def test_bucket_empties_then_refills(self, monotonic):
+        monotonic.return_value = 1000.0
+        store = LocalBucketStore()
+
+        self.assertEqual([store.take('ip:1', 2, 60) for _ in range(2)], [0, 0])
+        self.assertAlmostEqual(store.take('ip:1', 2, 60), 30)
+
+        monotonic.return_value += 30
+        self.assertEqual(store.take('ip:1', 2, 60), 0)
+
+        store.reset('ip:1')
+        self.assertEqual(store.take('ip:1', 2, 60), 0)
+
+    def test_least_recently_used_bucket_is_dropped(self):
+        store = LocalBucketStore(max_keys=2)
+        for key in ('a', 'b', 'a', 'c'):
+            store.take(key, 1, 60)
+
+        # 'a' vừa dùng nên còn giữ (vẫn hết token); 'b' bị bỏ → bucket đầy lại
+        self.assertGreater(store.take('a', 1, 60), 0)
+        self.assertEqual(store.take('b', 1, 60), 0)
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'ip': (3, 60), 'username': (2, 60)},
+                   PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginThrottleTests(TestCase):
+
+    def setUp(self):
+        self.throttle = LoginThrottle()
+
+    def test_username_bucket_ignores_case_and_spaces(self):
+        self.assertEqual(self.throttle.allow('10.0.0.1', 'Admin'), 0)
+        self.assertEqual(self.throttle.allow('10.0.0.2', ' admin '), 0)
+
+        self.assertGreater(self.throttle.allow('10.0.0.3', 'ADMIN'), 0)
+        self.assertEqual(self.throttle.stats()['throttled_username'], 1)
+
+    def test_ip_bucket_spans_usernames(self):
+        for username in ('a', 'b', 'c'):
+            self.assertEqual(self.throttle.allow('10.0.0.1', username), 0)
+
+        self.assertGreater(self.throttle.allow('10.0.0.1', 'd'), 0)
+        self.assertEqual(self.throttle.stats()['throttled_ip'], 1)
+
+    def test_success_resets_username_bucket(self):
+        self.throttle.allow('10.0.0.1', 'admin')
+        self.throttle.allow('10.0.0.1', 'admin')
+        self.throttle.succeeded('admin')
+
+        self.assertEqual(self.throttle.allow('10.0.0.1', 'admin'), 0)
+
+    def test_unknown_or_inactive_user_is_rejected_before_hash(self):
+        get_user_model().objects.create_user('active', password='secret-123')
+        get_user_model().objects.create_user('locked', password='secret-123', is_active=False)
+
+        with self.assertNumQueries(1):
+            self.assertFalse(self.throttle.may_login('nobody'))
+        self.assertFalse(self.throttle.may_login('locked'))
+        self.assertTrue(self.throttle.may_login('active'))
+        self.assertEqual(self.throttle.stats()['rejected_before_hash'], 2)
+
+    @override_settings(LOGIN_HASH_CONCURRENCY=1, LOGIN_HASH_WAIT=0.01)
+    def test_hash_slot_times_out_when_busy(self):
+        with self.throttle.hash_slot() as first:
+            with self.throttle.hash_slot() as second:
+                self.assertEqual((first, second), (True, False))
+            self.assertEqual(self.throttle.stats()['hashing'], 1)
+
+        stats = self.throttle.stats()
+        self.assertEqual((stats['hashing'], stats['hashes'], stats['gate_timeouts']), (0, 1, 1))
+
+
+class ClientIpTests(TestCase):
+
+    def ip(self, remote, forwarded=None):
+        meta = {'REMOTE_ADDR': remote}
+        if forwarded:
+            meta['HTTP_X_FORWARDED_FOR'] = forwarded
+        return client_ip(RequestFactory().post('/api/auth/login/', **meta))
+
+    def test_forwarded_for_ignored_without_trusted_proxies(self):
+        self.assertEqual(self.ip('203.0.113.9', '1.2.3.4'), '203.0.113.9')
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1', '10.0.0.0/8'])
+    def test_forwarded_for_read_only_through_trusted_proxy(self):
+        self.assertEqual(self.ip('203.0.113.9', '1.2.3.4'), '203.0.113.9')
+        self.assertEqual(self.ip('127.0.0.1', '198.51.100.7'), '198.51.100.7')
+        # Địa chỉ client tự chèn ở bên trái bị bỏ qua
+        self.assertEqual(self.ip('127.0.0.1', '1.2.3.4, 198.51.100.7, 10.0.0.5'), '198.51.100.7')
+        self.assertEqual(self.ip('127.0.0.1'), '127.0.0.1')
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'ip': (100, 60), 'username': (2, 60)},
+                   PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class LoginViewThrottleTests(TestCase):
+
+    def setUp(self):
+        login_throttle.store.clear()
+        self.addCleanup(login_throttle.store.clear)
+        self.client = APIClient()
+
+    def login(self, username, password='wrong-password'):
+        return self.client.post('/api/auth/login/', {'username': username, 'password': password}, format='json')
+
+    def test_unknown_user_never_reaches_password_hash(self):
+        with mock.patch('api.views.authenticate') as authenticate:
+            response = self.login('nobody')
+
+        self.assertEqual(response.status_code, 401)
+        authenticate.assert_not_called()
+
+    def test_repeated_attempts_get_429_with_retry_after(self):
+        get_user_model().objects.create_user('admin', password='secret-123')
+
+        statuses = [self.login('admin').status_code for _ in range(2)]
+        response = self.login('admin')
+
+        self.assertEqual(statuses, [401, 401])
+        self.assertEqual(response.status_code, 429)
+        # Bucket 2 lượt/60 giây → chờ tối đa 30 giây cho lượt kế tiếp
+        self.assertTrue(0 < int(response['Retry-After']) <= 30)
+
+
+# ============================================================
+# INSTRUMENTATION
+# ============================================================
+class MetricsViewTests(TestCase):
+
+    def scrape(self, **headers):
+        try:
+            return metrics_view(RequestFactory().get('/api/_metrics', **headers)).status_code
+        except Http404:
+            return 404
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_disabled_without_token(self):
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer anything'), 404)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_requires_bearer_token(self):
+        self.assertEqual(self.scrape(), 404)
+        # Đứng sau reverse proxy: REMOTE_ADDR luôn là localhost, không được coi là tin cậy
+        self.assertEqual(self.scrape(REMOTE_ADDR='127.0.0.1'), 404)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer wrong'), 404)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Basic scrape-secret'), 404)
+        self.assertEqual(self.scrape(HTTP_AUTHORIZATION='Bearer scrape-secret'), 200)
+
+
+@override_settings(INSTRUMENTATION_PROFILE_TOKEN='profile-secret')
+class ProfilerMiddlewareTests(TestCase):
+
+    def test_profiler_stops_when_view_raises(self):
+        def failing_view(request):
+            raise RuntimeError('view failed')
+
+        middleware = InstrumentationMiddleware(failing_view)
+        with mock.patch.object(SamplingProfiler, 'stop', autospec=True, side_effect=SamplingProfiler.stop) as stop:
+            with self.assertRaises(RuntimeError):
+                middleware(RequestFactory().get('/api/products/', HTTP_X_PROFILE='profile-secret'))
+
+        stop.assert_called_once()
+        self.assertFalse(stop.call_args.args[0]._thread.is_alive())
+
+
+# ============================================================
+# BULK IMPORT
+# ============================================================
+class BulkImportTests(CacheIsolatedTestCase):
+
+    def jsonl(self, count):
+        # Dòng dài để lỗi mã hóa ở cuối file chỉ xuất hiện sau khi lô đầu đã được đọc và ghi
+        return b''.join(
+            json.dumps({'name': f'Sản phẩm {i}', 'category': 'vi-sinh', 'description': 'x' * 5000},
+                       ensure_ascii=False).encode() + b'\n'
+            for i in range(count)
+        )
+
+    def test_each_chunk_is_indexed_and_counted_when_stream_fails_later(self):
+        stats.reconcile_totals()
+        generation = get_generation(Product)
+        stream = bulk_io.open_text(io.BytesIO(self.jsonl(4) + b'\xff\xfe broken\n'))
+
+        with self.assertRaises(UnicodeDecodeError):
+            bulk_io.import_rows('products', stream, 'jsonl', chunk_size=2)
+
+        # Lô đầu đã commit; lô sau hỏng cùng đoạn mã hóa lỗi
+        imported = set(Product.objects.values_list('pk', flat=True))
+        self.assertEqual(len(imported), 2)
+        self.assertEqual(set(SearchDocument.objects.values_list('doc_id', flat=True)), imported)
+        self.assertEqual(DashboardStat.objects.get(day=DashboardStat.TOTALS_DAY, metric='total_products').value, 2)
+        self.assertGreater(get_generation(Product), generation)
+
+    def test_dry_run_writes_nothing(self):
+        report = bulk_io.import_rows('products', bulk_io.open_text(io.BytesIO(self.jsonl(3))), 'jsonl',
+                                     chunk_size=2, dry_run=True)
+
+        self.assertEqual((report.created, report.error_count), (3, 0))
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(SearchDocument.objects.exists())
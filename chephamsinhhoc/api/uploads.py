@@ -0,0 +1,145 @@
+"""
+EBGreentek Upload Handler
+Nhận ảnh upload theo luồng: chặn quá cỡ / không phải ảnh ngay khi đọc, băm sha256 và ghi
+thẳng vào thư mục blob (không qua file tạm của Django)
+Tạo ngày: 2025-12-15
+"""
+
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.http.multipartparser import MultiPartParser as DjangoMultiPartParser, MultiPartParserError
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import DataAndFiles, MultiPartParser
+
+from .storage import INCOMING_PREFIX, SNIFF_LENGTH, content_addressed_storage, sniff_image_type
+
+DEFAULT_MAX_SIZE = 5 * 1024 * 1024  # 5MB
+# Phần header/boundary multipart ngoài nội dung file
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def image_upload_max_size():
+    return getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', DEFAULT_MAX_SIZE)
+
+
+class UploadRejected(Exception):
+    """Upload bị từ chối giữa chừng (quá cỡ / sai định dạng); message trả thẳng cho client"""
+
+
+class IncomingBlobFile(UploadedFile):
+    """File upload nằm trong thư mục blob, kèm sha256 → store_blob chỉ cần đổi tên"""
+
+    def __init__(self, name, content_type, size, charset, content_type_extra=None):
+        file = tempfile.NamedTemporaryFile(
+            prefix=INCOMING_PREFIX, dir=content_addressed_storage.incoming_dir(),
+        )
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = None
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def close(self):
+        try:
+            return self.file.close()
+        except FileNotFoundError:
+            # Đã được đổi tên thành blob (hoặc bỏ vì trùng nội dung)
+            pass
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """
+    Upload handler cho một field ảnh:
+    - Content-Length / kích thước đang nhận vượt giới hạn → dừng ngay, không đọc tiếp
+    - Magic bytes ở chunk đầu không phải JPG/PNG/GIF/WebP → dừng ngay
+    - content_type của file lấy theo magic bytes, không tin header của client
+    - Field file khác bị bỏ qua
+    """
+    field_name = 'image'
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or image_upload_max_size()
+        self.received = False
+
+    def size_error(self):
+        return f'File quá lớn. Kích thước tối đa {self.max_size // (1024 * 1024)}MB'
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length and content_length > self.max_size + MULTIPART_OVERHEAD:
+            raise UploadRejected(self.size_error())
+
+    def new_file(self, field_name, file_name, content_type, content_length, charset=None, content_type_extra=None):
+        if field_name != self.field_name or self.received:
+            raise SkipFile()
+        super().new_file(field_name, file_name, content_type, content_length, charset, content_type_extra)
+        if content_length and content_length > self.max_size:
+            raise UploadRejected(self.size_error())
+        self.file = IncomingBlobFile(file_name, None, 0, charset, content_type_extra)
+        self.hasher = hashlib.sha256()
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.discard()
+            raise UploadRejected(self.size_error())
+        if self.file.content_type is None:
+            self.head += raw_data[:SNIFF_LENGTH - len(self.head)]
+            if len(self.head) >= SNIFF_LENGTH:
+                self.check_type()
+        self.hasher.update(raw_data)
+        self.file.write(raw_data)
+
+    def check_type(self):
+        content_type = sniff_image_type(self.head)
+        if content_type is None:
+            self.discard()
+            raise UploadRejected('Chỉ chấp nhận file ảnh (JPG, PNG, GIF, WebP)')
+        self.file.content_type = content_type
+
+    def file_complete(self, file_size):
+        if not hasattr(self, 'file'):
+            return None
+        if self.file.content_type is None:
+            self.check_type()
+        # Bỏ self.file: parser đóng file của handler khi bỏ qua field sau (SkipFile)
+        file, self.received = self.file, True
+        del self.file
+        file.flush()
+        file.seek(0)
+        file.size = file_size
+        file.sha256 = self.hasher.hexdigest()
+        return file
+
+    def upload_interrupted(self):
+        self.discard()
+
+    def discard(self):
+        if hasattr(self, 'file'):
+            path = self.file.temporary_file_path()
+            self.file.close()
+            del self.file
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class ImageUploadParser(MultiPartParser):
+    """MultiPartParser chỉ dùng ImageUploadHandler (bỏ qua FILE_UPLOAD_HANDLERS)"""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        request = parser_context['request']
+        meta = request.META.copy()
+        meta['CONTENT_TYPE'] = media_type
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        try:
+            parser = DjangoMultiPartParser(meta, stream, [ImageUploadHandler(request)], encoding)
+            data, files = parser.parse()
+            return DataAndFiles(data, files)
+        except MultiPartParserError as exc:
+            raise ParseError('Multipart form parse error - %s' % str(exc))
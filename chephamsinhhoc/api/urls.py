@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 from . import views
+from .instrumentation import metrics_view
 
 # ============================================================
 # ROUTER CONFIGURATION
@@ -35,9 +36,22 @@ urlpatterns = [
     # Image upload
     path('upload-image/', views.upload_image, name='upload-image'),
     
+    # Search (chỉ mục sản phẩm + bài viết)
+    path('search/', views.search_view, name='search'),
+    
+    # Homepage bootstrap (gộp các API public của trang chủ)
+    path('bootstrap/', views.bootstrap_view, name='bootstrap'),
+    
     # Dashboard
     path('dashboard/stats/', views.dashboard_stats, name='dashboard-stats'),
     
+    # Nhập/xuất hàng loạt (products, articles)
+    path('bulk/<str:resource>/export/', views.bulk_export, name='bulk-export'),
+    path('bulk/<str:resource>/import/', views.bulk_import, name='bulk-import'),
+    
+    # Số liệu Prometheus (api/instrumentation.py)
+    path('_metrics', metrics_view, name='metrics'),
+    
     # Router URLs
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+EBGreentek View Counter
+Gom lượt xem trong bộ nhớ và ghi xuống DB theo lô (write-behind)
+Tạo ngày: 2025-12-02
+"""
+
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+# Số giây giữa 2 lần flush; 0 = ghi ngay (đồng bộ) mỗi lượt xem
+DEFAULT_FLUSH_INTERVAL = 10
+# Số bản ghi đang chờ tối đa trước khi đánh thức flusher sớm
+DEFAULT_MAX_PENDING = 1000
+# Số pk tối đa trong một câu UPDATE ... WHERE pk IN (...)
+UPDATE_CHUNK_SIZE = 500
+
+# Gửi sau mỗi lần ghi lượt xem xuống DB: counts = {model: tổng lượt vừa ghi},
+# pks = {model: [pk đã được ghi]}
+views_flushed = Signal()
+
+
+class ViewCounter:
+    """
+    Bộ đếm lượt xem dùng chung trong process.
+
+    - increment(): chỉ cộng vào dict trong bộ nhớ, không chạm DB
+    - flush(): ghi các delta xuống DB bằng UPDATE view_count = view_count + n
+    - pending(): phần delta chưa ghi, để cộng vào giá trị đọc từ DB
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = defaultdict(int)   # (model, pk) -> delta chưa flush
+        self._inflight = {}                # (model, pk) -> delta đang được flush
+        self._wakeup = threading.Event()
+        self._flusher = None
+        atexit.register(self.flush)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+
+    @property
+    def max_pending(self):
+        return getattr(settings, 'VIEW_COUNTER_MAX_PENDING', DEFAULT_MAX_PENDING)
+
+    def increment(self, model, pk, amount=1):
+        """Ghi nhận amount lượt xem cho (model, pk)"""
+        if not self.flush_interval:
+            model.objects.filter(pk=pk).update(view_count=F('view_count') + amount)
+            self._notify({model: amount}, {model: [str(pk)]})
+            return
+
+        with self._lock:
+            self._pending[(model, str(pk))] += amount
+            backlog = len(self._pending)
+
+        self._ensure_flusher()
+        if backlog >= self.max_pending:
+            self._wakeup.set()
+
+    def pending(self, model, pk):
+        """Số lượt xem chưa được ghi xuống DB"""
+        key = (model, str(pk))
+        with self._lock:
+            return self._pending.get(key, 0) + self._inflight.get(key, 0)
+
+    def flush(self):
+        """Ghi toàn bộ delta đang chờ xuống DB, trả về tổng số lượt đã ghi"""
+        with self._lock:
+            if not self._pending:
+                return 0
+            batch = dict(self._pending)
+            self._pending.clear()
+            self._inflight = batch
+
+        # Gom theo (model, delta) để mỗi nhóm chỉ cần một câu UPDATE
+        groups = defaultdict(list)
+        for (model, pk), delta in batch.items():
+            groups[(model, delta)].append(pk)
+
+        try:
+            with transaction.atomic():
+                for (model, delta), pks in groups.items():
+                    for start in range(0, len(pks), UPDATE_CHUNK_SIZE):
+                        model.objects.filter(pk__in=pks[start:start + UPDATE_CHUNK_SIZE]).update(
+                            view_count=F('view_count') + delta
+                        )
+        except Exception:
+            # Trả delta về hàng đợi để lần flush sau thử lại
+            logger.exception('Flush view counts failed, %d rows re-queued', len(batch))
+            with self._lock:
+                for key, delta in batch.items():
+                    self._pending[key] += delta
+                self._inflight = {}
+            return 0
+
+        with self._lock:
+            self._inflight = {}
+
+        counts = defaultdict(int)
+        pks = defaultdict(list)
+        for (model, pk), delta in batch.items():
+            counts[model] += delta
+            pks[model].append(pk)
+        self._notify(dict(counts), dict(pks))
+        return sum(batch.values())
+
+    def _notify(self, counts, pks):
+        for receiver, result in views_flushed.send_robust(sender=type(self), counts=counts, pks=pks):
+            if isinstance(result, Exception):
+                logger.error('views_flushed receiver %s failed: %s', receiver, result)
+
+    def _ensure_flusher(self):
+        """Khởi động thread flush nền (lazy, sau khi worker đã fork)"""
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(
+                target=self._run, name='view-counter-flusher', daemon=True
+            )
+            self._flusher.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+view_counter = ViewCounter()
@@ -4,15 +4,22 @@ Tạo ngày: 2025-01-27
 Framework: Django REST Framework 3.14+
 """
 
+import math
+
 from rest_framework import viewsets, status, filters
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import action, api_view, parser_classes, permission_classes, authentication_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.request import Request
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly, AllowAny
 from rest_framework.pagination import PageNumberPagination
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.db.models import Q, Count, Sum
+from django.conf import settings
+from django.http import Http404, HttpRequest, StreamingHttpResponse
+from django.core.cache import cache
 from django.utils import timezone
+from datetime import timedelta
 from django_filters.rest_framework import DjangoFilterBackend
 
 from .models import (
@@ -26,29 +33,47 @@ from .serializers import (
     ArticleSerializer, ArticleListSerializer, ArticleDetailSerializer,
     ContactSerializer, ContactCreateSerializer, ContactReplySerializer,
     SettingSerializer, SettingPublicSerializer, SettingBulkUpdateSerializer,
-    SocialMediaSerializer, CertificationSerializer, CategorySerializer, CategoryTreeSerializer,
+    SocialMediaSerializer, CertificationSerializer, CategorySerializer,
     AboutFeatureSerializer, AboutValueSerializer,
     ActivityLogSerializer, MediaSerializer, MediaUploadSerializer,
     DashboardStatsSerializer
 )
+from . import bulk_io
+from .activity_log import log_activity
+from .authentication import ClaimsJWTAuthentication, ClaimsRefreshToken
+from .cache import ResponseCacheMixin, cache_response, etag_matches, get_generations, make_etag
+from .db.router import ReplicaReadMixin
+from .images import schedule as schedule_image_processing
+from .log_storage import summarize
+from .login_throttle import client_ip, login_throttle
+from .category_tree import get_category_subtree, get_category_tree
+from .search import search as search_index
+from .pagination import HybridPaginationMixin
+from .projection import ListProjectionMixin
+from .reference_cache import ReferenceCacheMixin
+from .stats import get_dashboard_stats
+from .settings_registry import apply_settings, settings_registry
+from .storage import store_blob
+from .uploads import ImageUploadParser, UploadRejected, image_upload_max_size
+from .view_counter import view_counter
 
 
 # ============================================================
 # CUSTOM PAGINATION
 # ============================================================
-class StandardResultsSetPagination(PageNumberPagination):
+class StandardResultsSetPagination(HybridPaginationMixin, PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
 
-class ProductPagination(PageNumberPagination):
+class ProductPagination(HybridPaginationMixin, PageNumberPagination):
     page_size = 8
     page_size_query_param = 'page_size'
     max_page_size = 50
 
 
-class ArticlePagination(PageNumberPagination):
+class ArticlePagination(HybridPaginationMixin, PageNumberPagination):
     page_size = 6
     page_size_query_param = 'page_size'
     max_page_size = 50
@@ -67,13 +92,35 @@ def login_view(request):
     username = serializer.validated_data['username']
     password = serializer.validated_data['password']
     
-    user = authenticate(username=username, password=password)
+    # Chặn trước bước hash mật khẩu (api/login_throttle.py)
+    wait = login_throttle.allow(get_client_ip(request), username)
+    if wait:
+        response = Response(
+            {'error': f'Đăng nhập quá nhiều lần, thử lại sau {math.ceil(wait)} giây'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
+    
+    user = None
+    if login_throttle.may_login(username):
+        with login_throttle.hash_slot() as acquired:
+            if not acquired:
+                response = Response(
+                    {'error': 'Hệ thống đang bận, vui lòng thử lại'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE
+                )
+                response['Retry-After'] = '1'
+                return response
+            user = authenticate(username=username, password=password)
     
     if user is None:
+        login_throttle.failed()
         return Response(
             {'error': 'Tên đăng nhập hoặc mật khẩu không đúng'},
             status=status.HTTP_401_UNAUTHORIZED
         )
+    login_throttle.succeeded(username)
     
     if user.status != 'active':
         return Response(
@@ -86,12 +133,12 @@ def login_view(request):
     user.save(update_fields=['last_login'])
     
     # Generate JWT tokens
-    refresh = RefreshToken.for_user(user)
+    refresh = ClaimsRefreshToken.for_user(user)
     
     # Log activity
-    ActivityLog.objects.create(
+    log_activity(
+        'login',
         user=user,
-        action='login',
         description=f'User {username} logged in',
         ip_address=get_client_ip(request),
         user_agent=request.META.get('HTTP_USER_AGENT', '')
@@ -109,9 +156,9 @@ def login_view(request):
 def logout_view(request):
     """Đăng xuất"""
     # Log activity
-    ActivityLog.objects.create(
+    log_activity(
+        'logout',
         user=request.user,
-        action='logout',
         description=f'User {request.user.username} logged out',
         ip_address=get_client_ip(request)
     )
@@ -128,13 +175,13 @@ def profile_view(request):
 
 
 def get_client_ip(request):
-    """Lấy IP của client"""
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    if x_forwarded_for:
-        ip = x_forwarded_for.split(',')[0]
-    else:
-        ip = request.META.get('REMOTE_ADDR')
-    return ip
+    """Lấy IP của client (chỉ tin X-Forwarded-For từ TRUSTED_PROXIES)"""
+    return client_ip(request)
+
+
+def _public_view(viewset_class, request, action='list'):
+    """Khởi tạo viewset để dùng lại get_queryset/get_serializer của nó"""
+    return viewset_class(request=request, format_kwarg=None, action=action, kwargs={})
 
 
 # ============================================================
@@ -154,7 +201,7 @@ class UserViewSet(viewsets.ModelViewSet):
 # ============================================================
 # PRODUCT VIEWSET
 # ============================================================
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ReplicaReadMixin, ResponseCacheMixin, ListProjectionMixin, viewsets.ModelViewSet):
     """API CRUD cho Product"""
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
@@ -166,8 +213,10 @@ class ProductViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'view_count', 'sort_order']
     ordering = ['-is_popular', 'sort_order', '-created_at']
     
+    projection_actions = ('list', 'popular', 'by_category')
+    
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in self.projection_actions:
             return ProductListSerializer
         elif self.action == 'retrieve':
             return ProductDetailSerializer
@@ -181,8 +230,13 @@ class ProductViewSet(viewsets.ModelViewSet):
         if not self.request.user.is_authenticated:
             queryset = queryset.filter(status='active')
         
-        return queryset
+        return self.project_queryset(queryset)
     
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+    
+    @cache_response
     def retrieve(self, request, *args, **kwargs):
         """Tăng view count khi xem chi tiết"""
         instance = self.get_object()
@@ -190,14 +244,23 @@ class ProductViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
+    def on_cache_hit(self, request, *args, **kwargs):
+        """Response chi tiết lấy từ cache vẫn phải tính lượt xem"""
+        if self.action == 'retrieve':
+            view_counter.increment(Product, kwargs['pk'])
+    
     @action(detail=False, methods=['get'])
+    @cache_response
     def popular(self, request):
         """Lấy sản phẩm phổ biến"""
-        products = self.get_queryset().filter(is_popular=True, status='active')[:8]
-        serializer = ProductListSerializer(products, many=True)
+        serializer = self.get_serializer(self.get_popular_queryset(), many=True)
         return Response(serializer.data)
     
+    def get_popular_queryset(self):
+        return self.get_queryset().filter(is_popular=True, status='active')[:8]
+    
     @action(detail=False, methods=['get'])
+    @cache_response
     def by_category(self, request):
         """Lấy sản phẩm theo danh mục"""
         category = request.query_params.get('category')
@@ -208,17 +271,17 @@ class ProductViewSet(viewsets.ModelViewSet):
         page = self.paginate_queryset(products)
         
         if page is not None:
-            serializer = ProductListSerializer(page, many=True)
+            serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = ProductListSerializer(products, many=True)
+        serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
 
 # ============================================================
 # ARTICLE VIEWSET
 # ============================================================
-class ArticleViewSet(viewsets.ModelViewSet):
+class ArticleViewSet(ReplicaReadMixin, ResponseCacheMixin, ListProjectionMixin, viewsets.ModelViewSet):
     """API CRUD cho Article"""
     queryset = Article.objects.all()
     serializer_class = ArticleSerializer
@@ -230,8 +293,10 @@ class ArticleViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'published_at', 'view_count']
     ordering = ['-is_featured', '-published_at', '-created_at']
     
+    projection_actions = ('list', 'featured', 'by_category')
+    
     def get_serializer_class(self):
-        if self.action == 'list':
+        if self.action in self.projection_actions:
             return ArticleListSerializer
         elif self.action == 'retrieve':
             return ArticleDetailSerializer
@@ -248,8 +313,13 @@ class ArticleViewSet(viewsets.ModelViewSet):
                 published_at__lte=timezone.now()
             )
         
-        return queryset
+        return self.project_queryset(queryset)
+    
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
+    @cache_response
     def retrieve(self, request, *args, **kwargs):
         """Tăng view count khi xem chi tiết"""
         instance = self.get_object()
@@ -257,14 +327,23 @@ class ArticleViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
+    def on_cache_hit(self, request, *args, **kwargs):
+        """Response chi tiết lấy từ cache vẫn phải tính lượt xem"""
+        if self.action == 'retrieve':
+            view_counter.increment(Article, kwargs['pk'])
+    
     @action(detail=False, methods=['get'])
+    @cache_response
     def featured(self, request):
         """Lấy bài viết nổi bật"""
-        articles = self.get_queryset().filter(is_featured=True, status='published')[:3]
-        serializer = ArticleListSerializer(articles, many=True)
+        serializer = self.get_serializer(self.get_featured_queryset(), many=True)
         return Response(serializer.data)
     
+    def get_featured_queryset(self):
+        return self.get_queryset().filter(is_featured=True, status='published')[:3]
+    
     @action(detail=False, methods=['get'])
+    @cache_response
     def by_category(self, request):
         """Lấy bài viết theo danh mục"""
         category = request.query_params.get('category')
@@ -275,10 +354,10 @@ class ArticleViewSet(viewsets.ModelViewSet):
         page = self.paginate_queryset(articles)
         
         if page is not None:
-            serializer = ArticleListSerializer(page, many=True)
+            serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
         
-        serializer = ArticleListSerializer(articles, many=True)
+        serializer = self.get_serializer(articles, many=True)
         return Response(serializer.data)
 # ============================================================
 # CONTACT VIEWSET
@@ -288,6 +367,7 @@ class ContactViewSet(viewsets.ModelViewSet):
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
     pagination_class = StandardResultsSetPagination
+    pagination_mode = 'keyset'  # ?paginate=page để dùng page-number
     filter_backends = [filters.SearchFilter, filters.OrderingFilter, DjangoFilterBackend]
     search_fields = ['name', 'email', 'message']
     filterset_fields = ['status']
@@ -318,9 +398,9 @@ class ContactViewSet(viewsets.ModelViewSet):
         contact.save()
         
         # Log activity
-        ActivityLog.objects.create(
-            user_id=request.user.id,
-            action='reply_contact',
+        log_activity(
+            'reply_contact',
+            user=request.user,
             entity_type='contact',
             entity_id=contact.id,
             description=f'Replied to contact from {contact.name}'
@@ -345,6 +425,11 @@ class ContactViewSet(viewsets.ModelViewSet):
 # ============================================================
 # SETTING VIEWSET
 # ============================================================
+def group_public_settings():
+    """Settings public dạng {group: {key: value}}"""
+    return settings_registry.public_grouped()
+
+
 class SettingViewSet(viewsets.ModelViewSet):
     """API CRUD cho Setting"""
     queryset = Setting.objects.all()
@@ -366,47 +451,50 @@ class SettingViewSet(viewsets.ModelViewSet):
             return Setting.objects.all()
         return Setting.objects.filter(is_public=True)
     
+    def list(self, request, *args, **kwargs):
+        """Đọc từ settings registry (không query), lọc theo setting_group / is_public"""
+        if 'fields' in request.query_params or 'exclude' in request.query_params:
+            return super().list(request, *args, **kwargs)
+        
+        rows = settings_registry.rows(public_only=not request.user.is_authenticated)
+        group = request.query_params.get('setting_group')
+        if group:
+            rows = [row for row in rows if row['setting_group'] == group]
+        is_public = request.query_params.get('is_public')
+        if is_public:
+            flag = is_public.lower() in ('true', '1')
+            rows = [row for row in rows if row['is_public'] == flag]
+        return Response(rows)
+    
+    def retrieve(self, request, *args, **kwargs):
+        """Đọc 1 setting từ registry"""
+        if 'fields' in request.query_params or 'exclude' in request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        
+        row = settings_registry.row(kwargs[self.lookup_field])
+        if row is None or (not row['is_public'] and not request.user.is_authenticated):
+            raise Http404
+        return Response(row)
+    
     @action(detail=False, methods=['get'])
     def public(self, request):
         """Lấy tất cả settings public"""
-        settings = Setting.objects.filter(is_public=True)
-        
-        # Group by setting_group
-        grouped = {}
-        for setting in settings:
-            group = setting.setting_group
-            if group not in grouped:
-                grouped[group] = {}
-            grouped[group][setting.setting_key] = setting.setting_value
-        
-        return Response(grouped)
+        return Response(group_public_settings())
     
     @action(detail=False, methods=['post'])
     def bulk_update(self, request):
-        """Cập nhật nhiều settings cùng lúc"""
+        """Cập nhật nhiều settings cùng lúc (1 transaction, bỏ qua key không đổi)"""
         serializer = SettingBulkUpdateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        settings_data = serializer.validated_data['settings']
-        updated = []
-        
-        for key, value in settings_data.items():
-            # Extract group from key (e.g., "general.logo_url" -> "general")
-            group = key.split('.')[0] if '.' in key else 'general'
-            
-            setting, created = Setting.objects.update_or_create(
-                setting_key=key,
-                defaults={
-                    'setting_value': value,
-                    'setting_group': group,
-                    'is_public': True  # Auto-set public for bulk updates
-                }
-            )
-            updated.append(setting.setting_key)
+        result = apply_settings(serializer.validated_data['settings'])
+        changed = result['created'] + result['updated']
         
         return Response({
-            'message': f'Updated {len(updated)} settings',
-            'updated': updated
+            'message': f'Updated {len(changed)} settings',
+            'updated': changed,
+            'created': result['created'],
+            'unchanged': result['unchanged'],
         })
 
 
@@ -414,7 +502,7 @@ class SettingViewSet(viewsets.ModelViewSet):
 # ============================================================
 # SOCIAL MEDIA VIEWSET
 # ============================================================
-class SocialMediaViewSet(viewsets.ModelViewSet):
+class SocialMediaViewSet(ReplicaReadMixin, ReferenceCacheMixin, viewsets.ModelViewSet):
     """API CRUD cho Social Media"""
     queryset = SocialMedia.objects.all()
     serializer_class = SocialMediaSerializer
@@ -433,7 +521,7 @@ class SocialMediaViewSet(viewsets.ModelViewSet):
 # ============================================================
 # CERTIFICATION VIEWSET
 # ============================================================
-class CertificationViewSet(viewsets.ModelViewSet):
+class CertificationViewSet(ReplicaReadMixin, ReferenceCacheMixin, viewsets.ModelViewSet):
     """API CRUD cho Certification"""
     queryset = Certification.objects.all()
     serializer_class = CertificationSerializer
@@ -452,7 +540,7 @@ class CertificationViewSet(viewsets.ModelViewSet):
 # ============================================================
 # CATEGORY VIEWSET
 # ============================================================
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ReplicaReadMixin, ReferenceCacheMixin, viewsets.ModelViewSet):
     """API CRUD cho Category"""
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -462,24 +550,38 @@ class CategoryViewSet(viewsets.ModelViewSet):
     filterset_fields = ['type', 'is_active']
     lookup_field = 'slug'
     
+    def get_tree_depth(self):
+        """Đọc ?depth= (số tầng tối đa), None = không giới hạn"""
+        depth = self.request.query_params.get('depth')
+        if not depth:
+            return None
+        try:
+            depth = int(depth)
+        except ValueError:
+            depth = 0
+        if depth < 1:
+            raise ValidationError({'depth': 'depth phải là số nguyên dương'})
+        return depth
+    
     @action(detail=False, methods=['get'])
     def tree(self, request):
         """Lấy cây danh mục"""
         type_filter = request.query_params.get('type')
-        queryset = Category.objects.filter(parent__isnull=True, is_active=True)
-        
-        if type_filter:
-            queryset = queryset.filter(type=type_filter)
-        
-        queryset = queryset.order_by('sort_order', 'name')
-        serializer = CategoryTreeSerializer(queryset, many=True)
-        return Response(serializer.data)
+        return Response(get_category_tree(type_filter, self.get_tree_depth()))
+    
+    @action(detail=True, methods=['get'])
+    def subtree(self, request, slug=None):
+        """Lấy nhánh cây bắt đầu từ danh mục có slug"""
+        node = get_category_subtree(slug, self.get_tree_depth())
+        if node is None:
+            return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(node)
 
 
 # ============================================================
 # ABOUT FEATURE VIEWSET
 # ============================================================
-class AboutFeatureViewSet(viewsets.ModelViewSet):
+class AboutFeatureViewSet(ReplicaReadMixin, ReferenceCacheMixin, viewsets.ModelViewSet):
     """API CRUD cho About Feature"""
     queryset = AboutFeature.objects.all()
     serializer_class = AboutFeatureSerializer
@@ -498,7 +600,7 @@ class AboutFeatureViewSet(viewsets.ModelViewSet):
 # ============================================================
 # ABOUT VALUE VIEWSET
 # ============================================================
-class AboutValueViewSet(viewsets.ModelViewSet):
+class AboutValueViewSet(ReplicaReadMixin, ReferenceCacheMixin, viewsets.ModelViewSet):
     """API CRUD cho About Value"""
     queryset = AboutValue.objects.all()
     serializer_class = AboutValueSerializer
@@ -523,9 +625,23 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ActivityLogSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
+    pagination_mode = 'keyset'  # ?paginate=page để dùng page-number
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     filterset_fields = ['user', 'action', 'entity_type']
     ordering = ['-created_at']
+    
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Thống kê N ngày gần nhất (?days=30) theo action / user / ngày, đọc từ bảng rollup"""
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if days < 1:
+            raise ValidationError({'days': 'days phải là số nguyên dương'})
+        
+        today = timezone.localdate()
+        return Response(summarize(today - timedelta(days=days - 1), today))
 
 
 
@@ -534,10 +650,11 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
 # ============================================================
 class MediaViewSet(viewsets.ModelViewSet):
     """API CRUD cho Media"""
-    queryset = Media.objects.all()
+    queryset = Media.objects.prefetch_related('variants')
     serializer_class = MediaSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = StandardResultsSetPagination
+    pagination_mode = 'keyset'  # ?paginate=page để dùng page-number
     filter_backends = [filters.SearchFilter, DjangoFilterBackend]
     search_fields = ['file_name']
     filterset_fields = ['file_type', 'entity_type', 'is_public']
@@ -548,9 +665,14 @@ class MediaViewSet(viewsets.ModelViewSet):
 # IMAGE UPLOAD VIEW
 # ============================================================
 @api_view(['POST'])
+@authentication_classes([ClaimsJWTAuthentication])
 @permission_classes([IsAuthenticated])
+@parser_classes([ImageUploadParser])
 def upload_image(request):
-    """Upload image và trả về URL"""
+    """
+    Upload image và trả về URL.
+    ImageUploadParser kiểm tra cỡ + magic bytes ngay khi nhận, ghi thẳng vào thư mục blob.
+    """
     try:
         if 'image' not in request.FILES:
             return Response(
@@ -558,52 +680,52 @@ def upload_image(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Loại file đã được ImageUploadParser kiểm tra theo magic bytes (storage.SIGNATURES)
         image_file = request.FILES['image']
         
-        # Validate file type
-        allowed_types = ['image/jpeg', 'image/jpg', 'image/png', 'image/gif', 'image/webp']
-        if image_file.content_type not in allowed_types:
-            return Response(
-                {'error': 'Chỉ chấp nhận file ảnh (JPG, PNG, GIF, WebP)'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Validate file size (max 5MB)
-        max_size = 5 * 1024 * 1024  # 5MB
+        # Validate file size (mặc định 5MB)
+        max_size = image_upload_max_size()
         if image_file.size > max_size:
             return Response(
-                {'error': 'File quá lớn. Kích thước tối đa 5MB'},
+                {'error': f'File quá lớn. Kích thước tối đa {max_size // (1024 * 1024)}MB'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Get user instance properly
-        print(f"🔍 DEBUG: request.user type = {type(request.user)}")
-        print(f"🔍 DEBUG: request.user = {request.user}")
-        print(f"🔍 DEBUG: is_authenticated = {request.user.is_authenticated if hasattr(request.user, 'is_authenticated') else 'N/A'}")
-        
-        try:
-            user_instance = User.objects.get(id=request.user.id) if request.user and request.user.is_authenticated else None
-            print(f"✅ DEBUG: user_instance = {user_instance}")
-        except Exception as user_err:
-            print(f"❌ DEBUG: Failed to get user - {user_err}")
-            user_instance = None
+        # Chỉ cần id người upload → lấy từ claims của token, không query User
+        uploader_id = request.user.id if request.user.is_authenticated else None
+        
+        # Lưu theo nội dung: ảnh đã có → dùng lại Media cũ, không ghi file/xử lý lại
+        blob, created = store_blob(image_file)
+        existing = None if created else Media.objects.filter(file=blob).order_by('id').first()
+        if existing is not None:
+            url = request.build_absolute_uri(existing.file.url)
+            return Response({
+                'url': url,
+                'file_url': url,
+                'image_url': url,
+                'id': str(existing.id),
+                'file_name': existing.file_name,
+                'file_size': existing.file_size,
+                'duplicate': True,
+            })
         
         # Create Media object
         media = Media.objects.create(
+            file=blob,
             file_name=image_file.name,
             file_size=image_file.size,
             file_type='image',
             is_public=True,
-            uploaded_by=user_instance
+            uploaded_by_id=uploader_id
         )
         
-        # Save file
-        media.file.save(image_file.name, image_file, save=True)
+        # Kích thước + biến thể WebP/AVIF được tạo nền sau khi commit
+        schedule_image_processing(media.id)
         
         # Log activity
-        ActivityLog.objects.create(
-            user=user_instance,
-            action='upload_image',
+        log_activity(
+            'upload_image',
+            user=request.user,
             description=f'Uploaded image: {image_file.name}',
             ip_address=get_client_ip(request),
             user_agent=request.META.get('HTTP_USER_AGENT', '')
@@ -619,6 +741,8 @@ def upload_image(request):
             'file_size': media.file_size
         })
         
+    except UploadRejected as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response(
             {'error': str(e)},
@@ -627,24 +751,216 @@ def upload_image(request):
 
 
 
+# ============================================================
+# SEARCH VIEW
+# ============================================================
+SEARCH_SOURCES = {
+    'product': (ProductViewSet, ProductListSerializer),
+    'article': (ArticleViewSet, ArticleListSerializer),
+}
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_view(request):
+    """
+    Tìm sản phẩm + bài viết qua chỉ mục (không dấu, gõ tới đâu gợi ý tới đó)
+    ?q=che pham&type=product|article&limit=10
+    """
+    query = request.query_params.get('q', '').strip()
+    doc_type = request.query_params.get('type') or None
+    if doc_type and doc_type not in SEARCH_SOURCES:
+        return Response({'error': 'type phải là product hoặc article'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    
+    if not query:
+        return Response({'query': query, 'count': 0, 'results': []})
+    
+    # Lấy dư ứng viên vì bản ghi ẩn (draft/inactive) sẽ bị lọc khi load
+    hits = search_index(query, doc_type=doc_type, limit=limit * 3)
+    
+    # Load theo queryset của từng viewset để áp dụng đúng quyền xem.
+    # Serialize cả nhóm (many=True, chung context) để biến thể ảnh chỉ tra 1 lần
+    loaded = {}
+    context = {'request': request}
+    for name, (viewset_class, serializer_class) in SEARCH_SOURCES.items():
+        ids = [doc_id for hit_type, doc_id, _ in hits if hit_type == name]
+        if not ids:
+            continue
+        view = _public_view(viewset_class, request)
+        instances = list(view.get_queryset().filter(pk__in=ids))
+        for instance, data in zip(instances, serializer_class(instances, many=True, context=context).data):
+            loaded[(name, str(instance.pk))] = data
+    
+    results = [
+        {'type': hit_type, 'id': doc_id, 'score': score, 'data': loaded[(hit_type, doc_id)]}
+        for hit_type, doc_id, score in hits
+        if (hit_type, doc_id) in loaded
+    ][:limit]
+    
+    return Response({'query': query, 'count': len(results), 'results': results})
+
+
 # ============================================================
 # DASHBOARD VIEW
 # ============================================================
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_stats(request):
-    """Lấy thống kê cho dashboard"""
-    from django.db.models import Q
-    from datetime import date
-    
-    stats = {
-        'total_products': Product.objects.filter(status='active').count(),
-        'total_articles': Article.objects.filter(status='published').count(),
-        'new_contacts': Contact.objects.filter(status='new').count(),
-        'today_contacts': Contact.objects.filter(created_at__date=date.today()).count(),
-        'total_product_views': Product.objects.aggregate(Sum('view_count'))['view_count__sum'] or 0,
-        'total_article_views': Article.objects.aggregate(Sum('view_count'))['view_count__sum'] or 0,
-    }
-    
-    serializer = DashboardStatsSerializer(stats)
+    """Lấy thống kê cho dashboard (bảng dashboard_stats, 1 query) + chuỗi ?days= ngày gần nhất"""
+    try:
+        days = int(request.query_params.get('days', 30))
+    except ValueError:
+        days = 0
+    if not 1 <= days <= 365:
+        raise ValidationError({'days': 'days phải trong khoảng 1-365'})
+    
+    serializer = DashboardStatsSerializer(get_dashboard_stats(days))
     return Response(serializer.data)
+
+
+
+# ============================================================
+# BULK IMPORT / EXPORT VIEWS
+# ============================================================
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def bulk_export(request, resource):
+    """Tải toàn bộ sản phẩm/bài viết: ?output=csv|jsonl, ?fields=a,b (stream, bộ nhớ không tăng theo bảng)"""
+    fmt = request.query_params.get('output', 'csv')
+    if fmt not in bulk_io.FORMATS:
+        raise ValidationError({'output': f'Chọn một trong: {", ".join(bulk_io.FORMATS)}'})
+    fields = [name for name in request.query_params.get('fields', '').split(',') if name] or None
+    try:
+        content = bulk_io.export_stream(resource, fmt, fields)
+    except ValueError as e:
+        raise ValidationError({'detail': str(e)})
+    
+    content_type = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = StreamingHttpResponse(content, content_type=f'{content_type}; charset=utf-8')
+    filename = f'{resource}-{timezone.localdate():%Y%m%d}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_import(request, resource):
+    """
+    Nhập sản phẩm/bài viết từ file (field 'file', CSV hoặc JSONL theo ?input= / đuôi file).
+    ?dry_run=1 chỉ validate. Lỗi từng dòng nằm trong báo cáo, các dòng hợp lệ vẫn được ghi.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        raise ValidationError({'file': 'Không có file'})
+    fmt = request.query_params.get('input') or upload.name.rsplit('.', 1)[-1].lower()
+    if fmt not in bulk_io.FORMATS:
+        raise ValidationError({'input': f'Chọn một trong: {", ".join(bulk_io.FORMATS)}'})
+    dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true')
+    try:
+        report = bulk_io.import_rows(resource, bulk_io.open_text(upload), fmt, dry_run=dry_run)
+    except ValueError as e:
+        raise ValidationError({'detail': str(e)})
+    
+    if not dry_run:
+        log_activity(
+            'bulk_import',
+            user=request.user,
+            description=f'Imported {resource}: {report.created} created, {report.updated} updated, '
+                        f'{report.error_count} errors',
+            entity_type=resource,
+            ip_address=get_client_ip(request),
+            user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        )
+    return Response({'dry_run': dry_run, **report.as_dict()})
+
+
+
+# ============================================================
+# BOOTSTRAP VIEW
+# ============================================================
+def _list_section(viewset_class):
+    def build(request):
+        view = _public_view(viewset_class, request)
+        return view.get_serializer(view.get_queryset(), many=True).data
+    return build
+
+
+def _popular_products(request):
+    view = _public_view(ProductViewSet, request, 'popular')
+    return view.get_serializer(view.get_popular_queryset(), many=True).data
+
+
+def _featured_articles(request):
+    view = _public_view(ArticleViewSet, request, 'featured')
+    return view.get_serializer(view.get_featured_queryset(), many=True).data
+
+
+# section → hàm dựng dữ liệu (cùng dữ liệu với endpoint riêng lẻ tương ứng)
+BOOTSTRAP_SECTIONS = {
+    'settings': lambda request: group_public_settings(),
+    'social_media': _list_section(SocialMediaViewSet),
+    'certifications': _list_section(CertificationViewSet),
+    'about_features': _list_section(AboutFeatureViewSet),
+    'about_values': _list_section(AboutValueViewSet),
+    'categories': lambda request: get_category_tree(),
+    'popular_products': _popular_products,
+    'featured_articles': _featured_articles,
+}
+
+# Model mà blob bootstrap phụ thuộc; save/delete bất kỳ model nào → build lại
+BOOTSTRAP_MODELS = [
+    Setting, SocialMedia, Certification, AboutFeature, AboutValue,
+    Category, Product, Article,
+]
+
+
+def get_bootstrap_payload():
+    """Blob bootstrap đầy đủ (đã cache) và ETag của nó"""
+    key = 'bootstrap:' + '.'.join(str(generation) for generation in get_generations(BOOTSTRAP_MODELS))
+    entry = cache.get(key)
+    if entry is None:
+        # Dựng bằng request ẩn danh trống: blob không phụ thuộc query params
+        # (?fields=, ?sections=...) của request hiện tại
+        blank_request = HttpRequest()
+        blank_request.method = 'GET'
+        blank_request = Request(blank_request)
+        payload = {name: build(blank_request) for name, build in BOOTSTRAP_SECTIONS.items()}
+        entry = (payload, make_etag(payload))
+        cache.set(key, entry, getattr(settings, 'BOOTSTRAP_CACHE_TIMEOUT', 300))
+    return entry
+
+
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+def bootstrap_view(request):
+    """
+    Dữ liệu trang chủ trong 1 request:
+    settings, social_media, certifications, about_features, about_values,
+    categories, popular_products, featured_articles.
+    ?sections=settings,categories để chỉ lấy một số phần.
+    """
+    payload, etag = get_bootstrap_payload()
+    
+    sections = request.query_params.get('sections')
+    if sections:
+        names = [name.strip() for name in sections.split(',') if name.strip()]
+        unknown = [name for name in names if name not in BOOTSTRAP_SECTIONS]
+        if unknown:
+            return Response(
+                {'error': f'Unknown sections: {", ".join(unknown)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        payload = {name: payload[name] for name in names}
+        etag = make_etag(payload)
+    
+    if etag_matches(request, etag):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response(payload)
+    response['ETag'] = etag
+    return response
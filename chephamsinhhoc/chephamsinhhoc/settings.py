@@ -48,7 +48,8 @@ REST_FRAMEWORK = {
     # dùng spectacular làm schema generator
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT + cache user trong process (api/authentication.py)
+        'api.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
     'rest_framework.permissions.AllowAny',
@@ -61,10 +62,32 @@ REST_FRAMEWORK = {
     # (các setting DRF khác của bạn giữ nguyên)
 }
 
+SIMPLE_JWT = {
+    # Token kèm username/role/is_staff để ClaimsJWTAuthentication không phải đọc DB
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.ClaimsTokenObtainPairSerializer',
+}
+USER_CACHE_TTL = 60  # giây giữ user đã xác thực trong process
+USER_CACHE_VERSION_CHECK = 2  # giây giữa hai lần kiểm tra User đổi ở worker khác
+
+# Chặn đăng nhập dồn dập trước khi hash mật khẩu (api/login_throttle.py)
+LOGIN_THROTTLE_RATES = {
+    'ip': (20, 60),  # 20 lần / 60 giây mỗi IP
+    'username': (5, 60),  # 5 lần / 60 giây mỗi tài khoản, reset khi đăng nhập đúng
+}
+LOGIN_THROTTLE_STORE = 'api.login_throttle.LocalBucketStore'
+LOGIN_HASH_CONCURRENCY = 2  # số lần hash PBKDF2 song song mỗi worker
+LOGIN_HASH_WAIT = 2  # giây chờ lượt hash trước khi trả 503
+# Proxy (IP / CIDR) được tin X-Forwarded-For, vd. ['127.0.0.1'] khi chạy sau nginx trên cùng máy.
+# Rỗng = dùng REMOTE_ADDR: header do client tự gửi không né được bucket IP. Sau proxy mà để
+# rỗng thì mọi client chung bucket IP của proxy.
+TRUSTED_PROXIES = []
+
  
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Đo latency / query / serializer theo route (api/instrumentation.py), đặt sớm để tính cả middleware sau
+    'api.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -73,6 +96,7 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
+    'api.db.router.ReadYourWritesMiddleware',
 ]
 
 ROOT_URLCONF = 'chephamsinhhoc.urls'
@@ -101,16 +125,36 @@ WSGI_APPLICATION = 'chephamsinhhoc.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # django.db.backends.mysql + pool kết nối trong mỗi worker (api/db/pool.py)
+        'ENGINE': 'api.db.mysql',
         'NAME': 'ebgreentek_db',
         'USER': 'root',
         'PASSWORD': '',
         'HOST': 'localhost',
         'PORT': '3306',
+        # Giữ 0: cuối mỗi request Django "đóng" kết nối = trả về pool
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': 10,  # ≥ số thread của mỗi worker
+            'MAX_AGE': 1800,  # giây, nhỏ hơn wait_timeout của MariaDB
+            'TIMEOUT': 30,  # giây chờ khi pool đầy
+            'HEALTH_CHECK_AFTER': 0,  # ping khi kết nối đã nghỉ ≥ số giây này (0 = luôn ping)
+        },
     }
 }
 
 
+# Read replica: thêm alias vào DATABASES rồi liệt kê ở DATABASE_REPLICAS, vd.
+#   DATABASES['replica1'] = {**DATABASES['default'], 'HOST': '10.0.0.12', 'TEST': {'MIRROR': 'default'}}
+#   DATABASE_REPLICAS = ['replica1']
+# GET ẩn danh của sản phẩm, bài viết, bảng tham chiếu đọc từ replica (api/db/router.py)
+DATABASE_ROUTERS = ['api.db.router.ReplicaRouter']
+DATABASE_REPLICAS = []
+REPLICA_MAX_LAG = 10  # giây; replica trễ hơn → đọc primary
+REPLICA_LAG_CHECK_INTERVAL = 5  # giây giữa hai lần đo độ trễ (mỗi process)
+REPLICA_STICKY_SECONDS = 15  # sau khi ghi, client đọc primary trong khoảng này (cookie)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -170,6 +214,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # settings.py
 
 # Tắt MemoryFileUploadHandler → ép dùng file tạm trên đĩa
+# (upload_image không dùng danh sách này: api/uploads.py ghi thẳng vào thư mục blob)
 FILE_UPLOAD_HANDLERS = [
     'django.core.files.uploadhandler.TemporaryFileUploadHandler',
 ]
@@ -180,4 +225,86 @@ FILE_UPLOAD_MAX_MEMORY_SIZE = 104857600  # 100MB
 
 # Thư mục media
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Bộ đếm lượt xem ghi trễ (api/view_counter.py)
+# Số giây giữa 2 lần flush xuống DB; đặt 0 để ghi ngay mỗi lượt xem
+VIEW_COUNTER_FLUSH_INTERVAL = 10
+# Số sản phẩm/bài viết đang chờ tối đa trước khi flush sớm
+VIEW_COUNTER_MAX_PENDING = 1000
+
+# Cache dùng chung giữa các worker trên cùng máy (generation counter, response cache)
+# Production nhiều máy: đổi sang Redis/Memcached
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, '.cache'),
+    }
+}
+# Thời gian sống (giây) của response cache cho Product/Article
+API_RESPONSE_CACHE_TIMEOUT = 300
+# Thời gian sống (giây) của blob /api/bootstrap/
+BOOTSTRAP_CACHE_TIMEOUT = 300
+# Chu kỳ (giây) settings registry kiểm tra generation của Setting (0 = mỗi lần đọc)
+SETTINGS_REGISTRY_VERSION_CHECK = 2
+# Activity log ghi nền theo lô (giây giữa 2 lần ghi; 0 = ghi ngay)
+ACTIVITY_LOG_FLUSH_INTERVAL = 2
+ACTIVITY_LOG_BATCH_SIZE = 200
+# Hàng đợi đầy → log_activity() chờ tối đa ACTIVITY_LOG_PUT_TIMEOUT giây rồi bỏ sự kiện
+ACTIVITY_LOG_MAX_PENDING = 10000
+ACTIVITY_LOG_PUT_TIMEOUT = 0.05
+# Spool file (JSONL) giữ sự kiện chưa ghi khi process crash
+ACTIVITY_LOG_SPOOL_DIR = os.path.join(BASE_DIR, '.spool')
+# Activity log cũ hơn N ngày được archive ra file .jsonl.gz (lệnh archive_activity_logs)
+ACTIVITY_LOG_RETENTION_DAYS = 180
+ACTIVITY_LOG_ARCHIVE_DIR = os.path.join(BASE_DIR, 'archive', 'activity_logs')
+# Biến thể ảnh sau upload (api/images.py): độ rộng, định dạng, chất lượng, số worker (0 = xử lý trong request)
+IMAGE_VARIANT_WIDTHS = [320, 640, 1024, 1600]
+IMAGE_VARIANT_FORMATS = ['webp', 'avif']
+IMAGE_VARIANT_QUALITY = {'webp': 80, 'avif': 60}
+IMAGE_PROCESSING_WORKERS = 2
+# Cache trong process cho bảng tham chiếu nhỏ (api/reference_cache.py): TTL giây, số payload tối đa,
+# số giây giữa 2 lần đọc generation dùng chung
+REFERENCE_CACHE_TTL = 300
+REFERENCE_CACHE_MAX_ENTRIES = 256
+REFERENCE_CACHE_VERSION_CHECK = 2
+# Upload ảnh (api/uploads.py): kích thước tối đa, chặn ngay khi đang nhận
+IMAGE_UPLOAD_MAX_SIZE = 5 * 1024 * 1024  # 5MB
+# Phục vụ MEDIA_URL (api/media_serving.py). File có hash trong tên (blobs/, variants/) được cache
+# 1 năm (immutable); file khác cache MEDIA_CACHE_MAX_AGE giây rồi kiểm tra lại bằng ETag
+MEDIA_CACHE_MAX_AGE = 3600
+# Có nginx phía trước: đặt '/protected-media/' và cấu hình
+#   location /protected-media/ { internal; alias <MEDIA_ROOT>/; }
+# Apache mod_xsendfile / lighttpd: MEDIA_SENDFILE_HEADER = 'X-Sendfile'
+MEDIA_ACCEL_REDIRECT_PREFIX = None
+MEDIA_SENDFILE_HEADER = None
+# Instrumentation (api/instrumentation.py): số liệu theo route ở /api/_metrics (Prometheus).
+# Mỗi worker có số liệu riêng → Prometheus scrape từng worker/instance.
+INSTRUMENTATION_ENABLED = True
+INSTRUMENTATION_DUPLICATE_QUERY_THRESHOLD = 5  # cùng câu SQL ≥ n lần/request → cảnh báo N+1
+# Prometheus gửi "Authorization: Bearer <METRICS_TOKEN>" (scrape_config: authorization.credentials).
+# None = tắt /api/_metrics (404).
+METRICS_TOKEN = None
+# Profiler lấy mẫu: request có header "X-Profile: <token>" được ghi stack vào INSTRUMENTATION_PROFILE_DIR
+# (định dạng folded cho flamegraph / speedscope). None = tắt.
+INSTRUMENTATION_PROFILE_TOKEN = None
+INSTRUMENTATION_PROFILE_DIR = os.path.join(BASE_DIR, '.profiles')
+
+# Log dạng "message key=value" (extra={...}); đặt level 'DEBUG' cho logger 'api' để xem log chi tiết.
+# Log debug bị tắt thì các lời gọi logger.debug() trong code không dựng message.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'keyvalue': {
+            '()': 'api.instrumentation.KeyValueFormatter',
+            'fmt': '%(asctime)s %(levelname)s %(name)s %(message)s',
+        },
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'keyvalue'},
+    },
+    'loggers': {
+        'api': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
@@ -36,8 +36,7 @@ urlpatterns = [
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ]
-from django.conf import settings
-from django.conf.urls.static import static
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+from api.media_serving import media_urlpatterns
+# Media: cache header, Range, X-Accel-Redirect/X-Sendfile khi có proxy (api/media_serving.py)
+urlpatterns += media_urlpatterns()
     
\ No newline at end of file
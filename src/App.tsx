@@ -79,7 +79,8 @@ interface APIProduct {
   ingredients: string;
   benefits: string[];
   packaging: string[];
-  images: string[];
+  image?: string | null;   // list API: ảnh đại diện
+  images?: string[];       // list API: chỉ có khi xin qua ?fields=...,images
   image_labels: string[];
   status: string;
   is_popular: boolean;
@@ -94,7 +95,7 @@ interface APIArticle {
   title: string;
   category: string;
   excerpt: string;
-  content: string;
+  content?: string;        // list API không trả content → lấy qua /articles/{id}/
   image: string;
   author: string;
   tags: string[];
@@ -125,7 +126,7 @@ function convertAPIProduct(apiProduct: APIProduct): Product {
     description: apiProduct.description,
     price: "Liên hệ",
     unit: "",
-    image: apiProduct.images?.[0] || "",
+    image: apiProduct.images?.[0] || apiProduct.image || "",
     rating: 4.8,
     popular: apiProduct.is_popular,
     features: apiProduct.features || [],
@@ -134,7 +135,7 @@ function convertAPIProduct(apiProduct: APIProduct): Product {
       ingredients: apiProduct.ingredients || "",
       benefits: apiProduct.benefits || [],
     },
-    images: apiProduct.images || [],
+    images: apiProduct.images || (apiProduct.image ? [apiProduct.image] : []),
     imageLabels: apiProduct.image_labels || [],
     packaging: apiProduct.packaging || [],
   };
@@ -157,7 +158,7 @@ function convertAPIArticle(apiArticle: APIArticle): Article {
   };
 
   try {
-    const parsed = JSON.parse(apiArticle.content);
+    const parsed = JSON.parse(apiArticle.content ?? "");
     console.log('🔍 [convertAPIArticle] Parsed JSON:', {
       hasIntro: parsed.intro !== undefined,
       hasSections: !!parsed.sections,
@@ -171,12 +172,12 @@ function convertAPIArticle(apiArticle: APIArticle): Article {
       console.log('✅ [convertAPIArticle] Using structured content with', parsed.sections.length, 'sections');
     } else {
       // Not structured, keep as string
-      content = apiArticle.content;
+      content = apiArticle.content ?? "";
       console.log('⚠️ [convertAPIArticle] Content is JSON but not in expected structure, keeping as string');
     }
   } catch (e) {
     // Not JSON, keep as string
-    content = apiArticle.content;
+    content = apiArticle.content ?? "";
     console.log('📝 [convertAPIArticle] Content is not JSON, keeping as string');
   }
 
@@ -411,14 +412,24 @@ export default function AppWithAPI() {
     setCurrentView('purchase');
   };
 
-  const handleReadArticle = (article: Article) => {
+  const handleReadArticle = async (article: Article) => {
     console.log('📖 [handleReadArticle] Opening article:', {
       id: article.id,
       title: article.title,
-      content: article.content,
-      contentType: typeof article.content,
     });
-    setSelectedArticle(article);
+    // Danh sách /articles/ không có content → lấy bài đầy đủ từ API chi tiết
+    try {
+      const response = await fetch(`${API_BASE}/articles/${article.id}/`);
+      if (!response.ok) {
+        throw new Error('Không thể tải bài viết');
+      }
+      const data: APIArticle = await response.json();
+      setSelectedArticle(convertAPIArticle(data));
+    } catch (error) {
+      console.error('Error fetching article:', error);
+      toast.error('Không thể tải nội dung bài viết');
+      setSelectedArticle(article);
+    }
     setCurrentView('article');
   };
 
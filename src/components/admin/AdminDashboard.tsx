@@ -24,7 +24,7 @@ import { ArticleFormModal } from "./ArticleFormModal";
 import { ContactReplyModal } from "./ContactReplyModal";
 import { SettingsForm } from "./SettingsForm";
 import {
-  getProducts,
+  getAdminProducts,
   getProduct,
   getArticles,
   getArticle,
@@ -150,7 +150,7 @@ export function AdminDashboard({ onLogout }: AdminDashboardProps) {
       setProductsError(null);
 
       console.log("🔄 [Admin] Fetching products from API...");
-      const data = await getProducts();
+      const data = await getAdminProducts();
       const productsData = data.results || data;
 
       setProducts(productsData);
@@ -327,6 +327,13 @@ export const getProducts = async () => {
   return apiCall('/products/?status=active');
 };
 
+// Bảng quản trị cần cả mảng images (list công khai chỉ trả ảnh đại diện)
+const ADMIN_PRODUCT_FIELDS = 'id,name,category,description,image,images,status,is_popular,view_count';
+
+export const getAdminProducts = async () => {
+  return apiCall(`/products/?status=active&fields=${ADMIN_PRODUCT_FIELDS}`);
+};
+
 export const getProduct = async (id: string) => {
   return apiCall(`/products/${id}/`);
 };